@@ -0,0 +1,165 @@
+"""This file contains the fare matrix of the OpenMetroGuide graph: the least cost,
+in base units, between every pair of stations, for fare boards.
+
+The matrix is computed on the graph of the stations only, where two stations are
+joined if a route between them passes no other station, by the Floyd-Warshall
+algorithm in blocks: every block of intermediate stations is closed on its own,
+and then applied to the whole matrix, a chunk of rows at a time, as a min-plus
+product of NumPy arrays, so that the work is done by vectorized operations on
+chunks which fit in the cache.
+https://en.wikipedia.org/wiki/Floyd%E2%80%93Warshall_algorithm
+
+The matrix is stored as float32 in a .npy file, which is memory-mapped when it
+is loaded, so that a fare is looked up without reading the whole matrix.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Optional
+
+import numpy as np
+
+from src.Base.map import Map
+
+# The number of intermediate stations of a block
+BLOCK = 64
+
+# The number of elements of the chunks of rows that a block is applied to at once
+CHUNK = 1 << 16
+
+# The suffix of the file of the station names, next to the file of the matrix
+STATIONS_SUFFIX = '.stations'
+
+
+class FareMatrix:
+    """The least cost between every pair of stations of a map.
+
+    Instance Attributes:
+        - stations: The names of the stations, in the order of the rows and columns.
+        - fares: The least cost from the station of every row to the station of every
+        column, or infinity if it cannot be reached.
+
+    Representation Invariants:
+        - self.fares.shape == (len(self.stations), len(self.stations))
+        - self.fares.dtype == np.float32
+    """
+
+    # Private Instance Attributes:
+    #   - _index: The row and column of every station, by name.
+
+    stations: list[str]
+    fares: np.ndarray
+    _index: dict[str, int]
+
+    def __init__(self, stations: list[str], fares: np.ndarray) -> None:
+        self.stations = stations
+        self.fares = fares
+        self._index = {name: i for i, name in enumerate(stations)}
+
+    @classmethod
+    def from_map(cls, metro_map: Map, block: int = BLOCK) -> FareMatrix:
+        """Return the fare matrix of metro_map.
+
+        Preconditions:
+            - the cost weights of the tracks of metro_map have been updated
+        """
+        stations, fares = station_graph(metro_map)
+        floyd_warshall(fares, block)
+        return cls(stations, fares)
+
+    @classmethod
+    def load(cls, path: str) -> FareMatrix:
+        """Return the fare matrix saved at path, memory-mapped for reading."""
+        with open(path + STATIONS_SUFFIX, encoding='utf-8') as file:
+            stations = file.read().split('\n')[:-1]
+        return cls(stations, np.load(path, mmap_mode='r'))
+
+    def save(self, path: str) -> None:
+        """Save the matrix to path, a .npy file, and the names of its stations to the
+        file next to it, one per line."""
+        np.save(path, self.fares, allow_pickle=False)
+        with open(path + STATIONS_SUFFIX, 'w', encoding='utf-8') as file:
+            file.writelines(name + '\n' for name in self.stations)
+
+    def get_fare(self, origin: str, destination: str) -> float:
+        """Return the least cost from the station named origin to the station named
+        destination. Raise ValueError if either is not a station of the matrix."""
+        if origin not in self._index or destination not in self._index:
+            raise ValueError
+        return float(self.fares[self._index[origin], self._index[destination]])
+
+
+def station_graph(metro_map: Map) -> tuple[list[str], np.ndarray]:
+    """Return the names of the stations of metro_map, in order of ID, and the matrix of
+    the least cost from every station to every station next to it, through corners
+    only, with zeros on the diagonal and infinity between stations which are not
+    next to each other.
+    """
+    stations = sorted(metro_map.get_all_nodes('station'), key=lambda node: node.node_id)
+    index = {station: i for i, station in enumerate(stations)}
+    fares = np.full((len(stations), len(stations)), np.inf, dtype=np.float32)
+    np.fill_diagonal(fares, 0)
+
+    for i, station in enumerate(stations):
+        # the corners around the station, by the least cost from it
+        scores = {station: 0.0}
+        queue = [(0.0, station.node_id, station)]
+        while queue:
+            score, _, node = heapq.heappop(queue)
+            if score > scores[node]:
+                continue
+            if node.is_station and node is not station:
+                fares[i, index[node]] = min(fares[i, index[node]], score)
+                continue
+
+            for neighbour, weight in node.get_weights('cost'):
+                if score + weight < scores.get(neighbour, math.inf):
+                    scores[neighbour] = score + weight
+                    heapq.heappush(queue, (score + weight, neighbour.node_id, neighbour))
+
+    return [station.name for station in stations], fares
+
+
+def floyd_warshall(fares: np.ndarray, block: int = BLOCK, chunk: Optional[int] = None) -> None:
+    """Replace every entry of fares, the matrix of the least cost of every track of a
+    graph, with the least cost of the routes between its row and column.
+
+    The intermediate nodes are taken a block of block nodes at a time: the block
+    is closed first, then its rows are extended through it, and finally every
+    chunk of chunk elements of rows is extended through the rows of the block.
+
+    Preconditions:
+        - fares.shape[0] == fares.shape[1]
+        - (fares >= 0).all() and (np.diagonal(fares) == 0).all()
+    """
+    size = len(fares)
+    rows = max(1, (chunk or CHUNK) // max(1, size))
+
+    for start in range(0, size, block):
+        end = min(start + block, size)
+        diagonal = fares[start:end, start:end]
+        for k in range(end - start):
+            np.minimum(diagonal, diagonal[:, k, None] + diagonal[None, k, :], out=diagonal)
+
+        panel = fares[start:end]
+        _min_plus(diagonal.copy(), panel, panel)
+
+        panel = panel.copy()
+        for row in range(0, size, rows):
+            part = fares[row:row + rows]
+            _min_plus(part[:, start:end].copy(), panel, part)
+
+
+def _min_plus(left: np.ndarray, right: np.ndarray, out: np.ndarray) -> None:
+    """Replace every entry of out with the least of it and the entries of the min-plus
+    product of left and right.
+
+    Preconditions:
+        - left.shape[1] == right.shape[0]
+        - out.shape == (left.shape[0], right.shape[1])
+    """
+    through = np.empty_like(out)
+    for k in range(left.shape[1]):
+        np.add(left[:, k, None], right[None, k, :], out=through)
+        np.minimum(out, through, out=out)
@@ -2,11 +2,17 @@
 """
 from __future__ import annotations
 
-from typing import Optional
+from typing import Iterable, Optional
 
 from dataclasses import dataclass
 import math
 from src.Base.node import Node
+from src.Base.routing import LANDMARKS, Heuristic, Landmarks, search, bidirectional_search
+from src.Base.symbols import SymbolTable
+
+
+# The ways in which a route can be searched for (see Map.optimized_route_ids)
+STRATEGIES = ('queue', 'astar', 'bidirectional')
 
 
 @dataclass
@@ -14,41 +20,33 @@ class QueueElement:
     """A member of the PriorityQueue created when
     finding the optimized route.
     """
-    name: str
+    node_id: int
     score_from_start: float
     distance_to_destination: float
     total_score: float
     previous_vertex: Optional[QueueElement] = None
 
 
-def get_path(curr_element: QueueElement) -> list[str]:
-    """Return a list of nodes corresponding to the shortest
+def get_path(curr_element: QueueElement) -> list[int]:
+    """Return a list of the IDs of the nodes corresponding to the shortest
     path from start to destination.
     """
-    if curr_element.previous_vertex is None:
-        return [curr_element.name]
-    else:
-        return get_path(curr_element.previous_vertex) + [curr_element.name]
+    path = []
+    while curr_element is not None:
+        path.append(curr_element.node_id)
+        curr_element = curr_element.previous_vertex
 
+    path.reverse()
+    return path
 
-def get_element(node_queue: list[QueueElement], name: str) -> Optional[QueueElement]:
-    """Return the element with name in the priority queue.
-    """
-    for element in node_queue:
-        if element.name == name:
-            return element
 
-    return None
-
-
-def update_element(node_queue: list[QueueElement], name: str, new_score_from_start: float,
+def update_element(element: QueueElement, new_score_from_start: float,
                    new_previous: QueueElement, optimization: str) -> None:
-    """Updates the distance between start and element with name if
+    """Updates the distance between start and element if
     new_distance_from_start is less than the previous distance from start.
 
     Also update the previous node.
     """
-    element = get_element(node_queue, name)
     if optimization == 'distance':
         new_total_score = new_score_from_start + element.distance_to_destination
     else:
@@ -72,29 +70,82 @@ def dequeue(node_queue: list[QueueElement]) -> QueueElement:
     return node_queue.pop(0)
 
 
+def check_map(nodes: set[Node]) -> str:
+    """Return why nodes do not form a proper metro map, or '' if they do.
+
+    A proper map is connected, has at least one station, and every corner joins
+    exactly two tracks, so that there are stations at both ends of every metro line.
+    """
+    no_of_stations = len([node for node in nodes if node.is_station])
+    if no_of_stations == 0:
+        return 'MAP IS INCOMPLETE'
+
+    connected = set()
+    next(iter(nodes)).add_connected(connected)
+    if len(connected) != len(nodes):
+        return 'MAP IS NOT CONNECTED'
+
+    for node_1 in nodes:
+        if not node_1.is_station:
+            neighbours = node_1.get_neighbours()
+            if len(neighbours) > 2:
+                return 'TRACK INTERSECTION CAN ONLY HAPPEN AT STATIONS AND ' \
+                       'TRACK OVERLAP CAN ONLY HAPPEN AT CROSSES OF THE GRID'
+            elif len(neighbours) < 2:
+                return 'MAP IS INCOMPLETE'
+
+    return ''
+
+
 class Map:
     """Represent the graph of the map where the calculation
     to find the shortest/cheapest route will take place.
     """
     # Instance Attributes:
-    #   - _nodes: A collection of nodes in this Map.
+    #   - _symbols: The ID of the name of every node in this Map.
+    #   - _nodes: The nodes in this Map, at the index of their IDs.
+    #   - _landmarks: The landmarks which guide the route optimization, if they
+    #                 were prepared since the map last changed.
 
-    _nodes: dict[str, Node]
+    _symbols: SymbolTable
+    _nodes: list[Node]
+    _landmarks: Optional[Landmarks]
 
     def __init__(self) -> None:
         """Initialize an empty transit(metro) map
         without any stations or tracks.
         """
-        self._nodes = {}
+        self._symbols = SymbolTable()
+        self._nodes = []
+        self._landmarks = None
 
     def get_node(self, name: str) -> Node:
         """Return corresponding node of input name.
         If no name found, raise ValueError.
         """
-        if name in self._nodes:
-            return self._nodes[name]
-        else:
-            raise ValueError
+        return self._nodes[self._symbols.get_id(name)]
+
+    def get_node_by_id(self, node_id: int) -> Node:
+        """Return the node whose ID is node_id.
+
+        Preconditions:
+            - 0 <= node_id < len(self.get_all_nodes())
+        """
+        return self._nodes[node_id]
+
+    def get_id(self, name: str) -> int:
+        """Return the ID of the node named name.
+        If no name found, raise ValueError.
+        """
+        return self._symbols.get_id(name)
+
+    def get_name(self, node_id: int) -> str:
+        """Return the name of the node whose ID is node_id.
+
+        Preconditions:
+            - 0 <= node_id < len(self.get_all_nodes())
+        """
+        return self._symbols.get_name(node_id)
 
     def get_all_nodes(self, kind: str = '') -> set[Node]:
         """Return a set of all nodes in the map.
@@ -102,29 +153,72 @@ class Map:
         Preconditions:
             - kind in {'', 'station', 'corner'}
         """
-        all_nodes = set(self._nodes.values())
         if kind == '':
-            return all_nodes
+            return set(self._nodes)
         elif kind == 'station':
-            return {node for node in all_nodes if node.is_station}
+            return {node for node in self._nodes if node.is_station}
         else:
-            return {node for node in all_nodes if not node.is_station}
+            return {node for node in self._nodes if not node.is_station}
 
     def add_node(self, node: Node) -> None:
-        """Add a node to the map.
+        """Add a node to the map, giving it the next ID, or the ID of the
+        node with the same name which it replaces.
         """
-        self._nodes[node.name] = node
+        self._landmarks = None
+        node.node_id = self._symbols.intern(node.name)
+        node.name = self._symbols.get_name(node.node_id)
+        if node.node_id == len(self._nodes):
+            self._nodes.append(node)
+        else:
+            self._nodes[node.node_id] = node
 
     def add_track(self, name_1: str, name_2: str, color: str) -> None:
         """Add a weighted track to the map.
         If any are absent, raise ValueError.
         """
-        if name_1 and name_2 in self._nodes:
-            node_1 = self._nodes[name_1]
-            node_2 = self._nodes[name_2]
-            node_1.add_track(node_2, color)
-        else:
-            raise ValueError
+        node_1 = self.get_node(name_1)
+        node_2 = self.get_node(name_2)
+        self._landmarks = None
+        node_1.add_track(node_2, color)
+
+    def update_weights(self) -> None:
+        """Update the cost weight of every track. Must be called once all nodes
+        and tracks have been added, before optimizing routes by cost."""
+        self._landmarks = None
+        for node in self._nodes:
+            for neighbor in node.get_neighbours():
+                node.update_weights(neighbor)
+
+    def get_costs(self) -> list[float]:
+        """Return the cost weight of every track, in the order of the IDs of the nodes
+        and of the tracks of every node."""
+        return [cost for node in self._nodes for _, cost in node.get_weights('cost')]
+
+    def set_costs(self, costs: Iterable[float]) -> None:
+        """Set the cost weight of every track to the weights returned by get_costs,
+        instead of computing them again as update_weights does.
+
+        Preconditions:
+            - costs was returned by get_costs of a map whose nodes and tracks were added
+              in the same order as those of this map, and whose weights were updated
+        """
+        self._landmarks = None
+        costs = iter(costs)
+        for node in self._nodes:
+            node.set_costs(costs)
+
+    def prepare_landmarks(self, count: int = LANDMARKS) -> None:
+        """Pick count landmarks and compute their scores to every node, so that
+        routes are optimized by A* with the landmark heuristic until the map changes.
+
+        Must be called once all nodes and tracks have been added and the weights
+        updated; tracks added to nodes directly are not noticed.
+        """
+        self._landmarks = Landmarks(self._nodes, count)
+
+    def get_landmarks(self) -> Optional[Landmarks]:
+        """Return the landmarks of the map, if they were prepared since it last changed."""
+        return self._landmarks
 
     def get_track_weight(self, name_1: str, name_2: str, optimization: str) -> float:
         """Return the weight of the track between two nodes.
@@ -134,45 +228,114 @@ class Map:
         Preconditions:
             - optimization in {'distance', 'cost'}
         """
-        if name_1 and name_2 in self._nodes:
-            node_1 = self._nodes[name_1]
-            node_2 = self._nodes[name_2]
+        node_1 = self.get_node(name_1)
+        node_2 = self.get_node(name_2)
 
-            neighboring_stations = node_1.get_neighbours()
-
-            if node_2 in neighboring_stations:
-                wt = node_1.get_weight(node_2, optimization)
-                return wt
+        if node_1.is_adjacent(node_2):
+            return node_1.get_weight(node_2, optimization)
 
         raise ValueError
 
     def optimized_route(self, start: str, destination: str,
-                        optimization: str = 'distance') -> list[str]:
-        """Return the most optimized route using the Dijkstra Algorithm.
+                        optimization: str = 'distance',
+                        strategy: Optional[str] = None) -> list[str]:
+        """Return the names of the nodes of the most optimized route from start
+        to destination (see optimized_route_ids).
+
+        Raise ValueError if there is no node named start or destination.
+
+        Preconditions:
+            - optimization in {'distance', 'cost'}
+            - strategy is None or strategy in STRATEGIES
+        """
+        path = self.optimized_route_ids(self.get_id(start), self.get_id(destination),
+                                        optimization, strategy)
+        return [self._symbols.get_name(node_id) for node_id in path]
+
+    def optimized_route_ids(self, start: int, destination: int,
+                            optimization: str = 'distance',
+                            strategy: Optional[str] = None) -> list[int]:
+        """Return the IDs of the nodes of the most optimized route from the node whose
+        ID is start to the node whose ID is destination, using the Dijkstra Algorithm.
         Runs the optimization depending on what the option entered is.
 
+        strategy is how the route is searched for:
+            - 'queue': the original search, through a sorted list of every node
+            - 'astar': A* (see get_heuristic)
+            - 'bidirectional': A* from both ends at once, until the searches meet
+        If strategy is None, it is 'astar' if the landmarks of the map are prepared,
+        and 'queue' otherwise.
+
+        The strategies find routes of the same score, which may differ between routes
+        of equal scores. Only 'astar' and 'bidirectional' raise ValueError if the
+        destination cannot be reached.
+
         Preconditions:
-            optimization in {'distance', 'cost'}
+            - optimization in {'distance', 'cost'}
+            - strategy is None or strategy in STRATEGIES
+            - 0 <= start < len(self.get_all_nodes())
+            - 0 <= destination < len(self.get_all_nodes())
         """
-        start_node = self.get_node(start)
-        end_node = self.get_node(destination)
-        node_queue = [QueueElement(start, 0,
-                                   start_node.get_distance(end_node),
-                                   start_node.get_distance(end_node))]
-        node_queue.extend([QueueElement(name, math.inf,
-                                        self._nodes[name].get_distance(end_node), math.inf)
-                           for name in self._nodes if name != start])
-
-        while (curr_element := dequeue(node_queue)).name != destination:
-            tmp_node = self._nodes[curr_element.name]
+        if strategy is None:
+            strategy = 'astar' if self._landmarks is not None else 'queue'
+
+        if strategy == 'astar':
+            return search(self._nodes, start, destination, optimization,
+                          self.get_heuristic(destination, optimization, start)).path
+        elif strategy == 'bidirectional':
+            return bidirectional_search(self._nodes, start, destination, optimization,
+                                        self.get_heuristic(destination, optimization, start),
+                                        self.get_heuristic(start, optimization,
+                                                           destination)).path
+
+        end_node = self._nodes[destination]
+        # the element of every node still in the queue, at the index of its ID
+        queued = [QueueElement(node.node_id, math.inf, node.get_distance(end_node), math.inf)
+                  for node in self._nodes]
+        queued[start].score_from_start = 0
+        queued[start].total_score = queued[start].distance_to_destination
+        node_queue = [queued[start]]
+        node_queue.extend(element for element in queued if element.node_id != start)
+
+        while (curr_element := dequeue(node_queue)).node_id != destination:
+            queued[curr_element.node_id] = None
+            tmp_node = self._nodes[curr_element.node_id]
 
             for node in tmp_node.get_neighbours():
-                to_add = self.get_track_weight(tmp_node.name, node.name, optimization)
+                to_add = tmp_node.get_weight(node, optimization)
 
-                if get_element(node_queue, node.name) is not None:
-                    update_element(node_queue, node.name,
+                if queued[node.node_id] is not None:
+                    update_element(queued[node.node_id],
                                    to_add + curr_element.score_from_start, curr_element,
                                    optimization)
                 sort_queue(node_queue)
 
         return get_path(curr_element)
+
+    def get_heuristic(self, destination: int, optimization: str,
+                      start: Optional[int] = None) -> Heuristic:
+        """Return a lower bound of the score of the route from a node, given by its ID,
+        to the node whose ID is destination: the landmark bound if the landmarks are
+        prepared, and the straight distance too when optimizing by distance.
+
+        start is the ID of the node the route starts from, if it is known, which the
+        landmarks used are chosen for.
+
+        Preconditions:
+            - optimization in {'distance', 'cost'}
+        """
+        end_node = self._nodes[destination]
+        nodes = self._nodes
+
+        def straight(node_id: int) -> float:
+            """Return the straight distance from node_id to the destination."""
+            return nodes[node_id].get_distance(end_node)
+
+        if self._landmarks is None:
+            return straight if optimization == 'distance' else lambda node_id: 0
+
+        landmark = self._landmarks.heuristic(destination, optimization, start)
+        if optimization == 'cost':
+            return landmark
+
+        return lambda node_id: max(straight(node_id), landmark(node_id))
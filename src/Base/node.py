@@ -3,7 +3,15 @@ for the OpenMetroGuide graph."""
 from __future__ import annotations
 
 import math
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
+
+
+def corner_name(coordinates: tuple[int, int]) -> str:
+    """Return the name of the corner at coordinates.
+
+    Corners are named after their coordinates, which are unique on the grid.
+    """
+    return str(coordinates)
 
 
 class Node:
@@ -12,6 +20,8 @@ class Node:
 
     Instance Attributes:
         - name: The name of the station.
+        - node_id: The ID of the node in the map it was added to, or -1 if it was not
+        added to a map.
         - colors: Represents the color line of the current node.
         - is_station: Whether the current node is a station or a corner.
         - coordinates: Coordinates of the current station on the grid(graph).
@@ -25,7 +35,10 @@ class Node:
     # Private Instance Attributes:
     #    - _neighbouring_nodes: The nodes which are adjacent to the current node
     #    and their corresponding weights with the current node.
+    __slots__ = ('name', 'node_id', 'is_station', '_neighbouring_nodes', 'coordinates', 'zone')
+
     name: str
+    node_id: int
     # colors: set[str]
     is_station: bool
     _neighbouring_nodes: dict[Node, tuple[float, float, str]]
@@ -36,6 +49,7 @@ class Node:
                  coordinates: tuple[int, int], is_station: bool, zone: Any) -> None:
         """Initialize a new Station object."""
         self.name = name
+        self.node_id = -1
         self._neighbouring_nodes = {}
         self.coordinates = coordinates
         self.is_station = is_station
@@ -53,6 +67,12 @@ class Node:
         temp = self._neighbouring_nodes[node_2]
         self._neighbouring_nodes[node_2] = temp[0], self.count_zones(node_2), temp[2]
 
+    def set_costs(self, costs: Iterator[float]) -> None:
+        """Set the cost weight of every track of this node, in the order the tracks
+        were added, to the next weight of costs."""
+        self._neighbouring_nodes = {node: (weights[0], next(costs), weights[2])
+                                    for node, weights in self._neighbouring_nodes.items()}
+
     def remove_track(self, node_2: Node) -> None:
         """Remove track between this node and node_2
 
@@ -70,35 +90,64 @@ class Node:
         """Return whether this node is connected to node_2,
         WITHOUT using any of the vertices in visited.
 
+        The search is iterative, so it is not limited by the length of the
+        metro lines. Every node it reaches is added to visited.
+
         Preconditions:
             - self not in visited
         """
-        if self.name == node_2.name:
-            visited.add(self)
-            return True
-        else:
-            visited.add(self)
-            for u in self._neighbouring_nodes:
+        stack = [self]
+        visited.add(self)
+
+        while stack:
+            node = stack.pop()
+            if node.name == node_2.name:
+                return True
+
+            for u in node._neighbouring_nodes:
                 if u not in visited:
-                    if u.check_connected(node_2, visited):
-                        return True
-            return False
+                    visited.add(u)
+                    stack.append(u)
+
+        return False
+
+    def add_connected(self, visited: set[Node]) -> None:
+        """Add this node and every node connected to it to visited,
+        WITHOUT using any of the vertices already in visited.
+
+        visited can be reused (cleared) between calls to avoid reallocating it.
+        """
+        stack = [self]
+        visited.add(self)
+
+        while stack:
+            for u in stack.pop()._neighbouring_nodes:
+                if u not in visited:
+                    visited.add(u)
+                    stack.append(u)
 
     def get_closest_station(self, visited: set[Node]) -> Optional[Node]:
         """Return the closest station to this node
         WITHOUT using any of the vertices in visited.
 
+        Starting from this node, the first unvisited neighbour is followed until
+        a station is reached. Every corner passed on the way is added to visited.
+
         Preconditions:
             - self not in visited
         """
-        if self.is_station:
-            return self
-        else:
-            visited.add(self)
-            for u in self._neighbouring_nodes:
+        node = self
+
+        while not node.is_station:
+            visited.add(node)
+            for u in node._neighbouring_nodes:
                 if u not in visited:
-                    return u.get_closest_station(visited)
-            return None
+                    node = u
+                    break
+            else:
+                return None
+
+        return node
 
     def get_color(self, node_2: Node) -> str:
         """Return the color of the track between this node and node_2
@@ -135,6 +184,16 @@ class Node:
         else:
             return self._neighbouring_nodes[node2][1]
 
+    def get_weights(self, optimization: str) -> list[tuple[Node, float]]:
+        """Return every neighbouring node of this node with the weight of the
+        track to it.
+
+        Preconditions:
+            - optimization in {'distance', 'cost'}
+        """
+        index = 0 if optimization == 'distance' else 1
+        return [(node, weights[index]) for node, weights in self._neighbouring_nodes.items()]
+
     def get_distance(self, destination_node: Node) -> float:
         """Returns the direct distance from the
         current node to the destination node.
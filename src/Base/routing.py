@@ -0,0 +1,291 @@
+"""This file contains the shortest path search of the OpenMetroGuide graph, over
+the IDs of its nodes, and the landmarks which guide it.
+
+The search is A* with a binary heap. Without a heuristic it is Dijkstra's
+algorithm. The landmark heuristic (ALT) bounds the remaining score of a route
+from below through the triangle inequality: for any landmark L, the score
+from v to the destination t is at least |d(L, t) - d(L, v)|, since the tracks
+can be taken both ways.
+https://www.microsoft.com/en-us/research/publication/computing-the-shortest-path-a-search-meets-graph-theory/
+"""
+from __future__ import annotations
+
+import heapq
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from src.Base.node import Node
+
+# The number of landmarks picked by default
+LANDMARKS = 8
+
+# The number of landmarks which bound the score of a route, among those of the map
+ACTIVE_LANDMARKS = 3
+
+# The optimizations that landmark scores are precomputed for
+OPTIMIZATIONS = ('distance', 'cost')
+
+Heuristic = Callable[[int], float]
+
+
+@dataclass
+class Route:
+    """The result of a shortest path search.
+
+    Instance Attributes:
+        - path: The IDs of the nodes of the route, from the start to the destination.
+        - score: The total weight of the tracks of the route.
+        - settled: The number of nodes whose score was final when the search stopped.
+    """
+    path: list[int]
+    score: float
+    settled: int
+
+
+class Landmarks:
+    """Landmark stations of a map, with the score from each of them to every node
+    for every optimization.
+
+    Instance Attributes:
+        - landmark_ids: The IDs of the landmarks, in the order they were picked.
+
+    Representation Invariants:
+        - all(len(self._scores[o]) == len(self.landmark_ids) for o in OPTIMIZATIONS)
+    """
+
+    # Private Instance Attributes:
+    #   - _scores: The scores from every landmark to every node, at the index of
+    #              the ID of the node, for every optimization.
+
+    landmark_ids: list[int]
+    _scores: dict[str, list[array]]
+
+    def __init__(self, nodes: list[Node], count: int = LANDMARKS) -> None:
+        """Pick up to count landmarks among the stations of nodes, the nodes of a map
+        at the index of their IDs, and compute their scores.
+
+        Every landmark is the station farthest, by distance, from the landmarks
+        picked before it, starting from the station farthest from an arbitrary one,
+        so that the landmarks lie around the map.
+
+        Preconditions:
+            - all(node.node_id == i for i, node in enumerate(nodes))
+            - the cost weights of the tracks have been updated
+        """
+        self.landmark_ids = []
+        self._scores = {optimization: [] for optimization in OPTIMIZATIONS}
+        stations = [node.node_id for node in nodes if node.is_station] \
+            or [node.node_id for node in nodes]
+        if not stations:
+            return
+
+        # the score, by distance, from the nearest landmark to every node
+        nearest = scores_from(nodes, stations[0], 'distance')
+        while len(self.landmark_ids) < min(count, len(stations)):
+            landmark = max(stations, key=lambda node_id: nearest[node_id])
+            if landmark in self.landmark_ids:
+                break
+            self.landmark_ids.append(landmark)
+
+            for optimization in OPTIMIZATIONS:
+                self._scores[optimization].append(scores_from(nodes, landmark, optimization))
+
+            new = self._scores['distance'][-1]
+            if len(self.landmark_ids) == 1:
+                nearest = new
+            else:
+                nearest = array('d', map(min, nearest, new))
+
+    def heuristic(self, destination: int, optimization: str,
+                  start: Optional[int] = None) -> Heuristic:
+        """Return a lower bound of the score from a node, given by its ID, to the node
+        whose ID is destination.
+
+        If start is not None, only the ACTIVE_LANDMARKS landmarks which bound the score
+        from the node whose ID is start the most are used, since evaluating the bound
+        takes longer the more landmarks it uses.
+
+        Preconditions:
+            - optimization in OPTIMIZATIONS
+        """
+        # landmarks which cannot reach the destination bound nothing
+        bounds = [(scores, scores[destination]) for scores in self._scores[optimization]
+                  if scores[destination] != math.inf]
+        if start is not None:
+            bounds.sort(key=lambda bound: -abs(bound[1] - bound[0][start]))
+            del bounds[ACTIVE_LANDMARKS:]
+
+        def lower_bound(node_id: int) -> float:
+            """Return the largest bound of the score from node_id through a landmark."""
+            best = 0
+            for scores, to_destination in bounds:
+                bound = to_destination - scores[node_id]
+                if bound < 0:
+                    bound = -bound
+                if bound > best:
+                    best = bound
+
+            return best
+
+        return lower_bound
+
+
+def search(nodes: list[Node], start: int, destination: int, optimization: str,
+           heuristic: Optional[Heuristic] = None) -> Route:
+    """Return the route with the least score from the node whose ID is start to the
+    node whose ID is destination, among nodes, the nodes of a map at the index of
+    their IDs.
+
+    heuristic must never overestimate the score from a node to the destination, and
+    the search is Dijkstra's algorithm if it is None.
+    Raise ValueError if the destination cannot be reached from the start.
+
+    Preconditions:
+        - optimization in {'distance', 'cost'}
+        - 0 <= start < len(nodes)
+        - 0 <= destination < len(nodes)
+    """
+    scores = [math.inf] * len(nodes)
+    previous = [-1] * len(nodes)
+    is_settled = bytearray(len(nodes))
+    scores[start] = 0
+    queue = [(heuristic(start) if heuristic is not None else 0, start)]
+    settled = 0
+
+    while queue:
+        node_id = heapq.heappop(queue)[1]
+        if is_settled[node_id]:
+            continue
+        is_settled[node_id] = 1
+        settled += 1
+        if node_id == destination:
+            break
+
+        score = scores[node_id]
+        for neighbour, weight in nodes[node_id].get_weights(optimization):
+            neighbour_id = neighbour.node_id
+            new_score = score + weight
+            if new_score < scores[neighbour_id]:
+                scores[neighbour_id] = new_score
+                previous[neighbour_id] = node_id
+                heapq.heappush(queue, (new_score + heuristic(neighbour_id)
+                                       if heuristic is not None else new_score, neighbour_id))
+    else:
+        raise ValueError
+
+    path = [destination]
+    while path[-1] != start:
+        path.append(previous[path[-1]])
+    path.reverse()
+
+    return Route(path, scores[destination], settled)
+
+
+def bidirectional_search(nodes: list[Node], start: int, destination: int, optimization: str,
+                         forward: Optional[Heuristic] = None,
+                         backward: Optional[Heuristic] = None) -> Route:
+    """Return the route with the least score from the node whose ID is start to the
+    node whose ID is destination, among nodes, the nodes of a map at the index of
+    their IDs, searching forward from the start and backward from the destination
+    at once until the searches meet.
+
+    forward must never overestimate the score from a node to the destination, and
+    backward the score from a node to the start. Each search is guided by half the
+    difference of the two, so that both are Dijkstra's algorithm on the same tracks
+    with reduced weights, and they can stop as soon as the sum of the keys at the
+    top of their queues reaches the score of the best route found. Every track has
+    the same weights both ways, so the backward search follows the same weights.
+    https://www.cs.princeton.edu/courses/archive/spr06/cos423/Handouts/EPP%20shortest%20path%20algorithms.pdf
+
+    Raise ValueError if the destination cannot be reached from the start.
+
+    Preconditions:
+        - optimization in {'distance', 'cost'}
+        - 0 <= start < len(nodes)
+        - 0 <= destination < len(nodes)
+    """
+    if start == destination:
+        return Route([start], 0, 1)
+
+    def potential(node_id: int) -> float:
+        """Return the potential of node_id in the forward search, the negation of
+        its potential in the backward search."""
+        return ((forward(node_id) if forward is not None else 0)
+                - (backward(node_id) if backward is not None else 0)) / 2
+
+    # the scores, previous nodes, settled nodes and queue of each search, forward first
+    scores = ([math.inf] * len(nodes), [math.inf] * len(nodes))
+    previous = ([-1] * len(nodes), [-1] * len(nodes))
+    is_settled = (bytearray(len(nodes)), bytearray(len(nodes)))
+    scores[0][start] = scores[1][destination] = 0
+    queues = ([(potential(start), start)], [(-potential(destination), destination)])
+    best, meeting, settled = math.inf, -1, 0
+
+    while True:
+        for side in (0, 1):
+            # entries of settled nodes are dropped, so that the tops are the least keys
+            queue = queues[side]
+            while queue and is_settled[side][queue[0][1]]:
+                heapq.heappop(queue)
+
+        if not queues[0] or not queues[1] or queues[0][0][0] + queues[1][0][0] >= best:
+            break
+
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        sign = 1 if side == 0 else -1
+        node_id = heapq.heappop(queues[side])[1]
+        is_settled[side][node_id] = 1
+        settled += 1
+
+        score = scores[side][node_id]
+        for neighbour, weight in nodes[node_id].get_weights(optimization):
+            neighbour_id = neighbour.node_id
+            new_score = score + weight
+            if new_score < scores[side][neighbour_id]:
+                scores[side][neighbour_id] = new_score
+                previous[side][neighbour_id] = node_id
+                heapq.heappush(queues[side],
+                               (new_score + sign * potential(neighbour_id), neighbour_id))
+
+            through = new_score + scores[1 - side][neighbour_id]
+            if through < best and new_score == scores[side][neighbour_id]:
+                best, meeting = through, neighbour_id
+
+    if meeting == -1:
+        raise ValueError
+
+    path = [meeting]
+    while path[-1] != start:
+        path.append(previous[0][path[-1]])
+    path.reverse()
+    while path[-1] != destination:
+        path.append(previous[1][path[-1]])
+
+    return Route(path, best, settled)
+
+
+def scores_from(nodes: list[Node], source: int, optimization: str) -> array:
+    """Return the least score from the node whose ID is source to every node of
+    nodes, at the index of its ID, or infinity if it cannot be reached.
+
+    Since every track can be taken both ways, these are also the least scores to
+    the source.
+    """
+    scores = array('d', [math.inf]) * len(nodes)
+    scores[source] = 0
+    queue = [(0.0, source)]
+
+    while queue:
+        score, node_id = heapq.heappop(queue)
+        if score > scores[node_id]:
+            continue
+
+        for neighbour, weight in nodes[node_id].get_weights(optimization):
+            new_score = score + weight
+            if new_score < scores[neighbour.node_id]:
+                scores[neighbour.node_id] = new_score
+                heapq.heappush(queue, (new_score, neighbour.node_id))
+
+    return scores
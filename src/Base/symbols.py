@@ -0,0 +1,59 @@
+"""This file contains the symbol table of the OpenMetroGuide graph, which gives
+every node of a map a dense integer ID.
+
+Nodes are named by the Admin (stations) or by their coordinates (corners), and
+those names are only looked up where they enter or leave the graph: everything
+within it, such as routing, refers to nodes by their IDs.
+"""
+
+
+class SymbolTable:
+    """Assigns every name a dense integer ID, from 0 in the order the names are
+    added, and keeps a single copy of every name, which every later lookup of
+    the name is resolved to.
+
+    Representation Invariants:
+        - all(self._ids[name] == i for i, name in enumerate(self._names))
+    """
+
+    # Private Instance Attributes:
+    #   - _ids: The ID of every name.
+    #   - _names: The name of every ID, at the index of the ID.
+
+    _ids: dict[str, int]
+    _names: list[str]
+
+    def __init__(self) -> None:
+        self._ids = {}
+        self._names = []
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def intern(self, name: str) -> int:
+        """Return the ID of name, giving it the next ID if it has none."""
+        node_id = self._ids.get(name)
+        if node_id is None:
+            node_id = len(self._names)
+            self._ids[name] = node_id
+            self._names.append(name)
+
+        return node_id
+
+    def get_id(self, name: str) -> int:
+        """Return the ID of name. If name has no ID, raise ValueError."""
+        node_id = self._ids.get(name)
+        if node_id is None:
+            raise ValueError
+        return node_id
+
+    def get_name(self, node_id: int) -> str:
+        """Return the name of node_id.
+
+        Preconditions:
+            - 0 <= node_id < len(self)
+        """
+        return self._names[node_id]
@@ -0,0 +1,361 @@
+"""This file contains the timetables of the lines of the OpenMetroGuide graph, and
+the search of the journey which arrives the earliest, constrained by time.
+
+Every line, the tracks of one color, runs trains both ways at a fixed headway
+from its first to its last train, at the speed and with the dwell time at every
+station given by its schedule. The search is RAPTOR (Round-bAsed Public Transit
+Optimized Router): its k-th round finds the earliest arrival at every station
+with k trains, so the number of transfers is bounded by the number of rounds.
+https://www.microsoft.com/en-us/research/publication/round-based-public-transit-routing/
+"""
+from __future__ import annotations
+
+import bisect
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+from src.Base.map import Map
+from src.Base.node import Node
+
+# The minutes needed to change trains at a station
+TRANSFER_TIME = 3
+
+# The most transfers of a journey by default
+MAX_TRANSFERS = 4
+
+# The default service: the first and last departures, in minutes after midnight,
+# the minutes between two trains, the speed in map units per minute (two grid
+# cells) and the minutes a train waits at every station
+FIRST_TRAIN = 5 * 60 + 30
+LAST_TRAIN = 24 * 60
+HEADWAY = 6
+SPEED = 80.0
+DWELL = 0.5
+
+
+@dataclass(frozen=True)
+class Schedule:
+    """The service of the line of a color, which is the same both ways.
+
+    Instance Attributes:
+        - color: The color of the tracks of the line.
+        - first: The first departure from either end of the line, in minutes after midnight.
+        - last: The latest departure from either end of the line, in minutes after midnight.
+        - headway: The minutes between two departures.
+        - speed: The distance travelled in a minute, in map units.
+        - dwell: The minutes a train waits at every station.
+
+    Representation Invariants:
+        - 0 <= self.first <= self.last
+        - self.headway > 0
+        - self.speed > 0
+        - self.dwell >= 0
+    """
+    color: str
+    first: int = FIRST_TRAIN
+    last: int = LAST_TRAIN
+    headway: int = HEADWAY
+    speed: float = SPEED
+    dwell: float = DWELL
+
+    def get_departures(self) -> list[float]:
+        """Return the departures from an end of the line, in order."""
+        return [float(time) for time in range(self.first, self.last + 1, self.headway)]
+
+
+@dataclass
+class LinePattern:
+    """The stations of a stretch of a line in the direction of its trains, which
+    every train of the stretch calls at with the same run times.
+
+    A train reaches and leaves a station at the same time: the dwell time at a
+    station is part of the run time to the next one.
+
+    Instance Attributes:
+        - color: The color of the line.
+        - stops: The IDs of the stations, in the order the trains call at them.
+        - offsets: The minutes from the departure of a train from the first station
+        to its call at every station, at the index of the station in stops.
+        - departures: The departures of the trains from the first station, in order.
+        - hops: The IDs of the nodes from every station to the next, both included.
+
+    Representation Invariants:
+        - len(self.stops) >= 2
+        - len(self.offsets) == len(self.stops)
+        - len(self.hops) == len(self.stops) - 1
+        - self.departures == sorted(self.departures)
+    """
+    color: str
+    stops: list[int]
+    offsets: list[float]
+    departures: list[float]
+    hops: list[list[int]]
+
+    def get_trip(self, position: int, time: float) -> Optional[int]:
+        """Return the index of the first train which calls at the station at position
+        in stops at or after time, or None if there is no such train."""
+        trip = bisect.bisect_left(self.departures, time - self.offsets[position])
+        return trip if trip < len(self.departures) else None
+
+    def get_time(self, trip: int, position: int) -> float:
+        """Return the time at which train trip calls at the station at position in stops."""
+        return self.departures[trip] + self.offsets[position]
+
+    def get_path(self, board: int, alight: int) -> list[int]:
+        """Return the IDs of the nodes from the station at position board in stops to
+        the station at position alight, both included.
+
+        Preconditions:
+            - 0 <= board < alight < len(self.stops)
+        """
+        path = [self.stops[board]]
+        for hop in self.hops[board:alight]:
+            path.extend(hop[1:])
+
+        return path
+
+
+@dataclass
+class Leg:
+    """The ride of a journey on a single train.
+
+    Instance Attributes:
+        - color: The color of the line of the train.
+        - path: The IDs of the nodes the train passes, from the station it is boarded
+        at to the station it is left at.
+        - departure: The time the train leaves the first station of path.
+        - arrival: The time the train reaches the last station of path.
+    """
+    color: str
+    path: list[int]
+    departure: float
+    arrival: float
+
+
+@dataclass
+class Journey:
+    """The result of a search for the earliest arrival.
+
+    Instance Attributes:
+        - legs: The train rides of the journey, in order.
+        - arrival: The time of arrival at the destination.
+        - rounds: The number of rounds the search took.
+    """
+    legs: list[Leg]
+    arrival: float
+    rounds: int
+
+    def get_path(self) -> list[int]:
+        """Return the IDs of the nodes the journey passes, in order."""
+        path = self.legs[0].path[:1] if self.legs else []
+        for leg in self.legs:
+            path.extend(leg.path[1:])
+
+        return path
+
+
+class Timetable:
+    """The trains of every line of a map, stretch by stretch.
+
+    Lines branch and cross each other at stations, so a line is split into
+    stretches between its ends and its branching stations, and each stretch is
+    run both ways, as a LinePattern. Changing between the stretches of a line is a
+    transfer, like changing lines.
+
+    Instance Attributes:
+        - patterns: The stretches of every line, in both directions.
+
+    Representation Invariants:
+        - all(self.patterns[p].stops[i] == stop for stop in range(len(self._patterns_at))
+              for p, i in self._patterns_at[stop])
+    """
+
+    # Private Instance Attributes:
+    #   - _patterns_at: The patterns calling at every node, with the position of the node
+    #                   in their stops, at the index of the ID of the node.
+
+    patterns: list[LinePattern]
+    _patterns_at: list[list[tuple[int, int]]]
+
+    def __init__(self, metro_map: Map, schedules: Optional[dict[str, Schedule]] = None) -> None:
+        """Build the timetable of metro_map, where schedules is the schedule of every
+        color. Lines without a schedule run the default service.
+
+        Preconditions:
+            - every corner of metro_map joins exactly two tracks
+        """
+        schedules = schedules or {}
+        self.patterns = []
+        self._patterns_at = [[] for _ in range(len(metro_map.get_all_nodes()))]
+
+        for color, hops in _station_hops(metro_map).items():
+            schedule = schedules.get(color, Schedule(color))
+            for stretch in _stretches(hops):
+                for path in (stretch, [hop[::-1] for hop in reversed(stretch)]):
+                    self._add_pattern(metro_map, schedule, path)
+
+    def _add_pattern(self, metro_map: Map, schedule: Schedule, path: list[list[int]]) -> None:
+        """Add the pattern of the line of schedule along path, the IDs of the nodes
+        from every station to the next."""
+        stops = [path[0][0]]
+        offsets = [0.0]
+        for hop in path:
+            distance = sum(metro_map.get_node_by_id(id_1).get_weight(
+                metro_map.get_node_by_id(id_2), 'distance') for id_1, id_2 in zip(hop, hop[1:]))
+            stops.append(hop[-1])
+            offsets.append(offsets[-1] + distance / schedule.speed + schedule.dwell)
+
+        pattern = len(self.patterns)
+        self.patterns.append(LinePattern(schedule.color, stops, offsets,
+                                         schedule.get_departures(), path))
+        # the last station is not added, since no train of the pattern leaves it
+        for position, stop in enumerate(stops[:-1]):
+            self._patterns_at[stop].append((pattern, position))
+
+    def earliest_arrival(self, start: int, destination: int, departure: float,
+                         max_transfers: int = MAX_TRANSFERS) -> Journey:
+        """Return the journey from the station whose ID is start, leaving at or after
+        departure, which arrives the earliest at the station whose ID is destination
+        with at most max_transfers transfers.
+
+        Raise ValueError if the destination cannot be reached in time.
+
+        Preconditions:
+            - start and destination are the IDs of stations
+            - max_transfers >= 0
+        """
+        count = len(self._patterns_at)
+        # arrivals[k] and boardings[k] are the earliest arrival at every node with at
+        # most k trains, and the ride that arrives then, as (pattern, trip, board, alight)
+        arrivals = [[math.inf] * count]
+        boardings: list[list[Optional[tuple[int, int, int, int]]]] = [[None] * count]
+        arrivals[0][start] = departure
+        best = [math.inf] * count
+        best[start] = departure
+        marked = {start}
+
+        for k in range(1, max_transfers + 2):
+            if not marked or start == destination:
+                break
+            arrivals.append(list(arrivals[k - 1]))
+            boardings.append(list(boardings[k - 1]))
+
+            # the earliest position at which every pattern is boarded from a marked node
+            queue = {}
+            for stop in marked:
+                for pattern, position in self._patterns_at[stop]:
+                    if position < queue.get(pattern, math.inf):
+                        queue[pattern] = position
+            marked = set()
+
+            for pattern, first in queue.items():
+                line = self.patterns[pattern]
+                trip, board = None, -1
+                for position in range(first, len(line.stops)):
+                    stop = line.stops[position]
+                    if trip is not None:
+                        time = line.get_time(trip, position)
+                        if time < best[stop] and time < best[destination]:
+                            arrivals[k][stop] = best[stop] = time
+                            boardings[k][stop] = (pattern, trip, board, position)
+                            marked.add(stop)
+
+                    # an earlier train may be caught at stop, if it was reached a round before
+                    previous = arrivals[k - 1][stop]
+                    if previous != math.inf and position < len(line.stops) - 1:
+                        ready = previous if stop == start else previous + TRANSFER_TIME
+                        candidate = line.get_trip(position, ready)
+                        if candidate is not None and (trip is None or candidate < trip):
+                            trip, board = candidate, position
+
+        if best[destination] == math.inf:
+            raise ValueError
+        return self._journey(arrivals, boardings, start, destination)
+
+    def _journey(self, arrivals: list[list[float]],
+                 boardings: list[list[Optional[tuple[int, int, int, int]]]],
+                 start: int, destination: int) -> Journey:
+        """Return the journey to destination found by the rounds of earliest_arrival,
+        given by their arrivals and boardings."""
+        rounds = len(arrivals) - 1
+        legs = []
+        stop, k = destination, rounds
+        while stop != start:
+            # the round in which the arrival at stop was last improved
+            while k > 1 and boardings[k - 1][stop] == boardings[k][stop]:
+                k -= 1
+            pattern, trip, board, alight = boardings[k][stop]
+            line = self.patterns[pattern]
+            legs.append(Leg(line.color, line.get_path(board, alight),
+                            line.get_time(trip, board), line.get_time(trip, alight)))
+            stop, k = line.stops[board], k - 1
+
+        legs.reverse()
+        return Journey(legs, arrivals[rounds][destination], rounds)
+
+
+def _station_hops(metro_map: Map) -> dict[str, dict[int, dict[int, list[int]]]]:
+    """Return, for every color, the IDs of the nodes from every station to every
+    station next to it along the tracks of the color, through corners only.
+
+    A corner whose two tracks differ in color ends both lines.
+    """
+    hops = {}
+    for station in metro_map.get_all_nodes('station'):
+        for neighbour in station.get_neighbours():
+            color = station.get_color(neighbour)
+            path = [station.node_id]
+            previous, node = station, neighbour
+            while node is not None and not node.is_station:
+                path.append(node.node_id)
+                previous, node = node, _next_node(node, previous, color)
+            if node is not None and node is not station:
+                path.append(node.node_id)
+                hops.setdefault(color, {}).setdefault(station.node_id, {})[node.node_id] = path
+
+    return hops
+
+
+def _next_node(corner: Node, previous: Node, color: str) -> Optional[Node]:
+    """Return the node after corner, coming from previous, along the tracks of color,
+    or None if the line does not continue."""
+    onward = [node for node in corner.get_neighbours() if node is not previous]
+    if len(onward) == 1 and corner.get_color(onward[0]) == color:
+        return onward[0]
+    return None
+
+
+def _stretches(hops: dict[int, dict[int, list[int]]]) -> list[list[list[int]]]:
+    """Return the stretches of a line between its ends and its branching stations,
+    each as the IDs of the nodes from every station of the stretch to the next,
+    where hops is the IDs of the nodes from every station of the line to every
+    station next to it.
+
+    Every track of the line is in a single stretch, in one of its directions.
+    """
+    stretches = []
+    used = set()
+
+    def follow(station: int, after: int) -> list[list[int]]:
+        """Return the stretch from station through after, up to the next end or
+        branching station."""
+        stretch = []
+        while (station, after) not in used:
+            used.add((station, after))
+            used.add((after, station))
+            stretch.append(hops[station][after])
+            if len(hops[after]) != 2:
+                break
+            station, after = after, next(node for node in hops[after] if node != station)
+
+        return stretch
+
+    # ends and branching stations first, then the loops which have neither
+    ends = [station for station in hops if len(hops[station]) != 2]
+    for station in ends + list(hops):
+        for after in hops[station]:
+            if (station, after) not in used:
+                stretches.append(follow(station, after))
+
+    return stretches
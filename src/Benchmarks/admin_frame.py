@@ -0,0 +1,68 @@
+"""Counts the pygame draw calls and measures the time of a frame of the Admin
+screen, editing a generated city, at every zoom level of the keyboard shortcuts
+and while panning, with warm caches.
+
+Run from the repository root:
+    python -m src.Benchmarks.admin_frame
+"""
+import os
+import tempfile
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from src.Benchmarks.map_generator import generate_map
+from src.Display.Utils import storage_manager
+from src.Display.Canvas.admin import Admin
+
+# The pygame.draw functions whose calls are counted
+DRAW_FUNCTIONS = ('line', 'lines', 'circle', 'rect', 'polygon')
+
+
+def run(stations: int = 500, frames: int = 50) -> None:
+    """Print the draw calls and time of an Admin frame on a city of about stations stations."""
+    storage_manager.DB_PATH = os.path.join(tempfile.mkdtemp(), 'map_storage.db')
+    storage_manager.init_db()
+    admin = Admin('frame', generate_map(stations, lines=8, corners=1))
+
+    calls = [0]
+    originals = {name: getattr(pygame.draw, name) for name in DRAW_FUNCTIONS}
+
+    def counted(function):
+        """Return function, counting its calls."""
+        def wrapper(*args, **kwargs):
+            calls[0] += 1
+            return function(*args, **kwargs)
+        return wrapper
+
+    for name, function in originals.items():
+        setattr(pygame.draw, name, counted(function))
+
+    def measure(label: str, pan: tuple[int, int] = (0, 0)) -> None:
+        """Report the draw calls and time of a frame, after a warm-up frame."""
+        admin._draw_map()
+        calls[0] = 0
+        start = time.perf_counter()
+        for _ in range(frames):
+            admin._view.pan(*pan)
+            admin._draw_map()
+        elapsed = time.perf_counter() - start
+        print(f'  {label:<24} {calls[0] / frames:8.1f} draw calls | '
+              f'{elapsed / frames * 1000:7.2f} ms per frame')
+
+    try:
+        for zoom in (1, 2, 4):
+            admin._view.zoom = zoom
+            measure('zoom ' + str(zoom))
+        measure('panning at zoom 4', (3, 2))
+    finally:
+        for name, function in originals.items():
+            setattr(pygame.draw, name, function)
+        admin._saver.close()
+
+
+if __name__ == '__main__':
+    pygame.init()
+    run()
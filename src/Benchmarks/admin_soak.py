@@ -0,0 +1,108 @@
+"""Soak test of an Admin session: scripts thousands of station creations
+(each followed by the removal of the station) through the real pygame event
+loop, and checks that the stack depth and the traced memory stay constant.
+
+Run from the repository root:
+    python -m src.Benchmarks.admin_soak
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from src.Base.map import Map
+from src.Base.node import Node
+from src.Display.Utils import storage_manager
+from src.Display.Canvas import admin as admin_module
+from src.Display.Canvas.admin import Admin
+
+STATION_POS = (400, 400)
+ZONE_BOX_POS = (300, 120)
+
+
+class SoakFinished(Exception):
+    """Raised from the display hook once every scripted event was handled."""
+
+
+def _creation_script(i: int) -> list[list[pygame.event.Event]]:
+    """Return the batches of events which create, then remove, the i-th station.
+    Each batch is handled in a separate frame."""
+    typing = [pygame.event.Event(pygame.KEYDOWN, key=0, unicode=char) for char in 'S' + str(i)]
+    typing.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=ZONE_BOX_POS, button=1))
+    typing.append(pygame.event.Event(pygame.KEYDOWN, key=0, unicode='1'))
+    typing.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN, unicode='\r'))
+    click = pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=STATION_POS, button=1)
+
+    return [[click], typing, [click]]
+
+
+def _stack_depth() -> int:
+    """Return the number of frames on the current call stack."""
+    depth = 0
+    frame = sys._getframe()
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back
+    return depth
+
+
+def run(creations: int = 3000, checkpoint: int = 500) -> None:
+    """Create and remove a station creations times, printing the stack depth
+    and traced memory every checkpoint creations."""
+    storage_manager.DB_PATH = os.path.join(tempfile.mkdtemp(), 'map_storage.db')
+    admin_module.AUTOSAVE_INTERVAL = 0
+
+    metro_map = Map()
+    metro_map.add_node(Node('A', (40, 40), True, '1'))
+    metro_map.add_node(Node('B', (120, 40), True, '1'))
+    metro_map.add_track('A', 'B', 'blue')
+    storage_manager.init_db()
+    storage_manager.store_map('soak', metro_map.get_all_nodes())
+    admin = Admin('soak', metro_map)
+
+    batches = [batch for i in range(creations) for batch in _creation_script(i)]
+    depths = set()
+    progress = {'posted': 0}
+    tracemalloc.start()
+
+    def end_of_frame(*args) -> None:
+        """Runs instead of pygame's display update at the end of every frame."""
+        depths.add(_stack_depth())
+        posted = progress['posted']
+        if posted == len(batches):
+            raise SoakFinished
+
+        if posted % (3 * checkpoint) == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            print(f'{posted // 3:>6} creations | stack depth {max(depths):>3} | '
+                  f'traced memory {current / 1024:8.1f} KiB')
+
+        for event in batches[posted]:
+            pygame.event.post(event)
+        progress['posted'] = posted + 1
+
+    update, flip = pygame.display.update, pygame.display.flip
+    pygame.display.update = pygame.display.flip = end_of_frame
+    try:
+        admin.display()
+    except SoakFinished:
+        pass
+    finally:
+        pygame.display.update, pygame.display.flip = update, flip
+
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    admin._saver.close()
+
+    print(f'{creations:>6} creations | stack depth {min(depths)}-{max(depths)} | '
+          f'traced memory {current / 1024:8.1f} KiB | '
+          f'{len(admin.active_nodes)} nodes left, '
+          f'{len(storage_manager.get_map("soak").get_all_nodes())} nodes stored')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,119 @@
+"""Measures the cost of saving a metro map, and how much of that cost is
+paid by the pygame thread when edits are journalled and handed to the
+background PersistenceWorker instead of storing the whole map.
+
+It first checks that deltas which cannot be written while the database is locked
+are kept and written once it is unlocked, and that closing the worker meanwhile
+raises the error of the failed save.
+
+Run from the repository root:
+    python -m src.Benchmarks.autosave
+"""
+import os
+import sqlite3
+import tempfile
+import time
+
+from src.Base.map import Map
+from src.Base.node import Node
+from src.Display.Utils import storage_manager
+from src.Display.Utils.storage_manager import init_db, store_map
+from src.Display.Utils.persistence import PersistenceWorker
+from src.Display.Utils.edit_journal import EditJournal, Edit, ADD_NODE, ADD_TRACK
+
+
+def build_line_map(n: int) -> Map:
+    """Return a map of a single line with n stations, each separated by a corner."""
+    metro_map = Map()
+    previous = None
+    for i in range(2 * n - 1):
+        is_station = i % 2 == 0
+        name = 'S' + str(i) if is_station else str((i * 40, 40))
+        node = Node(name, (i * 40, 40), is_station, str(i // 20))
+        metro_map.add_node(node)
+        if previous is not None:
+            metro_map.add_track(previous.name, node.name, 'blue')
+        previous = node
+
+    return metro_map
+
+
+def check_locked() -> int:
+    """Return the number of failed checks of saving while another connection holds
+    the database locked."""
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        storage_manager.DB_PATH = os.path.join(tmp, 'map_storage.db')
+        init_db()
+        active_nodes = build_line_map(10).get_all_nodes()
+        store_map('locked', active_nodes)
+        journal = EditJournal('locked', active_nodes)
+        journal.apply(Edit(ADD_NODE, Node('extra', (0, 0), True, '0')))
+        journal.end_step()
+
+        lock = sqlite3.connect(storage_manager.DB_PATH, timeout=0)
+        lock.execute('BEGIN EXCLUSIVE')
+        saver = PersistenceWorker('locked')
+        saver.start()
+        saver.submit(journal.take_deltas())
+        try:
+            saver.close()
+            failures += 1
+        except sqlite3.Error:
+            pass
+        pending = saver.take_pending()
+        failures += saver.error is None or not pending
+
+        lock.rollback()
+        lock.close()
+        saver = PersistenceWorker('locked')
+        saver.submit(pending)
+        saver.start()
+        saver.close()
+        failures += saver.error is not None
+        failures += 'extra' not in {node.name for node in
+                                    storage_manager.get_map('locked').get_all_nodes()}
+
+    print(f'locked database: {failures} failures')
+    return failures
+
+
+def run(sizes: tuple[int, ...] = (100, 1000, 5000), edits: int = 10) -> None:
+    """Print the latency of a full store_map, and the time blocked on the caller's
+    thread and in the worker when saving a few journalled edits of the same map."""
+    with tempfile.TemporaryDirectory() as tmp:
+        storage_manager.DB_PATH = os.path.join(tmp, 'map_storage.db')
+        init_db()
+
+        for n in sizes:
+            city = 'city' + str(n)
+            active_nodes = build_line_map(n).get_all_nodes()
+            store_map(city, active_nodes)
+
+            start = time.perf_counter()
+            store_map(city, active_nodes)
+            full_latency = time.perf_counter() - start
+
+            journal = EditJournal(city, active_nodes)
+            anchor = next(node for node in active_nodes if node.is_station)
+            for i in range(edits):
+                station = Node('extra' + str(i), (i * 40, 0), True, '0')
+                journal.apply(Edit(ADD_NODE, station))
+                journal.apply(Edit(ADD_TRACK, station, anchor, 'red'))
+                journal.end_step()
+
+            saver = PersistenceWorker(city)
+            saver.start()
+            start = time.perf_counter()
+            saver.submit(journal.take_deltas())
+            blocked = time.perf_counter() - start
+            saver.close()
+
+            print(f'{len(active_nodes):>6} nodes | store_map {full_latency * 1000:9.2f} ms | '
+                  f'{edits} edits: frame blocked {blocked * 1000:6.3f} ms, '
+                  f'worker save {saver.save_latencies[0] * 1000:6.2f} ms')
+
+
+if __name__ == '__main__':
+    check_locked()
+    run()
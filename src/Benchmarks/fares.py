@@ -0,0 +1,75 @@
+"""Times the fare matrix of generated maps, computed by the blocked Floyd-Warshall
+algorithm and by the plain one (a single block), checks sampled rows against
+Dijkstra's algorithm on the whole map, and times fare lookups in the saved,
+memory-mapped matrix.
+
+Run from the repository root:
+    python -m src.Benchmarks.fares
+"""
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from src.Base.fares import FareMatrix, floyd_warshall, station_graph
+from src.Base.routing import scores_from
+from src.Benchmarks.map_generator import generate_map
+
+# The number of rows of every matrix checked against Dijkstra's algorithm
+CHECKED_ROWS = 20
+
+# The number of fares looked up in every saved matrix
+LOOKUPS = 100000
+
+
+def run(sizes: tuple[int, ...] = (500, 1000, 2000)) -> None:
+    """Print the times of the fare matrices of maps of sizes stations."""
+    directory = tempfile.mkdtemp()
+
+    for size in sizes:
+        metro_map = generate_map(size, lines=8, corners=1, zones=6)
+        metro_map.update_weights()
+
+        start = time.perf_counter()
+        stations, edges = station_graph(metro_map)
+        print(f'{len(stations)} stations | station graph in {time.perf_counter() - start:.2f} s')
+
+        timings = {}
+        results = {}
+        for name, block in (('blocked', None), ('plain', len(stations))):
+            fares = edges.copy()
+            start = time.perf_counter()
+            if block is None:
+                floyd_warshall(fares)
+            else:
+                floyd_warshall(fares, block)
+            timings[name] = time.perf_counter() - start
+            results[name] = fares
+            print(f'  {name:<8} {timings[name]:8.2f} s')
+
+        nodes = sorted(metro_map.get_all_nodes(), key=lambda node: node.node_id)
+        ids = [metro_map.get_id(name) for name in stations]
+        wrong = 0
+        for row in random.Random(size).sample(range(len(stations)), CHECKED_ROWS):
+            expected = np.array(scores_from(nodes, ids[row], 'cost'))[ids]
+            wrong += not np.allclose(results['blocked'][row], expected, rtol=1e-5, atol=1e-5)
+        wrong += not np.allclose(results['blocked'], results['plain'], rtol=1e-5, atol=1e-5)
+
+        matrix = FareMatrix(stations, results['blocked'])
+        path = os.path.join(directory, f'fares-{size}.npy')
+        matrix.save(path)
+        loaded = FareMatrix.load(path)
+        rng = random.Random(0)
+        pairs = [(rng.choice(stations), rng.choice(stations)) for _ in range(LOOKUPS)]
+        start = time.perf_counter()
+        for origin, destination in pairs:
+            loaded.get_fare(origin, destination)
+        lookup = (time.perf_counter() - start) / LOOKUPS
+        print(f'  {os.path.getsize(path) / 2 ** 20:.1f} MiB saved | {lookup * 1e9:.0f} ns per '
+              f'lookup | {wrong} wrong checks')
+
+
+if __name__ == '__main__':
+    run()
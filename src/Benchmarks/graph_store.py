@@ -0,0 +1,159 @@
+"""Measures the memory of route worker processes which each build their own Map of
+a city from its rows, and of workers which attach to its graph in a shared-memory
+GraphStore, as the offscreen rendering workers do, at 1, 4 and 16 workers alive
+at once.
+
+Every worker finds ROUTES routes before its memory is read from
+/proc/self/smaps_rollup (Linux only): RSS counts every page it touched, PSS
+splits the shared pages between the processes sharing them, and USS counts only
+the pages private to it. Routes found on the shared graph must have the scores of
+routes found on the Map, and a worker must see a new revision of the graph once
+it is published.
+
+Run from the repository root:
+    python -m src.Benchmarks.graph_store
+"""
+import multiprocessing
+import random
+import time
+
+from src.Base.routing import search
+from src.Benchmarks.map_generator import generate_map
+from src.Display.Utils.graph_store import GraphReader, GraphStore
+from src.Display.Utils.storage_manager import build_map, snapshot_map
+
+# The number of routes every worker finds
+ROUTES = 20
+
+# The city the graph is published as
+CITY = 'benchmark'
+
+
+def _memory() -> dict[str, int]:
+    """Return the RSS, PSS and USS of this process, in bytes."""
+    fields = {}
+    with open('/proc/self/smaps_rollup', encoding='utf-8') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0][:-1]] = int(parts[1]) * 1024
+
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'uss': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def _worker(mode: str, source: object, queries: list[tuple[str, str, str]],
+            barrier: multiprocessing.Barrier, results: multiprocessing.Queue) -> None:
+    """Load the graph from source, the rows of the map if mode is 'copy' and the
+    namespace of the store if it is 'shared', find the routes of queries, and report
+    the scores and the memory once every worker has done the same."""
+    if mode == 'copy':
+        metro_map = build_map(*source)
+        metro_map.update_weights()
+        nodes = sorted(metro_map.get_all_nodes(), key=lambda node: node.node_id)
+        scores = [search(nodes, metro_map.get_id(start), metro_map.get_id(destination),
+                         optimization).score for start, destination, optimization in queries]
+        reader = None
+    else:
+        reader = GraphReader(source)
+        graph = reader.get(CITY)
+        scores = [graph.route_ids(graph.get_id(start), graph.get_id(destination),
+                                  optimization)[1] for start, destination, optimization in queries]
+
+    barrier.wait()
+    results.put((scores, _memory()))
+    barrier.wait()
+    if reader is not None:
+        reader.close()
+
+
+def measure(workers: tuple[int, ...] = (1, 4, 16), stations: int = 10000) -> None:
+    """Print the memory per worker of each way of loading a map of stations stations."""
+    context = multiprocessing.get_context('spawn')
+    metro_map = generate_map(stations, lines=8, corners=3, zones=6)
+    metro_map.update_weights()
+    snapshot = snapshot_map(CITY, metro_map.get_all_nodes())
+    names = sorted(node.name for node in metro_map.get_all_nodes('station'))
+    rng = random.Random(0)
+    queries = [(*rng.sample(names, 2), rng.choice(('distance', 'cost'))) for _ in range(ROUTES)]
+    nodes = sorted(metro_map.get_all_nodes(), key=lambda node: node.node_id)
+    expected = [search(nodes, metro_map.get_id(start), metro_map.get_id(destination),
+                       optimization).score for start, destination, optimization in queries]
+
+    store = GraphStore()
+    start = time.perf_counter()
+    store.publish(CITY, metro_map)
+    print(f'{stations} stations, {len(nodes)} nodes | published in '
+          f'{time.perf_counter() - start:.2f} s')
+
+    for count in workers:
+        for mode, source in (('copy', (sorted(snapshot.node_rows),
+                                       sorted(snapshot.connection_rows))),
+                             ('shared', store.namespace)):
+            barrier, results = context.Barrier(count + 1), context.Queue()
+            processes = [context.Process(target=_worker,
+                                         args=(mode, source, queries, barrier, results))
+                         for _ in range(count)]
+            for process in processes:
+                process.start()
+            barrier.wait()
+            reports = [results.get() for _ in processes]
+            barrier.wait()
+            for process in processes:
+                process.join()
+
+            wrong = sum(abs(score - expected[i]) > 1e-6 * max(1.0, expected[i])
+                        for scores, _ in reports for i, score in enumerate(scores))
+            memory = {key: sum(report[key] for _, report in reports) / count / 2 ** 20
+                      for key in ('rss', 'pss', 'uss')}
+            print(f'  {count:2} workers, {mode:<6} per worker: RSS {memory["rss"]:6.1f} MiB | '
+                  f'PSS {memory["pss"]:6.1f} MiB | USS {memory["uss"]:6.1f} MiB | '
+                  f'{wrong} wrong scores')
+
+    store.close()
+
+
+def _follow(namespace: str, published: multiprocessing.Event,
+            results: multiprocessing.Queue) -> None:
+    """Report the generation and size of the graph before and after a new revision is
+    published, in a worker."""
+    reader = GraphReader(namespace)
+    graph = reader.get(CITY)
+    results.put((graph.generation, graph.node_count))
+    published.wait()
+    graph = reader.get(CITY)
+    results.put((graph.generation, graph.node_count))
+    reader.close()
+
+
+def check_swap() -> int:
+    """Return the number of failed checks of a worker following a new revision."""
+    context = multiprocessing.get_context('spawn')
+    store = GraphStore()
+    first, second = generate_map(200), generate_map(300)
+    first.update_weights()
+    second.update_weights()
+    store.publish(CITY, first)
+
+    published, results = context.Event(), context.Queue()
+    process = context.Process(target=_follow, args=(store.namespace, published, results))
+    process.start()
+    failures = results.get() != (1, len(first.get_all_nodes()))
+    store.publish(CITY, second)
+    published.set()
+    failures += results.get() != (2, len(second.get_all_nodes()))
+    process.join()
+    store.close()
+
+    print(f'revision swap: {failures} failures')
+    return failures
+
+
+def run() -> None:
+    """Run the check and the measurements."""
+    check_swap()
+    measure()
+
+
+if __name__ == '__main__':
+    run()
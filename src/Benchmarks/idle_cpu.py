@@ -0,0 +1,131 @@
+"""Measures the CPU used by an idle Admin screen, and the latency from an
+input event to the frame that shows it, under the dummy SDL video driver.
+
+The event-driven loop of the application is compared with a loop which polls and
+redraws as fast as it can, as every screen did before FrameScheduler.
+
+Run from the repository root:
+    python -m src.Benchmarks.idle_cpu
+"""
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from src.Display.Utils import storage_manager
+from src.Display.Utils.scheduler import FrameScheduler
+from src.Display.Canvas.admin import Admin
+from src.Benchmarks.autosave import build_line_map
+
+
+class BenchmarkFinished(Exception):
+    """Raised from the display hook to leave the display loop."""
+
+
+class PollingScheduler(FrameScheduler):
+    """A scheduler which redraws on every iteration without a frame rate cap, as the
+    screens did before FrameScheduler."""
+
+    def __init__(self) -> None:
+        super().__init__(max_fps=0)
+
+    def should_redraw(self) -> bool:
+        """Return True: the screen is redrawn in every loop iteration."""
+        return True
+
+
+def _run_display(admin: Admin, on_frame) -> None:
+    """Run admin.display, calling on_frame after each displayed frame until it
+    raises BenchmarkFinished."""
+    update = pygame.display.update
+
+    def hook(*args) -> None:
+        """Runs instead of pygame's display update."""
+        update(*args)
+        on_frame()
+
+    pygame.display.update = hook
+    try:
+        admin.display()
+    except BenchmarkFinished:
+        pass
+    finally:
+        pygame.display.update = update
+
+
+def measure_cpu(admin: Admin, duration: float) -> tuple[float, int]:
+    """Return the CPU usage (as a fraction of one core) of admin.display
+    over duration seconds without input, and the number of frames drawn."""
+    frames = [0]
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+
+    def on_frame() -> None:
+        """Count frames and stop once duration has passed."""
+        frames[0] += 1
+        if time.perf_counter() - start_wall >= duration:
+            raise BenchmarkFinished
+
+    # wakes an idle loop up once duration has passed
+    timer = threading.Timer(duration, pygame.event.post,
+                            (pygame.event.Event(pygame.USEREVENT),))
+    timer.start()
+    _run_display(admin, on_frame)
+    timer.cancel()
+
+    wall = time.perf_counter() - start_wall
+    return (time.process_time() - start_cpu) / wall, frames[0]
+
+
+def measure_latency(admin: Admin, samples: int, spacing: float) -> list[float]:
+    """Return the time between posting a mouse motion event and the end of
+    the frame that shows it, for samples events posted spacing seconds apart."""
+    posted = []
+    latencies = []
+
+    def post_events() -> None:
+        """Post the mouse motion events from another thread, as input would arrive."""
+        for i in range(samples):
+            time.sleep(spacing)
+            posted.append(time.perf_counter())
+            pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=(i, i), rel=(1, 1),
+                                                 buttons=(0, 0, 0)))
+
+    def on_frame() -> None:
+        """Record the latency of the latest event, once per event."""
+        if len(posted) > len(latencies):
+            latencies.append(time.perf_counter() - posted[len(latencies)])
+        if len(latencies) == samples:
+            raise BenchmarkFinished
+
+    poster = threading.Thread(target=post_events)
+    poster.start()
+    _run_display(admin, on_frame)
+    poster.join()
+
+    return latencies
+
+
+def run(duration: float = 3.0, samples: int = 20) -> None:
+    """Print idle CPU and input-to-pixel latency of an Admin screen in each mode."""
+    storage_manager.DB_PATH = os.path.join(tempfile.mkdtemp(), 'map_storage.db')
+    admin = Admin('benchmark', build_line_map(50))
+
+    modes = {'polling (no cap)': PollingScheduler(), 'event-driven': FrameScheduler()}
+
+    for label, scheduler in modes.items():
+        admin._scheduler = scheduler
+        cpu, frames = measure_cpu(admin, duration)
+        latencies = sorted(measure_latency(admin, samples, 0.05))
+        print(f'{label:<22} | idle CPU {cpu * 100:5.1f}% | {frames / duration:7.1f} frames/s | '
+              f'input-to-pixel median {latencies[len(latencies) // 2] * 1000:6.2f} ms, '
+              f'max {latencies[-1] * 1000:6.2f} ms')
+
+    admin._saver.close()
+
+
+if __name__ == '__main__':
+    run()
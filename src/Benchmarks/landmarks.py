@@ -0,0 +1,71 @@
+"""Compares the shortest path searches of generated maps by the nodes they settle
+and their latency, for both optimizations: Dijkstra's algorithm, A* with the
+straight distance (the heuristic of the original search, when optimizing by
+distance) and A* with landmarks (ALT), each searching from the start only or
+from both ends. Checks that every search finds routes of the same score.
+
+Run from the repository root:
+    python -m src.Benchmarks.landmarks
+"""
+import itertools
+import random
+import statistics
+import time
+
+from src.Benchmarks.map_generator import generate_map
+from src.Base.routing import LANDMARKS, search, bidirectional_search
+
+# The number of routes searched per map, optimization and search
+ROUTES = 50
+
+
+def run(sizes: tuple[int, ...] = (1000, 5000, 20000), landmarks: int = LANDMARKS) -> None:
+    """Print the nodes settled and the latency of every search on a map of each size,
+    in stations."""
+    for size in sizes:
+        metro_map = generate_map(size, lines=8, corners=1)
+        metro_map.update_weights()
+        nodes = [metro_map.get_node_by_id(i) for i in range(len(metro_map.get_all_nodes()))]
+        start = time.perf_counter()
+        metro_map.prepare_landmarks(landmarks)
+        print(f'{size} stations, {len(nodes)} nodes | {landmarks} landmarks prepared in '
+              f'{time.perf_counter() - start:.2f} s')
+
+        stations = sorted(node.node_id for node in nodes if node.is_station)
+        rng = random.Random(size)
+        queries = [rng.sample(stations, 2) for _ in range(ROUTES)]
+
+        for optimization in ('distance', 'cost'):
+            heuristics = {'dijkstra': lambda target, source: None,
+                          'alt': lambda target, source:
+                          metro_map.get_heuristic(target, optimization, source)}
+            if optimization == 'distance':
+                heuristics['a*'] = lambda target, source: \
+                    lambda node_id: nodes[node_id].get_distance(nodes[target])
+
+            expected = None
+            for (name, heuristic), bidirectional in itertools.product(heuristics.items(),
+                                                                      (False, True)):
+                settled, times, scores = [], [], []
+                for source, destination in queries:
+                    begin = time.perf_counter()
+                    if bidirectional:
+                        route = bidirectional_search(nodes, source, destination, optimization,
+                                                     heuristic(destination, source),
+                                                     heuristic(source, destination))
+                    else:
+                        route = search(nodes, source, destination, optimization,
+                                       heuristic(destination, source))
+                    times.append(time.perf_counter() - begin)
+                    settled.append(route.settled)
+                    scores.append(route.score)
+
+                expected = expected or scores
+                wrong = sum(abs(a - b) > 1e-9 for a, b in zip(scores, expected))
+                name += ' (both ends)' if bidirectional else ''
+                print(f'  {optimization:<8} {name:<20} {statistics.mean(settled):8.0f} settled | '
+                      f'{statistics.mean(times) * 1000:8.2f} ms | {wrong} wrong scores')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,101 @@
+"""Generates synthetic metro maps, as an Admin could have drawn them, for
+benchmarking OpenMetroGuide on cities of any size.
+
+Lines run along the rows (horizontal lines) and columns (vertical lines) of a
+lattice of stations. Every crossing of a horizontal and a vertical line is a
+shared interchange station, so the generated map is always connected, and
+consecutive stations of a line are separated by corners like in the Admin editor.
+
+Zones are laid out either as concentric rings around the center of the map, or
+as bands across it from west to east.
+"""
+import math
+
+from src.Base.map import Map
+from src.Base.node import Node, corner_name
+
+# The side of a grid cell in map coordinates (GRID_SIZE cells over 800 pixels)
+CELL = 40
+
+# The colors of the Admin palette, in order
+LINE_COLORS = ('blue', 'red', 'yellow', 'green', 'brown', 'purple', 'orange', 'pink')
+
+
+def generate_map(stations: int, lines: int = 4, corners: int = 1, zones: int = 4,
+                 zone_layout: str = 'rings') -> Map:
+    """Return a connected map of about the given number of stations on the given
+    number of lines.
+
+    corners is the number of corners between two consecutive stations of a line.
+    zones is the number of zones, laid out according to zone_layout as concentric
+    rings around the center of the map or as bands from west to east: a rider
+    pays for every zone boundary crossed.
+
+    Preconditions:
+        - stations >= 2
+        - lines >= 1
+        - corners >= 0
+        - zones >= 1
+        - zone_layout in {'rings', 'bands'}
+    """
+    horizontal = (lines + 1) // 2
+    vertical = lines // 2
+    # stations per line, solving horizontal * n + vertical * n - crossings = stations
+    per_line = max(2, math.ceil((stations + horizontal * vertical) / lines))
+    step = (corners + 1) * CELL
+
+    rows = _spread(horizontal, per_line)
+    columns = _spread(vertical, per_line)
+    center = (per_line - 1) * step / 2
+    metro_map = Map()
+
+    def station_at(column: int, row: int) -> Node:
+        """Return the station at the given lattice position, creating it if needed."""
+        name = 'S' + str(column) + '-' + str(row)
+        try:
+            return metro_map.get_node(name)
+        except ValueError:
+            x, y = column * step, row * step
+            if zone_layout == 'rings':
+                # the distance to the center, from 0 at the center to 1 in the corners
+                position = math.hypot(x - center, y - center) / (center * math.sqrt(2) or 1)
+            else:
+                position = x / (2 * center or 1)
+            node = Node(name, (x, y), True, str(min(zones - 1, int(position * zones))))
+            metro_map.add_node(node)
+            return node
+
+    for line, row in enumerate(rows):
+        stops = [station_at(column, row) for column in range(per_line)]
+        _connect(metro_map, stops, corners, LINE_COLORS[line % len(LINE_COLORS)])
+
+    for line, column in enumerate(columns, start=horizontal):
+        stops = [station_at(column, row) for row in range(per_line)]
+        _connect(metro_map, stops, corners, LINE_COLORS[line % len(LINE_COLORS)])
+
+    return metro_map
+
+
+def _spread(count: int, positions: int) -> list[int]:
+    """Return count distinct positions spread evenly over range(positions)."""
+    if count == 0:
+        return []
+
+    return sorted({round((i + 0.5) * positions / count - 0.5) for i in range(count)})
+
+
+def _connect(metro_map: Map, stops: list[Node], corners: int, color: str) -> None:
+    """Add tracks of color between consecutive stops, through corners corner nodes each."""
+    for start, end in zip(stops, stops[1:]):
+        previous = start
+        for i in range(1, corners + 1):
+            coordinates = (start.coordinates[0] + (end.coordinates[0] - start.coordinates[0])
+                           * i // (corners + 1),
+                           start.coordinates[1] + (end.coordinates[1] - start.coordinates[1])
+                           * i // (corners + 1))
+            corner = Node(corner_name(coordinates), coordinates, False, '')
+            metro_map.add_node(corner)
+            previous.add_track(corner, color)
+            previous = corner
+
+        previous.add_track(end, color)
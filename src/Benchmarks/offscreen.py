@@ -0,0 +1,75 @@
+"""Measures the throughput, in images per second, of rendering route posters
+of a full generated city to PNG (with and without the cached base layer and the
+process pool) and to SVG.
+
+Run from the repository root:
+    python -m src.Benchmarks.offscreen
+"""
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from src.Benchmarks.map_generator import generate_map
+from src.Display.Render.offscreen import BaseLayer, render_map, render_routes, route_file_name
+from src.Display.Render.svg import save_svg
+
+
+def run(stations: int = 1000, images: int = 32, processes: int = os.cpu_count() or 1) -> None:
+    """Print the images per second of each way of rendering images route posters."""
+    pygame.font.init()
+    metro_map = generate_map(stations, lines=8, corners=1)
+    metro_map.update_weights()
+    names = sorted(node.name for node in metro_map.get_all_nodes('station'))
+    rng = random.Random(0)
+    queries = [(*rng.sample(names, 2), rng.choice(('distance', 'cost'))) for _ in range(images)]
+    print(f'{len(names)} stations, {len(metro_map.get_all_nodes())} nodes, {images} routes')
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        paths = [metro_map.optimized_route_ids(metro_map.get_id(start),
+                                               metro_map.get_id(destination), optimization,
+                                               strategy='astar')
+                 for start, destination, optimization in queries]
+        routing = time.perf_counter() - start
+        print(f'  {"routing only":<32} {images / routing:8.1f} routes/s')
+
+        start = time.perf_counter()
+        pygame.image.save(render_map(metro_map), os.path.join(out_dir, 'map.png'))
+        _report('PNG of the whole map', 1, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i, query in enumerate(queries):
+            layer = BaseLayer(metro_map, (800, 800))
+            pygame.image.save(layer.render_route(paths[i]),
+                              os.path.join(out_dir, route_file_name(i, query)))
+        _report('PNG, base layer per image', images, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        layer = BaseLayer(metro_map, (800, 800))
+        for i, query in enumerate(queries):
+            pygame.image.save(layer.render_route(paths[i]),
+                              os.path.join(out_dir, route_file_name(i, query)))
+        _report('PNG, cached base layer', images, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i, query in enumerate(queries):
+            save_svg(metro_map, os.path.join(out_dir, str(i) + '.svg'), path=paths[i])
+        _report('SVG', images, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        render_routes(metro_map, queries, out_dir, processes=processes)
+        _report(f'PNG + routing, {processes} processes', images, time.perf_counter() - start)
+
+
+def _report(label: str, images: int, seconds: float) -> None:
+    """Print the throughput of rendering images in seconds."""
+    print(f'  {label:<32} {images / seconds:8.1f} images/s')
+
+
+if __name__ == '__main__':
+    run()
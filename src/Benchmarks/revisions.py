@@ -0,0 +1,156 @@
+"""Checks the revisions of stored maps and times how cheaply they are polled.
+
+Random edits are written to generated cities by write_deltas, store_map and the
+GeoJSON importer, and after each write the content hash of the revision must be
+the hash of the rows actually stored, and the counter must have gone up only if
+the rows changed. A RevisionWatcher in this process must then report exactly the
+cities which a worker process changed.
+
+Run from the repository root:
+    python -m src.Benchmarks.revisions
+"""
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from src.Benchmarks.map_generator import generate_map
+from src.Display.Utils import importer, storage_manager
+from src.Display.Utils.storage_manager import DELETE_CONNECTION, INSERT_CONNECTION, \
+    RevisionWatcher
+
+# The number of random writes checked per city
+WRITES = 50
+
+# The number of polls timed
+POLLS = 100000
+
+
+def _stored_hash(conn: sqlite3.Connection, city: str) -> str:
+    """Return the hash of the rows of city as they are stored, hashed from scratch."""
+    return format(storage_manager.snapshot_hash(storage_manager.read_snapshot(conn, city)),
+                  '016x')
+
+
+def check_writes(cities: int = 3, stations: int = 300, seed: int = 0) -> int:
+    """Write random edits to cities generated cities and return the number of failed checks."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(storage_manager.DB_PATH)
+    failures = 0
+
+    for i in range(cities):
+        city = 'city' + str(i)
+        metro_map = generate_map(stations, lines=4, corners=1)
+        storage_manager.store_map(city, metro_map.get_all_nodes())
+        counter = storage_manager.get_revision(city).counter
+        nodes = list(metro_map.get_all_nodes())
+
+        for _ in range(WRITES):
+            node_1, node_2 = rng.sample(nodes, 2)
+            row_1 = (city, node_1.name, node_2.name, 'pink')
+            row_2 = (city, node_2.name, node_1.name, 'pink')
+            kind = rng.choice(('deltas', 'deltas', 'store', 'unchanged'))
+            if kind == 'deltas' and not node_1.is_adjacent(node_2):
+                # a track is added and removed again, which must restore the hash
+                before = storage_manager.get_revision(city).content_hash
+                storage_manager.write_deltas(conn, city, [(INSERT_CONNECTION, row_1),
+                                                          (INSERT_CONNECTION, row_2)])
+                failures += storage_manager.get_revision(city).content_hash \
+                    != _stored_hash(conn, city)
+                storage_manager.write_deltas(conn, city, [(DELETE_CONNECTION, row_1),
+                                                          (DELETE_CONNECTION, row_2)])
+                failures += storage_manager.get_revision(city).content_hash != before
+                counter += 2
+            elif kind == 'store':
+                if node_1.is_adjacent(node_2):
+                    node_1.remove_track(node_2)
+                else:
+                    node_1.add_track(node_2, 'pink')
+                storage_manager.write_snapshot(conn, storage_manager.snapshot_map(
+                    city, metro_map.get_all_nodes()))
+                counter += 1
+            elif kind == 'unchanged':
+                storage_manager.write_snapshot(conn, storage_manager.read_snapshot(conn, city))
+
+            revision = storage_manager.get_revision(city)
+            failures += revision.counter != counter
+            failures += revision.content_hash != _stored_hash(conn, city)
+
+    # a map reached through different writes has the hash of its rows
+    metro_map = generate_map(stations, lines=4, corners=1)
+    storage_manager.store_map('copy', metro_map.get_all_nodes())
+    storage_manager.store_map('city0', metro_map.get_all_nodes())
+    failures += storage_manager.get_revision('copy').content_hash \
+        != storage_manager.get_revision('city0').content_hash
+
+    # an imported map has the hash of the rows the importer wrote
+    path = os.path.join(os.path.dirname(storage_manager.DB_PATH), 'line.geojson')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature', 'properties': {'name': 'A'},
+             'geometry': {'type': 'Point', 'coordinates': [-79.40, 43.65]}},
+            {'type': 'Feature', 'properties': {'name': 'B'},
+             'geometry': {'type': 'Point', 'coordinates': [-79.38, 43.66]}},
+            {'type': 'Feature', 'properties': {'color': 'red'},
+             'geometry': {'type': 'LineString',
+                          'coordinates': [[-79.40, 43.65], [-79.38, 43.66]]}}]}, file)
+    importer.import_geojson('imported', path)
+    failures += storage_manager.get_revision('imported').content_hash \
+        != _stored_hash(conn, 'imported')
+
+    conn.close()
+    print(f'{cities * WRITES} writes checked, {failures} failures')
+    return failures
+
+
+def _edit_city(db_path: str, city: str) -> None:
+    """Store an edit of city in a worker process."""
+    storage_manager.DB_PATH = db_path
+    metro_map = storage_manager.get_map(city)
+    stations = sorted(metro_map.get_all_nodes('station'), key=lambda node: node.name)
+    stations[0].zone = 'edited'
+    storage_manager.store_map(city, metro_map.get_all_nodes())
+
+
+def check_watcher() -> int:
+    """Return the number of failed checks of a watcher of the changes of another process."""
+    watcher = RevisionWatcher()
+    failures = watcher.poll() != sorted(storage_manager.get_revisions())
+    failures += watcher.poll() != []
+
+    process = multiprocessing.Process(target=_edit_city,
+                                      args=(os.path.abspath(storage_manager.DB_PATH), 'city1'))
+    process.start()
+    process.join()
+    failures += watcher.poll() != ['city1']
+    failures += watcher.poll() != []
+
+    start = time.perf_counter()
+    for _ in range(POLLS):
+        watcher.poll()
+    unchanged = (time.perf_counter() - start) / POLLS
+
+    start = time.perf_counter()
+    for _ in range(POLLS // 10):
+        storage_manager.get_revisions()
+    table = (time.perf_counter() - start) / (POLLS // 10)
+    watcher.close()
+
+    print(f'watcher: {failures} failures | {unchanged * 1e6:.1f} us per poll without changes '
+          f'| {table * 1e6:.1f} us per read of the revisions table')
+    return failures
+
+
+def run() -> None:
+    """Run the checks on a temporary database."""
+    storage_manager.DB_PATH = os.path.join(tempfile.mkdtemp(), 'map_storage.db')
+    storage_manager.init_db()
+    check_writes()
+    check_watcher()
+
+
+if __name__ == '__main__':
+    run()
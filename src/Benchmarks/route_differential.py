@@ -0,0 +1,146 @@
+"""Randomized differential test of the route search strategies of Map: on random
+maps, with and without landmarks, every strategy must find a route along tracks
+of the map, between the right stations, with the score of the route found by the
+original 'queue' strategy.
+
+The random maps include corners joining more than two tracks, and maps of
+several parts, between which 'astar' and 'bidirectional' must raise ValueError.
+Exits with status 1 if any check fails.
+
+Run from the repository root:
+    python -m src.Benchmarks.route_differential [--maps 200] [--seed 0]
+"""
+import argparse
+import random
+import sys
+
+from src.Base.map import Map, STRATEGIES
+from src.Base.node import Node, corner_name
+from src.Benchmarks.map_generator import generate_map
+
+# The relative difference of scores which is put down to rounding
+TOLERANCE = 1e-9
+
+# The route queries checked per map and optimization
+QUERIES = 10
+
+
+def random_map(rng: random.Random, size: int, parts: int = 1) -> Map:
+    """Return a map of size nodes on a small lattice, made of parts connected parts,
+    each a random tree with a few more tracks."""
+    metro_map = Map()
+    points = rng.sample([(x * 40, y * 40) for x in range(size) for y in range(size)], size)
+    stations = set(rng.sample(range(size), max(2, size // 3)))
+    names = []
+
+    for i, point in enumerate(points):
+        name = 'S' + str(i) if i in stations else corner_name(point)
+        metro_map.add_node(Node(name, point, i in stations, str(rng.randrange(4))))
+        names.append(name)
+
+    for i in range(1, size):
+        # nodes only join nodes of the same part, which is their index modulo parts
+        earlier = range(i % parts, i, parts)
+        if earlier:
+            metro_map.add_track(names[i], names[rng.choice(earlier)], 'blue')
+
+    for _ in range(size // 4):
+        i, j = rng.sample(range(size), 2)
+        if i % parts == j % parts and not metro_map.get_node(names[i]).is_adjacent(
+                metro_map.get_node(names[j])):
+            metro_map.add_track(names[i], names[j], 'red')
+
+    metro_map.update_weights()
+    return metro_map
+
+
+def score(metro_map: Map, path: list[int], optimization: str) -> float:
+    """Return the score of path, a route of metro_map, or raise ValueError if it does
+    not follow tracks."""
+    total = 0
+    for id_1, id_2 in zip(path, path[1:]):
+        node_1, node_2 = metro_map.get_node_by_id(id_1), metro_map.get_node_by_id(id_2)
+        if not node_1.is_adjacent(node_2):
+            raise ValueError
+        total += node_1.get_weight(node_2, optimization)
+
+    return total
+
+
+def check_map(metro_map: Map, rng: random.Random, label: str) -> list[str]:
+    """Return a description of every failed check of the strategies on metro_map."""
+    failures = []
+    count = len(metro_map.get_all_nodes())
+
+    for optimization in ('distance', 'cost'):
+        for _ in range(QUERIES):
+            start, destination = rng.randrange(count), rng.randrange(count)
+            reference = metro_map.optimized_route_ids(start, destination, optimization, 'queue')
+            reachable = reference[0] == start
+            expected = score(metro_map, reference, optimization) if reachable else None
+
+            for strategy in STRATEGIES[1:]:
+                query = f'{label} {optimization} {strategy} {start}->{destination}'
+                try:
+                    path = metro_map.optimized_route_ids(start, destination, optimization,
+                                                         strategy)
+                except ValueError:
+                    if reachable:
+                        failures.append(query + ': no route found')
+                    continue
+
+                if not reachable:
+                    failures.append(query + ': route found to an unreachable node')
+                elif path[0] != start or path[-1] != destination:
+                    failures.append(query + ': wrong ends')
+                else:
+                    try:
+                        found = score(metro_map, path, optimization)
+                    except ValueError:
+                        failures.append(query + ': route leaves the tracks')
+                        continue
+                    if abs(found - expected) > TOLERANCE * max(1.0, expected):
+                        failures.append(f'{query}: score {found} instead of {expected}')
+
+    return failures
+
+
+def run(maps: int = 200, seed: int = 0) -> list[str]:
+    """Check the strategies on maps random maps, and return the failures."""
+    rng = random.Random(seed)
+    failures = []
+
+    for i in range(maps):
+        if i % 10 == 0:
+            metro_map = generate_map(rng.randrange(2, 200), lines=rng.randrange(1, 9),
+                                     corners=rng.randrange(3),
+                                     zone_layout=rng.choice(('rings', 'bands')))
+            metro_map.update_weights()
+        else:
+            metro_map = random_map(rng, rng.randrange(2, 120), parts=rng.choice((1, 1, 2)))
+
+        label = 'map ' + str(i)
+        failures.extend(check_map(metro_map, rng, label))
+        metro_map.prepare_landmarks(rng.randrange(1, 9))
+        failures.extend(check_map(metro_map, rng, label + ' (landmarks)'))
+
+    return failures
+
+
+def main() -> None:
+    """Run the differential test from the command line."""
+    parser = argparse.ArgumentParser(description='Differential test of the route strategies.')
+    parser.add_argument('--maps', type=int, default=200, help='the number of random maps')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the random maps')
+    args = parser.parse_args()
+
+    failures = run(args.maps, args.seed)
+    for failure in failures[:50]:
+        print('FAIL ' + failure)
+    print(f'{args.maps} maps checked, {len(failures)} failures')
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
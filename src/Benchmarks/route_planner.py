@@ -0,0 +1,191 @@
+"""Measures how long the main loop of a Client stalls while routes are found on a
+large generated map, when they are found in the loop and when they are found by the
+RoutePlanner in the background, for a rider who clicks new stations faster than
+the routes are found.
+
+The loop only sleeps for a millisecond per iteration, in place of drawing and
+waiting for events, so every longer gap between iterations is a stall. The route
+applied last must be the route of the last click.
+
+It checks that asking for the same route again gives its result again, and then
+measures how long a click takes to get its route when the route to the
+station under the cursor is prefetched: after choosing a start, the rider sweeps
+the cursor over SWEEP stations, a HOVER_INTERVAL apart, and rests on the end for
+DWELL seconds before clicking it.
+
+Run from the repository root:
+    python -m src.Benchmarks.route_planner
+"""
+import random
+import time
+from typing import Optional
+
+from src.Base.map import Map
+from src.Benchmarks.map_generator import generate_map
+from src.Display.Utils.route_planner import RoutePlanner, RouteQuery, RouteResult
+
+# The seconds between two clicks of the rider
+CLICK_INTERVAL = 0.02
+
+# The number of clicks
+CLICKS = 30
+
+# The number of stations swept over before the end is hovered
+SWEEP = 20
+
+# The seconds between two hover events
+HOVER_INTERVAL = 0.008
+
+# The seconds the cursor rests on the end before it is clicked
+DWELL = 0.15
+
+
+def _loop(metro_map: Map, queries: list[RouteQuery],
+          planner: Optional[RoutePlanner]) -> tuple[list[float], float, list[int]]:
+    """Run a loop in which a query of queries is asked every CLICK_INTERVAL seconds, in
+    the loop if planner is None and by planner otherwise, until the route of the last
+    query is applied. Return the gaps between the iterations, the seconds from the
+    last click to its route, and the route applied last."""
+    gaps, path = [], []
+    clicks = 0
+    start = previous = time.perf_counter()
+    last_click = 0.0
+
+    while True:
+        now = time.perf_counter()
+        gaps.append(now - previous)
+        previous = now
+
+        if clicks < len(queries) and now - start >= clicks * CLICK_INTERVAL:
+            query = queries[clicks]
+            clicks += 1
+            last_click = time.perf_counter()
+            if planner is None:
+                path = metro_map.optimized_route_ids(query.start, query.destination,
+                                                     query.optimization)
+            else:
+                planner.request(metro_map, query)
+
+        if planner is not None and (result := planner.take_result()) is not None:
+            path = result.path
+            if result.query == queries[-1]:
+                return gaps, time.perf_counter() - last_click, path
+        elif planner is None and clicks == len(queries):
+            return gaps, time.perf_counter() - last_click, path
+
+        time.sleep(0.001)
+
+
+def _click(planner: RoutePlanner, metro_map: Map, start: int, sweep: list[int],
+           query: RouteQuery, prefetch: bool) -> tuple[float, int]:
+    """Sweep the cursor over the stations of sweep, then over the destination of query,
+    prefetching the route to every station under it if prefetch, and click the
+    destination. Return the seconds from the click to its route and the number of
+    hover events."""
+    hovered = sweep + [query.destination] * round(DWELL / HOVER_INTERVAL)
+    for station in hovered:
+        if prefetch:
+            planner.prefetch(metro_map, RouteQuery(start, station, query.optimization))
+        time.sleep(HOVER_INTERVAL)
+
+    clicked = time.perf_counter()
+    planner.request(metro_map, query)
+    while (result := planner.take_result()) is None or result.query != query:
+        time.sleep(0.0001)
+    return time.perf_counter() - clicked, len(hovered)
+
+
+def run_prefetch(size: int = 20000, clicks: int = 10) -> None:
+    """Print the time from a click to its route, with and without prefetching, on a
+    map of size stations."""
+    metro_map = generate_map(size, lines=8, corners=3, zones=6)
+    metro_map.update_weights()
+    metro_map.prepare_landmarks()
+    stations = [node.node_id for node in metro_map.get_all_nodes('station')]
+    print(f'{size} stations: {clicks} clicks, each after sweeping over {SWEEP} stations '
+          f'{HOVER_INTERVAL * 1000:.0f} ms apart and resting {DWELL * 1000:.0f} ms on the end')
+
+    for prefetch in (False, True):
+        rng = random.Random(size)
+        planner = RoutePlanner(0)
+        latencies, hovers = [], 0
+        for _ in range(clicks):
+            start, destination, *sweep = rng.sample(stations, SWEEP + 2)
+            query = RouteQuery(start, destination, rng.choice(('distance', 'cost')))
+            latency, hovered = _click(planner, metro_map, start, sweep, query, prefetch)
+            latencies.append(latency)
+            hovers += hovered
+        planner.close()
+        latencies.sort()
+        print(f'  {"prefetch" if prefetch else "no prefetch":<12} median click to route '
+              f'{latencies[len(latencies) // 2] * 1000:6.2f} ms | slowest '
+              f'{latencies[-1] * 1000:6.2f} ms | {planner.prefetches} prefetches for {hovers} '
+              f'hover events | {planner.hits} cache hits')
+
+
+def _take_result(planner: RoutePlanner, timeout: float = 5.0) -> Optional[RouteResult]:
+    """Return the result taken from planner once it is ready, or None after timeout
+    seconds."""
+    deadline = time.perf_counter() + timeout
+    while (result := planner.take_result()) is None and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    return result
+
+
+def check_repeat(stations: int = 2000) -> int:
+    """Return the number of failed checks of asking a planner for the same route
+    again, while it is being found and after its result was taken, as a rider does by
+    clicking the same end station twice."""
+    metro_map = generate_map(stations, lines=8, corners=3)
+    metro_map.update_weights()
+    ids = sorted(node.node_id for node in metro_map.get_all_nodes('station'))
+    query = RouteQuery(ids[0], ids[-1], 'cost')
+    expected = metro_map.optimized_route_ids(query.start, query.destination, query.optimization)
+    planner = RoutePlanner(0)
+
+    future = planner.request(metro_map, query)
+    failures = planner.request(metro_map, query) is not future
+    first = _take_result(planner)
+    failures += first is None or first.path != expected
+
+    # the result was taken, so asking again must give it again rather than nothing
+    planner.request(metro_map, query)
+    again = _take_result(planner)
+    failures += again is None or again.path != expected
+    failures += planner.is_pending()
+    planner.close()
+
+    print(f'repeated request: {failures} failures')
+    return failures
+
+
+def run(sizes: tuple[int, ...] = (2000, 20000)) -> None:
+    """Print the stalls of the main loop on maps of sizes stations."""
+    for size in sizes:
+        metro_map = generate_map(size, lines=8, corners=3, zones=6)
+        metro_map.update_weights()
+        metro_map.prepare_landmarks()
+        stations = [node.node_id for node in metro_map.get_all_nodes('station')]
+        rng = random.Random(size)
+        queries = [RouteQuery(*rng.sample(stations, 2), rng.choice(('distance', 'cost')))
+                   for _ in range(CLICKS)]
+        expected = metro_map.optimized_route_ids(queries[-1].start, queries[-1].destination,
+                                                 queries[-1].optimization)
+        print(f'{size} stations, {len(metro_map.get_all_nodes())} nodes, {CLICKS} clicks '
+              f'{CLICK_INTERVAL * 1000:.0f} ms apart')
+
+        for name in ('in the loop', 'planner'):
+            planner = RoutePlanner(0) if name == 'planner' else None
+            gaps, latency, path = _loop(metro_map, queries, planner)
+            if planner is not None:
+                planner.close()
+            gaps.sort()
+            print(f'  {name:<12} longest stall {gaps[-1] * 1000:7.1f} ms | 99th percentile '
+                  f'{gaps[int(len(gaps) * 0.99)] * 1000:6.1f} ms | last route after '
+                  f'{latency * 1000:6.1f} ms | correct: {path == expected}')
+
+
+if __name__ == '__main__':
+    check_repeat()
+    run()
+    run_prefetch()
@@ -0,0 +1,146 @@
+"""Measures the end-to-end throughput of the sharded routing service on generated
+cities stored in a temporary database, with every route node and the router in a
+process of its own, and client threads sending route queries to the router.
+
+Nodes join the ring one at a time, and the throughput is measured at every size,
+together with the cities which moved and how many cities every node keeps loaded.
+A node then leaves gracefully, and another one is killed, after which every query
+must still be answered through the nodes which take its cities over. Every reply
+checked must have the score of the route found on the map in this process.
+
+Run from the repository root:
+    python -m src.Benchmarks.routing_service
+"""
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+from src.Base.map import Map
+from src.Benchmarks.map_generator import generate_map
+from src.Display.Utils import storage_manager
+from src.Display.Utils.routing_service import Connection, HOST, RouteNode, Router, make_server
+
+# The number of stored cities
+CITIES = 12
+
+# The number of stations of every city
+STATIONS = 1000
+
+# The number of client threads
+CLIENTS = 4
+
+# The seconds every throughput is measured for
+DURATION = 3.0
+
+
+def _serve(db_path: str, role: str, ports: multiprocessing.Queue) -> None:
+    """Serve a route node or an empty router on a free port, which is put into ports."""
+    storage_manager.DB_PATH = db_path
+    server = make_server((HOST, 0), RouteNode() if role == 'node' else Router())
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+def _score(metro_map: Map, path: list[str], optimization: str) -> float:
+    """Return the total weight of the tracks of path on metro_map."""
+    return sum(metro_map.get_track_weight(path[i], path[i + 1], optimization)
+               for i in range(len(path) - 1))
+
+
+def _throughput(router: int, queries: list[tuple[str, str, str, str]],
+                maps: dict[str, Map]) -> tuple[float, int, int]:
+    """Send queries from CLIENTS threads to router for DURATION seconds, and return the
+    queries answered per second, the number of errors and of wrong scores."""
+    counts, errors, wrong = [0] * CLIENTS, [0] * CLIENTS, [0] * CLIENTS
+    deadline = time.perf_counter() + DURATION
+
+    def client(index: int) -> None:
+        """Send queries until the deadline."""
+        rng = random.Random(index)
+        with Connection((HOST, router)) as connection:
+            while time.perf_counter() < deadline:
+                city, start, destination, optimization = rng.choice(queries)
+                reply = connection.request({'op': 'route', 'city': city, 'start': start,
+                                            'destination': destination,
+                                            'optimization': optimization})
+                counts[index] += 1
+                if 'path' not in reply:
+                    errors[index] += 1
+                elif counts[index] % 10 == 0:
+                    expected = maps[city].optimized_route(start, destination, optimization)
+                    wrong[index] += abs(_score(maps[city], reply['path'], optimization)
+                                        - _score(maps[city], expected, optimization)) > 1e-6
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(CLIENTS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return sum(counts) / (time.perf_counter() - start), sum(errors), sum(wrong)
+
+
+def run(nodes: int = 4) -> None:
+    """Print the throughput of the service as nodes join and leave."""
+    context = multiprocessing.get_context('spawn')
+    storage_manager.DB_PATH = os.path.join(tempfile.mkdtemp(), 'map_storage.db')
+    storage_manager.init_db()
+    maps, queries = {}, []
+    rng = random.Random(0)
+    for i in range(CITIES):
+        city = 'city' + str(i)
+        maps[city] = generate_map(STATIONS, lines=8, corners=1, zones=6)
+        storage_manager.store_map(city, maps[city].get_all_nodes())
+        maps[city].update_weights()
+        maps[city].prepare_landmarks()
+        names = [node.name for node in maps[city].get_all_nodes('station')]
+        queries.extend((city, *rng.sample(names, 2), rng.choice(('distance', 'cost')))
+                       for _ in range(50))
+
+    ports = context.Queue()
+    processes = {}
+    for role in ['router'] + ['node'] * nodes:
+        process = context.Process(target=_serve, args=(storage_manager.DB_PATH, role, ports),
+                                  daemon=True)
+        process.start()
+        processes[ports.get()] = (role, process)
+    router = next(port for port, (role, _) in processes.items() if role == 'router')
+    node_ports = [port for port, (role, _) in processes.items() if role == 'node']
+    print(f'{CITIES} cities of {STATIONS} stations, {CLIENTS} clients, {os.cpu_count()} CPUs')
+
+    with Connection((HOST, router)) as admin:
+        for count, port in enumerate(node_ports, 1):
+            start = time.perf_counter()
+            moved = admin.request({'op': 'join', 'address': [HOST, port]})['moved']
+            joined = time.perf_counter() - start
+            loaded = []
+            for other in node_ports[:count]:
+                with Connection((HOST, other)) as connection:
+                    loaded.append(len(connection.request({'op': 'cities'})['cities']))
+            rate, errors, wrong = _throughput(router, queries, maps)
+            print(f'  {count} nodes | {len(moved):2} cities moved in {joined:5.2f} s | cities '
+                  f'loaded per node {loaded} | {rate:7.1f} queries/s | {errors} errors | '
+                  f'{wrong} wrong')
+
+        moved = admin.request({'op': 'leave', 'address': [HOST, node_ports[0]]})['moved']
+        rate, errors, wrong = _throughput(router, queries, maps)
+        print(f'  node left  | {len(moved):2} cities moved | {rate:7.1f} queries/s | '
+              f'{errors} errors | {wrong} wrong')
+
+        processes[node_ports[1]][1].kill()
+        processes[node_ports[1]][1].join()
+        rate, errors, wrong = _throughput(router, queries, maps)
+        owners = admin.request({'op': 'owners'})['owners']
+        print(f'  node killed | {rate:7.1f} queries/s | {errors} errors | {wrong} wrong | '
+              f'owners now {sorted({port for _, port in owners.values()})}')
+
+    for _, process in processes.values():
+        process.kill()
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,113 @@
+"""Tracks the start-up of OpenMetroGuide: the time of importing the home module, as
+reported by python -X importtime, whether importing it loaded pygame or the
+database, and the time from the start of a fresh process to the first frame of
+the home screen and to the list of stored cities, under the dummy SDL video driver.
+
+Run from the repository root:
+    python -m src.Benchmarks.startup
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# The module whose import is timed
+HOME = 'src.Display.Navigation.home'
+
+# The number of slowest modules reported
+SLOWEST = 8
+
+# The program which imports the home module and reports what the import loaded
+IMPORT_PROGRAM = f'''
+import json, sys
+import {HOME}
+print(json.dumps({{'pygame': 'pygame' in sys.modules,
+                  'storage': 'src.Display.Utils.storage_manager' in sys.modules}}))
+'''
+
+# The program which runs the home screen until the cities are loaded, and reports the
+# times of the first frame and of the cities, from the start of the process
+RUN_PROGRAM = '''
+import json, sys, time
+start = time.perf_counter()
+from src.Display.Navigation import home
+from src.Display.Utils import scheduler, storage_manager
+storage_manager.DB_PATH = sys.argv[1]
+times = {}
+load = home.CityLoader.run
+
+def run(self):
+    load(self)
+    times['cities'] = time.perf_counter() - start
+
+def frame_drawn(self):
+    times.setdefault('frame', time.perf_counter() - start)
+    self._dirty = False
+    if 'cities' in times and home.queue_lst:
+        import pygame
+        pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+home.CityLoader.run = run
+scheduler.FrameScheduler.frame_drawn = frame_drawn
+try:
+    home.run_home()
+except SystemExit:
+    print(json.dumps(times))
+'''
+
+
+def _run(arguments: list[str]) -> subprocess.CompletedProcess:
+    """Run python with arguments in a fresh process from the repository root."""
+    environment = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy',
+                       PYGAME_HIDE_SUPPORT_PROMPT='1')
+    return subprocess.run([sys.executable, *arguments], capture_output=True, text=True,
+                          env=environment, check=True)
+
+
+def import_times() -> tuple[float, list[tuple[float, str]], dict[str, bool]]:
+    """Return the cumulative time of importing the home module, in seconds, the slowest
+    modules it imported with their cumulative times, and what the import loaded."""
+    process = _run(['-X', 'importtime', '-c', IMPORT_PROGRAM])
+    # every module is reported after the modules it imported, which are indented
+    modules, total = [], 0
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative [us] | module
+        parts = line[len('import time:'):].split('|')
+        if not line.startswith('import time:') or not parts[0].strip().isdigit():
+            continue
+        name = parts[2][1:]
+        if not name.startswith(' '):
+            if name == HOME:
+                total = int(parts[1]) / 1e6
+                break
+            modules = []
+        else:
+            modules.append((int(parts[1]) / 1e6, name.strip()))
+
+    slowest = sorted(modules, reverse=True)[:SLOWEST]
+    return total, slowest, json.loads(process.stdout.splitlines()[-1])
+
+
+def run() -> None:
+    """Print the start-up times."""
+    total, slowest, loaded = import_times()
+    print(f'import {HOME}: {total * 1000:.1f} ms | pygame loaded: {loaded["pygame"]} | '
+          f'database loaded: {loaded["storage"]}')
+    for seconds, name in slowest:
+        print(f'  {seconds * 1000:8.1f} ms  {name}')
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'map_storage.db')
+    _run(['-c', 'import sys\nfrom src.Display.Utils import storage_manager\n'
+                'from src.Benchmarks.map_generator import generate_map\n'
+                'storage_manager.DB_PATH = sys.argv[1]\nstorage_manager.init_db()\n'
+                'for i in range(4):\n'
+                '    storage_manager.store_map("city" + str(i), '
+                'generate_map(200).get_all_nodes())', db_path])
+    times = json.loads(_run(['-c', RUN_PROGRAM, db_path]).stdout.splitlines()[-1])
+    print(f'first frame after {times["frame"] * 1000:.1f} ms | cities loaded after '
+          f'{times["cities"] * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    run()
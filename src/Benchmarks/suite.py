@@ -0,0 +1,163 @@
+"""The benchmark suite of OpenMetroGuide: times route optimization, map
+validation, storage, Client start-up and frame rendering on generated cities
+of several sizes, under the dummy SDL video driver.
+
+The results are written as JSON, and can be compared with the results of an
+earlier run, so that regressions show up. The comparison exits with status 1 if
+any benchmark got slower than the allowed ratio.
+
+Run from the repository root:
+    python -m src.Benchmarks.suite [--sizes 100 300 1000] [--output results.json]
+                                   [--baseline earlier.json] [--threshold 1.2]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from src.Benchmarks.map_generator import generate_map
+from src.Display.Utils import storage_manager
+from src.Display.Canvas.admin import Admin
+from src.Display.Canvas.client import Client
+
+# The directory which OpenMetroGuide runs from, which its assets are loaded relative to
+NAVIGATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              '..', 'Display', 'Navigation')
+
+# The station counts of the default run
+DEFAULT_SIZES = (100, 300, 1000)
+
+# The number of routes optimized per optimization and city
+ROUTES = 5
+
+# The slowdown of the median time over the baseline which is reported as a regression
+DEFAULT_THRESHOLD = 1.2
+
+
+def time_calls(function: Callable[[], object], repeat: int) -> dict[str, float]:
+    """Return the minimum, median and mean time, in seconds, of repeat calls of function."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return {'repeat': repeat, 'min': min(times), 'median': statistics.median(times),
+            'mean': statistics.mean(times)}
+
+
+def run_suite(sizes: tuple[int, ...] = DEFAULT_SIZES, repeat: int = 5) -> dict:
+    """Run every benchmark on a generated city of each size in sizes, in stations,
+    and return the results."""
+    results = []
+    storage_manager.DB_PATH = os.path.join(tempfile.mkdtemp(), 'map_storage.db')
+    storage_manager.init_db()
+    cwd = os.getcwd()
+    os.chdir(NAVIGATION_DIR)
+
+    def record(name: str, stations: int, nodes: int, timing: dict[str, float]) -> None:
+        """Add the timing of a benchmark to the results and print it."""
+        results.append({'name': name, 'stations': stations, 'nodes': nodes, **timing})
+        print(f'  {name:<28} {timing["median"] * 1000:10.3f} ms (median of {timing["repeat"]})')
+
+    for size in sizes:
+        metro_map = generate_map(size, lines=8, corners=1)
+        nodes = len(metro_map.get_all_nodes())
+        city = 'bench' + str(size)
+        print(f'{size} stations, {nodes} nodes')
+
+        # a Client computes the weights of every track and the level of detail of the map
+        start = time.perf_counter()
+        client = Client(metro_map, city)
+        elapsed = time.perf_counter() - start
+        record('client_init', size, nodes,
+               {'repeat': 1, 'min': elapsed, 'median': elapsed, 'mean': elapsed})
+        record('update_weights', size, nodes, time_calls(metro_map.update_weights, repeat))
+
+        names = sorted(node.name for node in metro_map.get_all_nodes('station'))
+        rng = random.Random(size)
+        queries = [rng.sample(names, 2) for _ in range(ROUTES)]
+        for optimization in ('distance', 'cost'):
+            record('optimized_route[' + optimization + ']', size, nodes,
+                   time_calls(lambda: [metro_map.optimized_route(start, destination, optimization)
+                                       for start, destination in queries], repeat))
+
+        active_nodes = metro_map.get_all_nodes()
+        record('store_map', size, nodes,
+               time_calls(lambda: storage_manager.store_map(city, active_nodes), repeat))
+        record('get_map', size, nodes, time_calls(lambda: storage_manager.get_map(city), repeat))
+
+        client._draw_map()
+        record('client_frame', size, nodes, time_calls(client._draw_map, repeat))
+
+        admin = Admin(city, metro_map)
+        try:
+            record('is_proper_map', size, nodes, time_calls(admin.is_proper_map, repeat))
+            admin._draw_map()
+            record('admin_frame', size, nodes, time_calls(admin._draw_map, repeat))
+        finally:
+            admin._saver.close()
+
+    os.chdir(cwd)
+    return {'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                     'pygame': pygame.version.ver, 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                     'repeat': repeat},
+            'results': results}
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """Return a description of every benchmark of results whose median time is more than
+    threshold times its median time in baseline."""
+    earlier = {(result['name'], result['stations']): result for result in baseline['results']}
+    regressions = []
+
+    for result in results['results']:
+        before = earlier.get((result['name'], result['stations']))
+        if before is not None and result['median'] > threshold * before['median']:
+            regressions.append(f'{result["name"]} ({result["stations"]} stations): '
+                               f'{before["median"] * 1000:.3f} ms -> '
+                               f'{result["median"] * 1000:.3f} ms')
+
+    return regressions
+
+
+def main() -> None:
+    """Run the suite from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='station counts of the generated cities')
+    parser.add_argument('--repeat', type=int, default=5, help='calls timed per benchmark')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='file the JSON results are written to')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='slowdown over the baseline reported as a regression')
+    args = parser.parse_args()
+
+    pygame.init()
+    results = run_suite(tuple(args.sizes), args.repeat)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print('Results written to ' + args.output)
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Measures the memory of a generated map of about 100k nodes loaded from its
+rows, and the time of looking its nodes up by name and by ID.
+
+Run from the repository root:
+    python -m src.Benchmarks.symbols
+"""
+import gc
+import random
+import time
+import tracemalloc
+
+from src.Benchmarks.map_generator import generate_map
+from src.Display.Utils.storage_manager import build_map, create_rows_stations, \
+    create_connection_stations
+
+# The number of nodes looked up by each kind of lookup
+LOOKUPS = 1000000
+
+
+def run(stations: int = 50000) -> None:
+    """Print the memory and lookup times of a map of stations stations, and as many corners."""
+    metro_map = generate_map(stations, lines=8, corners=1)
+    nodes = metro_map.get_all_nodes()
+    # copies of the names, as every row read from the database has its own
+    node_rows = [(city, ''.join(name), *rest)
+                 for city, name, *rest in create_rows_stations('symbols', nodes)]
+    connection_rows = [(city, ''.join(name_1), ''.join(name_2), color)
+                       for city, name_1, name_2, color
+                       in create_connection_stations('symbols', nodes)]
+    del metro_map, nodes
+    gc.collect()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    metro_map = build_map(node_rows, connection_rows)
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    count = len(metro_map.get_all_nodes())
+    print(f'{count} nodes loaded in {elapsed:.2f} s | {memory / 2 ** 20:.1f} MiB, '
+          f'{memory / count:.0f} B per node')
+
+    rng = random.Random(0)
+    names = [''.join(row[1]) for row in rng.choices(node_rows, k=LOOKUPS)]
+    ids = [metro_map.get_id(name) for name in names]
+
+    start = time.perf_counter()
+    for name in names:
+        metro_map.get_node(name)
+    print(f'  {"lookup by name":<16} {(time.perf_counter() - start) / LOOKUPS * 1e9:6.0f} ns')
+
+    start = time.perf_counter()
+    for node_id in ids:
+        metro_map.get_node_by_id(node_id)
+    print(f'  {"lookup by ID":<16} {(time.perf_counter() - start) / LOOKUPS * 1e9:6.0f} ns')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,87 @@
+"""Measures the tiled renderer on a generated city many screens wide: the time
+of a frame with a cold and a warm tile cache, while panning across the city,
+and after a local edit, along with how many tiles each of these draws and the
+memory the cache takes up.
+
+Run from the repository root:
+    python -m src.Benchmarks.tile_render
+"""
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from src.Base.node import Node
+from src.Benchmarks.map_generator import generate_map
+from src.Display.Render.level_of_detail import LevelOfDetail
+from src.Display.Render import tiles as tiles_module
+from src.Display.Render.tiles import TileRenderer
+from src.Display.Render.view import ViewTransform
+from src.Display.Utils.general_utils import WIDTH, HEIGHT
+
+
+def run(stations: int = 20000, pan_frames: int = 600, budget: int = 32 * 1024 * 1024) -> None:
+    """Print the frame times of the tiled renderer on a city of about stations stations."""
+    screen = pygame.Surface((WIDTH, HEIGHT))
+    canvas = pygame.Rect(0, 0, WIDTH, HEIGHT)
+    metro_map = generate_map(stations, lines=16, corners=2)
+    nodes = metro_map.get_all_nodes()
+    width = max(node.coordinates[0] for node in nodes)
+    print(f'{len(nodes)} nodes, {width // WIDTH} screens wide')
+
+    drawn = [0]
+    get_tile = tiles_module.TileRenderer._get_tile
+
+    def counted(renderer: TileRenderer, key: tuple, level) -> pygame.Surface:
+        """Count the tiles which had to be drawn."""
+        drawn[0] += key not in renderer._tiles
+        return get_tile(renderer, key, level)
+
+    tiles_module.TileRenderer._get_tile = counted
+
+    start = time.perf_counter()
+    lod = LevelOfDetail(nodes)
+    print(f'  {"level of detail":<28} {(time.perf_counter() - start) * 1000:9.1f} ms')
+
+    renderer = TileRenderer(budget)
+    view = ViewTransform(zoom=1.5)
+
+    def frame(label: str) -> None:
+        """Draw one frame and report its time and the tiles it drew."""
+        drawn[0] = 0
+        start = time.perf_counter()
+        renderer.draw(screen, canvas, lod.get_level(view.zoom), view)
+        print(f'  {label:<28} {(time.perf_counter() - start) * 1000:9.2f} ms '
+              f'| {drawn[0]:3} tiles drawn | {renderer.get_memory() / 2 ** 20:6.1f} MiB')
+
+    frame('cold cache')
+    frame('warm cache')
+
+    start = time.perf_counter()
+    total = 0
+    for i in range(pan_frames):
+        drawn[0] = 0
+        view.pan(-7, -3)
+        renderer.draw(screen, canvas, lod.get_level(view.zoom), view)
+        total += drawn[0]
+    elapsed = time.perf_counter() - start
+    print(f'  {"panning (per frame)":<28} {elapsed / pan_frames * 1000:9.2f} ms '
+          f'| {total / pan_frames:5.2f} tiles drawn | {renderer.get_memory() / 2 ** 20:6.1f} MiB')
+
+    # a new station on a track in the middle of the screen
+    x, y = view.to_world((WIDTH // 2, HEIGHT // 2))
+    x, y = int(x) // 40 * 40, int(y) // 40 * 40
+    station = Node('Edit', (x, y), True, '0')
+    metro_map.add_node(station)
+    station.add_track(min(nodes, key=lambda node: abs(node.coordinates[0] - x)
+                          + abs(node.coordinates[1] - y)), 'blue')
+    lod = LevelOfDetail(metro_map.get_all_nodes())
+    frame('after a local edit')
+    frame('warm cache again')
+
+
+if __name__ == '__main__':
+    pygame.init()
+    run()
@@ -0,0 +1,242 @@
+"""Compares the latency of the earliest arrival searches of generated maps with
+stored schedules: RAPTOR, with the default bound of transfers and unbounded, and
+Dijkstra's algorithm on the time-expanded graph of the same timetable, whose
+nodes are the calls of every train at every station. Checks that unbounded
+RAPTOR and the time-expanded search find the same arrivals, there and on random
+maps with branching lines, and that the journeys of RAPTOR follow the tracks of
+their lines, within the bound of transfers.
+
+Run from the repository root:
+    python -m src.Benchmarks.timetable
+"""
+import bisect
+import heapq
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from src.Base.map import Map
+from src.Base.timetable import MAX_TRANSFERS, TRANSFER_TIME, Journey, Schedule, Timetable
+from src.Benchmarks.map_generator import LINE_COLORS, generate_map
+from src.Benchmarks.route_differential import random_map
+from src.Display.Utils import storage_manager
+
+# The number of earliest arrival queries timed per map
+QUERIES = 100
+
+# The morning service of the generated lines, in minutes after midnight
+SCHEDULES = [Schedule(color, 6 * 60, 10 * 60, 4 + i % 3, 80.0, 0.5)
+             for i, color in enumerate(LINE_COLORS)]
+
+
+class TimeExpandedGraph:
+    """The time-expanded graph of a timetable: a node for every call of a train at a
+    station, joined to its next call, and a node for every departure from a station,
+    joined to the next departure from the station (waiting) and to the call of its
+    train (boarding). A call is joined to the first departure from its station after
+    the transfer time (alighting).
+    """
+
+    # Private Instance Attributes:
+    #   - _times: The time of every node.
+    #   - _edges: The nodes every node is joined to.
+    #   - _station: The ID of the station of every call node, or -1 for departure nodes.
+    #   - _departures: The departure times and nodes of every station, in order, by ID.
+
+    _times: list[float]
+    _edges: list[list[int]]
+    _station: list[int]
+    _departures: dict[int, tuple[list[float], list[int]]]
+
+    def __init__(self, timetable: Timetable) -> None:
+        self._times, self._edges, self._station = [], [], []
+        events = {}
+        calls = []
+        for line in timetable.patterns:
+            for trip in range(len(line.departures)):
+                previous = -1
+                for position, stop in enumerate(line.stops):
+                    call = self._add_node(line.get_time(trip, position), stop)
+                    if previous != -1:
+                        self._edges[previous].append(call)
+                        calls.append(call)
+                    if position < len(line.stops) - 1:
+                        events.setdefault(stop, []).append((self._times[call], call))
+                    previous = call
+
+        self._departures = {}
+        for stop, departures in events.items():
+            departures.sort()
+            nodes = []
+            for departure, call in departures:
+                node = self._add_node(departure, -1)
+                self._edges[node].append(call)
+                if nodes:
+                    self._edges[nodes[-1]].append(node)
+                nodes.append(node)
+            self._departures[stop] = ([departure for departure, _ in departures], nodes)
+
+        for call in calls:
+            node = self._get_departure(self._station[call], self._times[call] + TRANSFER_TIME)
+            if node != -1:
+                self._edges[call].append(node)
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def _add_node(self, event_time: float, station: int) -> int:
+        """Add a node at event_time and return it."""
+        self._times.append(event_time)
+        self._edges.append([])
+        self._station.append(station)
+        return len(self._times) - 1
+
+    def _get_departure(self, station: int, after: float) -> int:
+        """Return the first departure node of station at or after the time after, or -1."""
+        times, nodes = self._departures.get(station, ([], []))
+        index = bisect.bisect_left(times, after)
+        return nodes[index] if index < len(nodes) else -1
+
+    def earliest_arrival(self, start: int, destination: int, departure: float) -> float:
+        """Return the earliest arrival at destination from start, leaving at or after
+        departure, or infinity if it cannot be reached."""
+        if start == destination:
+            return departure
+        source = self._get_departure(start, departure)
+        if source == -1:
+            return math.inf
+
+        settled = set()
+        queue = [(self._times[source], source)]
+        while queue:
+            event_time, node = heapq.heappop(queue)
+            if node in settled:
+                continue
+            settled.add(node)
+            if self._station[node] == destination:
+                return event_time
+            for target in self._edges[node]:
+                if target not in settled:
+                    heapq.heappush(queue, (self._times[target], target))
+
+        return math.inf
+
+
+def run(sizes: tuple[int, ...] = (500, 2000, 5000)) -> None:
+    """Print the latency of the earliest arrival searches on maps of sizes stations."""
+    storage_manager.DB_PATH = os.path.join(tempfile.mkdtemp(), 'map_storage.db')
+    storage_manager.init_db()
+    storage_manager.store_schedules('timetable', SCHEDULES)
+    schedules = storage_manager.get_schedules('timetable')
+
+    for size in sizes:
+        metro_map = generate_map(size, lines=8, corners=1)
+        start = time.perf_counter()
+        timetable = Timetable(metro_map, schedules)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        expanded = TimeExpandedGraph(timetable)
+        expanded_built = time.perf_counter() - start
+        print(f'{size} stations | timetable of {len(timetable.patterns)} patterns built in '
+              f'{built:.2f} s | time-expanded graph of {len(expanded)} nodes built in '
+              f'{expanded_built:.2f} s')
+
+        rng = random.Random(size)
+        stations = [node.node_id for node in metro_map.get_all_nodes('station')]
+        stations.sort()
+        queries = [(*rng.sample(stations, 2), rng.uniform(6 * 60, 8 * 60))
+                   for _ in range(QUERIES)]
+        searches = {f'raptor ({MAX_TRANSFERS} transfers)':
+                    lambda s, d, t: _arrival(timetable, s, d, t, MAX_TRANSFERS),
+                    'raptor (unbounded)':
+                    lambda s, d, t: _arrival(timetable, s, d, t, len(timetable.patterns)),
+                    'time-expanded': expanded.earliest_arrival}
+
+        arrivals = {}
+        for name, earliest_arrival in searches.items():
+            times = []
+            arrivals[name] = []
+            for source, destination, departure in queries:
+                start = time.perf_counter()
+                arrivals[name].append(earliest_arrival(source, destination, departure))
+                times.append(time.perf_counter() - start)
+            print(f'  {name:<24} {statistics.mean(times) * 1000:8.2f} ms | '
+                  f'{statistics.median(times) * 1000:8.2f} ms median')
+
+        wrong = sum(abs(a - b) > 1e-6 for a, b in zip(arrivals['raptor (unbounded)'],
+                                                       arrivals['time-expanded']))
+        later = sum(a > b + 1e-6 for a, b in zip(arrivals[f'raptor ({MAX_TRANSFERS} transfers)'],
+                                                  arrivals['time-expanded']))
+        print(f'  {wrong} different arrivals | {later} later with at most {MAX_TRANSFERS} '
+              f'transfers')
+
+
+def check(maps: int = 100, seed: int = 0) -> int:
+    """Print and return the number of failed checks of RAPTOR on maps random maps."""
+    rng = random.Random(seed)
+    failures = 0
+
+    for _ in range(maps):
+        metro_map = random_map(rng, rng.randrange(2, 80))
+        timetable = Timetable(metro_map, {color: Schedule(color, 6 * 60, 8 * 60,
+                                                          rng.randrange(2, 10))
+                                          for color in ('blue', 'red')})
+        expanded = TimeExpandedGraph(timetable)
+        stations = sorted(node.node_id for node in metro_map.get_all_nodes('station'))
+
+        for _ in range(QUERIES // 10):
+            source, destination = rng.choice(stations), rng.choice(stations)
+            departure = rng.uniform(6 * 60, 8 * 60)
+            expected = expanded.earliest_arrival(source, destination, departure)
+            for max_transfers in (0, 1, MAX_TRANSFERS, len(timetable.patterns)):
+                arrival = _arrival(timetable, source, destination, departure, max_transfers)
+                if arrival == math.inf:
+                    failures += max_transfers == len(timetable.patterns) and expected != math.inf
+                    continue
+                journey = timetable.earliest_arrival(source, destination, departure,
+                                                     max_transfers)
+                failures += not _follows_tracks(metro_map, journey, source, destination,
+                                                departure, max_transfers)
+                failures += arrival < expected - 1e-6 or (
+                    max_transfers == len(timetable.patterns) and arrival > expected + 1e-6)
+
+    print(f'{maps} random maps checked, {failures} failures')
+    return failures
+
+
+def _follows_tracks(metro_map: Map, journey: Journey, start: int, destination: int,
+                    departure: float, max_transfers: int) -> bool:
+    """Return whether journey leaves start after departure, rides along the tracks of
+    the color of every leg, makes its transfers in time and reaches destination."""
+    path = journey.get_path() or [start]
+    if path[0] != start or path[-1] != destination or len(journey.legs) > max_transfers + 1:
+        return False
+
+    ready = departure
+    for leg in journey.legs:
+        if leg.departure < ready - 1e-9 or leg.arrival < leg.departure:
+            return False
+        for id_1, id_2 in zip(leg.path, leg.path[1:]):
+            node_1, node_2 = metro_map.get_node_by_id(id_1), metro_map.get_node_by_id(id_2)
+            if not node_1.is_adjacent(node_2) or node_1.get_color(node_2) != leg.color:
+                return False
+        ready = leg.arrival + TRANSFER_TIME
+
+    return journey.arrival == (journey.legs[-1].arrival if journey.legs else departure)
+
+
+def _arrival(timetable: Timetable, start: int, destination: int, departure: float,
+             max_transfers: int) -> float:
+    """Return the earliest arrival found by RAPTOR, or infinity if there is none."""
+    try:
+        return timetable.earliest_arrival(start, destination, departure, max_transfers).arrival
+    except ValueError:
+        return math.inf
+
+
+if __name__ == '__main__':
+    check()
+    run()
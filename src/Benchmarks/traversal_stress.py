@@ -0,0 +1,77 @@
+"""Stress test of the graph traversals of Node and map on 50k-node linear and
+grid topologies, which exceed Python's recursion limit by far.
+
+Run from the repository root:
+    python -m src.Benchmarks.traversal_stress
+"""
+import time
+from typing import Callable
+
+from src.Base.map import QueueElement, get_path
+from src.Base.node import Node
+
+
+def build_line(n: int) -> list[Node]:
+    """Return the nodes of a line of n nodes with a station at both ends only."""
+    nodes = [Node(str((i * 40, 0)), (i * 40, 0), i in {0, n - 1}, str(i * 2 // n))
+             for i in range(n)]
+    for i in range(n - 1):
+        nodes[i].add_track(nodes[i + 1], 'blue')
+
+    return nodes
+
+
+def build_grid(side: int) -> list[Node]:
+    """Return the nodes of a side x side grid with a station in every corner of the grid."""
+    last = side - 1
+    nodes = [Node(str((x * 40, y * 40)), (x * 40, y * 40), x in {0, last} and y in {0, last},
+                  str(x * 2 // side)) for y in range(side) for x in range(side)]
+    for y in range(side):
+        for x in range(side):
+            if x < last:
+                nodes[y * side + x].add_track(nodes[y * side + x + 1], 'red')
+            if y < last:
+                nodes[y * side + x].add_track(nodes[(y + 1) * side + x], 'green')
+
+    return nodes
+
+
+def build_chain(n: int) -> QueueElement:
+    """Return the last QueueElement of a chain of n predecessors."""
+    element = None
+    for i in range(n):
+        element = QueueElement(i, i, 0, i, element)
+
+    return element
+
+
+def _time(label: str, function: Callable[[], object]) -> None:
+    """Print how long function takes to run, or the error it raises."""
+    start = time.perf_counter()
+    try:
+        function()
+    except RecursionError:
+        print(f'  {label:<28} RecursionError')
+    else:
+        print(f'  {label:<28} {(time.perf_counter() - start) * 1000:9.2f} ms')
+
+
+def run(n: int = 50_000) -> None:
+    """Time every traversal on a linear and a grid topology of about n nodes."""
+    side = int(n ** 0.5)
+    for title, nodes in (('line', build_line(n)), ('grid', build_grid(side))):
+        print(f'{title} ({len(nodes)} nodes)')
+        first, last, middle = nodes[0], nodes[-1], nodes[len(nodes) // 2 + 1]
+
+        _time('check_connected', lambda: first.check_connected(last, set()))
+        _time('add_connected', lambda: first.add_connected(set()))
+        _time('get_closest_station', lambda: middle.get_closest_station(set()))
+        _time('count_zones', lambda: middle.count_zones(nodes[len(nodes) // 2]))
+
+    print(f'chain ({n} elements)')
+    chain = build_chain(n)
+    _time('get_path', lambda: get_path(chain))
+
+
+if __name__ == '__main__':
+    run()
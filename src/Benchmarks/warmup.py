@@ -0,0 +1,67 @@
+"""Times the warm-up of several generated cities stored in a temporary database,
+one after the other in the foreground and with the warm-up service at several
+numbers of worker processes, and checks that the warmed up maps are the maps
+that are loaded from the database, with the weights that update_weights gives them.
+
+Run from the repository root:
+    python -m src.Benchmarks.warmup
+"""
+import os
+import tempfile
+import time
+
+from src.Benchmarks.map_generator import generate_map
+from src.Base.map import Map, check_map
+from src.Display.Utils import storage_manager
+from src.Display.Utils.warmup import WarmupService
+
+
+def _costs(metro_map: Map) -> list[tuple[str, str, float]]:
+    """Return the cost weight of every track of metro_map in either direction, sorted."""
+    return sorted((node.name, neighbour.name, cost) for node in metro_map.get_all_nodes()
+                  for neighbour, cost in node.get_weights('cost'))
+
+
+def run(cities: int = 8, stations: int = 2000, processes: tuple[int, ...] = (1, 2, 4)) -> None:
+    """Print the warm-up time of cities generated cities of stations to twice stations
+    stations."""
+    storage_manager.DB_PATH = os.path.join(tempfile.mkdtemp(), 'map_storage.db')
+    storage_manager.init_db()
+    names = ['city' + str(i) for i in range(cities)]
+    for i, name in enumerate(names):
+        metro_map = generate_map(stations + i * stations // cities, lines=8, corners=1)
+        storage_manager.store_map(name, metro_map.get_all_nodes())
+
+    start = time.perf_counter()
+    maps = {}
+    for name in names:
+        maps[name] = storage_manager.get_map(name)
+        maps[name].update_weights()
+        check_map(maps[name].get_all_nodes())
+    print(f'  {"foreground":<16} {time.perf_counter() - start:8.2f} s')
+    expected = {name: (storage_manager.snapshot_map(name, maps[name].get_all_nodes()),
+                       _costs(maps.pop(name))) for name in names}
+
+    for count in processes:
+        start = time.perf_counter()
+        service = WarmupService(count)
+        service.start(names)
+        reports = service.wait()
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        service.cache.get(names[-1])
+        taken = time.perf_counter() - start
+
+        mismatches = [name for name in names
+                      if (storage_manager.snapshot_map(
+                          name, service.cache.get(name).get_all_nodes()),
+                          _costs(service.cache.get(name))) != expected[name]]
+        statuses = {report.status or 'OK' for report in reports.values()}
+        print(f'  {str(count) + " processes":<16} {elapsed:8.2f} s | first map taken in '
+              f'{taken * 1000:7.1f} ms | {len(mismatches)} mismatched maps | '
+              f'status {", ".join(sorted(statuses))}')
+
+
+if __name__ == '__main__':
+    run()
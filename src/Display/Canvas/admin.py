@@ -3,7 +3,10 @@
 Admin is capable of creating and editing metro stations which
 will in turn be edited by other Admins or used by Clients."""
 
+import sqlite3
 import sys
+import time
+from dataclasses import dataclass, field
 from typing import Optional
 
 import pygame
@@ -11,94 +14,188 @@ from pygame.colordict import THECOLORS
 
 from src.Display.Utils.general_utils import WHITE, BLACK, draw_text, WIDTH, \
     HEIGHT, in_circle, PALETTE_WIDTH, initialize_screen
-from src.Base.map import Map
-from src.Base.node import Node
-from src.Display.Utils.storage_manager import init_db, store_map
+from src.Base.map import Map, check_map
+from src.Base.node import Node, corner_name
+from src.Display.Utils.persistence import PersistenceWorker
+from src.Display.Utils.edit_journal import EditJournal, Edit, ADD_NODE, REMOVE_NODE, \
+    ADD_TRACK, REMOVE_TRACK, REPLACE_CORNER
 from src.Display.Canvas.user import User
+from src.Display.Render.level_of_detail import LevelOfDetail
 
 LINE_COLORS = ['blue', 'red', 'yellow', 'green', 'brown', 'purple', 'orange',
                'pink']
 
+# Seconds between two autosaves of a modified map.
+AUTOSAVE_INTERVAL = 5
+
+# The input boxes of the station information dialog
+NAME_RECT = pygame.Rect((295, 45, 400, 27))
+ZONE_RECT = pygame.Rect((295, 115, 400, 27))
+
+
+@dataclass
+class StationPrompt:
+    """The state of the dialog in which the Admin enters the name and zone
+    of a new station.
+
+    Instance Attributes:
+        - coordinates: The coordinates of the new station on the map.
+        - replace: The corner which the new station replaces, if any.
+        - font: The font the entered text is rendered with.
+        - info: info[0] is the entered name, info[1] is the entered zone.
+        - info_active: Whether the name (info_active[0]) or the zone (info_active[1])
+        is the active input.
+        - chk: chk[0] is whether the dialog is still open, chk[1] is whether
+        the entered name already exists.
+    """
+    coordinates: tuple[int, int]
+    replace: Optional[Node]
+    font: pygame.font.Font
+    info: list[str] = field(default_factory=lambda: ['', ''])
+    info_active: list[bool] = field(default_factory=lambda: [True, False])
+    chk: list[bool] = field(default_factory=lambda: [True, False])
+
 
 class Admin(User):
     """Admin is the aspect of the User which creates the metro map
     using pygame mouse click event objects. Once the map has been created
     on the screen, it is converted to a Map object. If the metro map is not connected,
     the Admin is given the option of editing the map again.
+
+    Every change to active_nodes goes through an EditJournal, which provides undo/redo
+    (Ctrl + Z / Ctrl + Y). The journalled changes are autosaved in the background every
+    AUTOSAVE_INTERVAL seconds while the map is proper, and saved one final time on exit.
+    A failed save is retried in the background and shown on the screen, and the Admin
+    cannot exit until the map is saved.
     """
+    # Private Instance Attributes:
+    #   - _station_prompt: The open station information dialog, if any. While it is
+    #   open, the main loop displays it instead of the map.
+    #   - _journal: The journal through which active_nodes is edited.
+    #   - _saver: The background worker which writes the map to the database.
+    #   - _level_of_detail: The simplified geometry of active_nodes for every zoom level,
+    #   rebuilt when it is drawn after an edit.
+    #   - _lod_version: The version of the journal when _level_of_detail was built.
+    #   - _last_autosave: The time.monotonic() value at the last autosave.
+
     active_nodes: set[Node]
+    _station_prompt: Optional[StationPrompt]
+    _journal: EditJournal
+    _saver: PersistenceWorker
+    _level_of_detail: Optional[LevelOfDetail]
+    _lod_version: int
+    _last_autosave: float
 
     def __init__(self, city_name: str, input_map: Map) -> None:
         """Initializes the Instance Attributes of the child class of User.
         """
         super(Admin, self).__init__('blue', city_name)
         self.active_nodes = input_map.get_all_nodes()
+        self._station_prompt = None
+        self._journal = EditJournal(city_name, self.active_nodes)
+        self._saver = PersistenceWorker(city_name)
+        self._saver.start()
+        self._last_autosave = time.monotonic()
+        self._level_of_detail = None
+        self._lod_version = 0
 
     def display(self) -> None:
-        """Performs the display of the screen for an Admin"""
+        """Performs the display of the screen for an Admin.
 
+        This is the only loop of the Admin session: each iteration displays one frame of
+        either the map or, while it is open, the station information dialog.
+        """
         while True:
-            self._screen.fill(WHITE)
-            self.draw_grid()
-            self.create_palette()
-            self.set_selection(self._curr_opt)
-
-            visited = set()
-            for node in self.active_nodes:
-                visited.add(node)
-                transform_node = self.scale_factor_transformations(node.coordinates)
-
-                if node.is_station:
-
-                    # only draw points within margin of canvas
-                    if 0 < transform_node[0] <= 800 and 0 < transform_node[1] < 800:
-                        pygame.draw.circle(self._screen, BLACK, transform_node, 5)
-
-                for u in node.get_neighbours():
-                    if u not in visited:
-                        transform_u = self.scale_factor_transformations(u.coordinates)
+            if self._station_prompt is None:
+                self._display_map()
+            else:
+                self._display_station_prompt()
 
-                        # avoid drawing lines over the palette. Cut it off till intercept
-                        if transform_u[0] <= WIDTH and transform_node[0] <= WIDTH:
-                            pygame.draw.line(self._screen, node.get_color(u),
-                                             transform_node,
-                                             transform_u, 3)
+    def _display_map(self) -> None:
+        """Handle the events of one frame of the map being edited and,
+        if the screen is invalid, redraw it."""
+        for event in self._scheduler.get_events():
 
-            draw_text(self._screen, self.is_proper_map(), 17, (10, 10))
+            if event.type == pygame.QUIT and self.is_proper_map() == '':
+                self._save_and_exit()
 
-            for event in pygame.event.get():
+            elif self.handle_view_event(event):
+                continue
 
-                if event.type == pygame.QUIT and self.is_proper_map() == '':
-                    init_db()
-                    store_map(self.city_name, self.active_nodes)
-                    sys.exit()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                self.handle_mouse_click(event, (WIDTH, HEIGHT))
 
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    self.handle_mouse_click(event, (WIDTH, HEIGHT))
+                if self._station_prompt is not None:
+                    # the dialog takes over from the next frame onwards
+                    return
 
-                elif event.type == pygame.KEYUP:
-                    if event.key == pygame.K_DOWN:
-                        self.handle_d_shift()
-                    elif event.key == pygame.K_UP:
-                        self.handle_u_shift()
-                    elif event.key == pygame.K_LEFT:
-                        self.handle_l_shift()
-                    elif event.key == pygame.K_RIGHT:
-                        self.handle_r_shift()
-                    elif event.key == pygame.K_p and pygame.key.get_mods() & pygame.KMOD_CTRL:
-                        self.handle_zoom_in()
-                    elif event.key == pygame.K_m and pygame.key.get_mods() & pygame.KMOD_CTRL:
-                        self.handle_zoom_out()
+            elif event.type == pygame.KEYUP:
+                if event.key == pygame.K_z and pygame.key.get_mods() & pygame.KMOD_CTRL:
+                    self._journal.undo()
+                elif event.key == pygame.K_y and pygame.key.get_mods() & pygame.KMOD_CTRL:
+                    self._journal.redo()
 
-            self.hover_display()
+        self._autosave()
 
+        if self._scheduler.should_redraw():
+            self._draw_map()
             pygame.display.update()
+            self._scheduler.frame_drawn()
+
+    def _draw_map(self) -> None:
+        """Draw the map being edited, with the grid, palette and status, on the screen."""
+        self._screen.fill(WHITE)
+        self.draw_grid()
+        self.create_palette()
+        self.set_selection(self._curr_opt)
+
+        if self._level_of_detail is None or self._lod_version != self._journal.version:
+            self._level_of_detail = LevelOfDetail(self.active_nodes)
+            self._lod_version = self._journal.version
+
+        self.draw_detail_level(self._level_of_detail.get_level(self._view.zoom))
+
+        draw_text(self._screen, self.is_proper_map(), 17, (10, 10))
+        if self._saver.error is not None:
+            draw_text(self._screen, 'THE MAP COULD NOT BE SAVED: ' + str(self._saver.error),
+                      17, (10, 30), THECOLORS['red'])
+        self.hover_display()
+
+    def _autosave(self) -> None:
+        """Hand the journalled changes to the background worker if there are any,
+        the map is proper and AUTOSAVE_INTERVAL has passed since the last autosave.
+        """
+        now = time.monotonic()
+        if self._journal.has_changes() and now - self._last_autosave >= AUTOSAVE_INTERVAL \
+                and self.is_proper_map() == '':
+            self._saver.submit(self._journal.take_deltas())
+            self._last_autosave = now
+
+    def _save_and_exit(self) -> None:
+        """Save the journalled changes one final time and exit, unless they cannot be
+        saved, in which case the map stays open with them."""
+        self._saver.submit(self._journal.take_deltas())
+        try:
+            self._saver.close()
+        except sqlite3.Error:
+            self._restart_saver()
+        else:
+            sys.exit()
+
+    def _restart_saver(self) -> None:
+        """Replace the closed background worker by a new one, which keeps retrying the
+        deltas it could not write."""
+        saver = PersistenceWorker(self.city_name)
+        saver.error = self._saver.error
+        saver.submit(self._saver.take_pending())
+        saver.start()
+        self._saver = saver
 
     def node_exists(self, coordinates: tuple[float, float]) -> Optional[Node]:
-        """Return the node if it exists at given coordinates. Else, return None.
+        """Return the node if it exists at given map coordinates. Else, return None.
         """
         for node in self.active_nodes:
-            if self.scale_factor_transformations(node.coordinates) == coordinates:
+            if node.coordinates == coordinates:
                 return node
         return None
 
@@ -106,25 +203,7 @@ class Admin(User):
         """Return whether the nodes in self.active_nodes form a connected map
         and there are stations at both ends of the metro line(s).
         """
-        no_of_stations = len([node for node in self.active_nodes if node.is_station])
-        if no_of_stations == 0:
-            return 'MAP IS INCOMPLETE'
-
-        for node_1 in self.active_nodes:
-            for node_2 in self.active_nodes:
-                if not node_1.check_connected(node_2, set()):
-                    return 'MAP IS NOT CONNECTED'
-
-        for node_1 in self.active_nodes:
-            if not node_1.is_station:
-                neighbours = node_1.get_neighbours()
-                if len(neighbours) > 2:
-                    return 'TRACK INTERSECTION CAN ONLY HAPPEN AT STATIONS AND ' \
-                           'TRACK OVERLAP CAN ONLY HAPPEN AT CROSSES OF THE GRID'
-                elif len(neighbours) < 2:
-                    return 'MAP IS INCOMPLETE'
-
-        return ''
+        return check_map(self.active_nodes)
 
     def set_color(self, new_color: str) -> None:
         """Set color of track/node created.
@@ -186,6 +265,8 @@ class Admin(User):
             else:
                 return
 
+            self._journal.end_step()
+
     def _handle_right_click(self, event: pygame.event.Event) -> None:
         """Helper method for handle_mouse_click"""
         line_coordinates = self.approximate_edge_click(event)
@@ -195,46 +276,43 @@ class Admin(User):
         # One of the nodes already exists, the other node has to be created and linked to
         # the pre-existing node
 
-        make_coordinates = (self.scale_factor_transformations(line_coordinates[0], True),
-                            self.scale_factor_transformations(line_coordinates[1], True))
-
         if n_1 is None and n_2 is not None:
-            n_1 = Node(name=str(make_coordinates[0]), is_station=False,
-                       coordinates=make_coordinates[0], zone='')
-            self.active_nodes.add(n_1)
-            n_1.add_track(n_2, self._curr_opt)
+            n_1 = Node(name=corner_name(line_coordinates[0]), is_station=False,
+                       coordinates=line_coordinates[0], zone='')
+            self._journal.apply(Edit(ADD_NODE, n_1))
+            self._journal.apply(Edit(ADD_TRACK, n_1, n_2, self._curr_opt))
         elif n_1 is not None and n_2 is None:
-            n_2 = Node(name=str(make_coordinates[1]), is_station=False,
-                       coordinates=make_coordinates[1], zone='')
-            self.active_nodes.add(n_2)
-            n_1.add_track(n_2, self._curr_opt)
+            n_2 = Node(name=corner_name(line_coordinates[1]), is_station=False,
+                       coordinates=line_coordinates[1], zone='')
+            self._journal.apply(Edit(ADD_NODE, n_2))
+            self._journal.apply(Edit(ADD_TRACK, n_1, n_2, self._curr_opt))
 
         # Both nodes need to be created and linked to each other
         elif n_1 is None and n_2 is None:
-            n_1 = Node(name=str(make_coordinates[0]), is_station=False,
-                       coordinates=make_coordinates[0], zone='')
-            n_2 = Node(name=str(make_coordinates[1]), is_station=False,
-                       coordinates=make_coordinates[1], zone='')
-            self.active_nodes.add(n_1)
-            self.active_nodes.add(n_2)
-            n_1.add_track(n_2, self._curr_opt)
+            n_1 = Node(name=corner_name(line_coordinates[0]), is_station=False,
+                       coordinates=line_coordinates[0], zone='')
+            n_2 = Node(name=corner_name(line_coordinates[1]), is_station=False,
+                       coordinates=line_coordinates[1], zone='')
+            self._journal.apply(Edit(ADD_NODE, n_1))
+            self._journal.apply(Edit(ADD_NODE, n_2))
+            self._journal.apply(Edit(ADD_TRACK, n_1, n_2, self._curr_opt))
 
         # Both nodes already exist
         elif n_1 is not None and n_2 is not None:
             if n_1.is_adjacent(n_2):
                 # if they already have a track between them, remove the track
-                n_1.remove_track(n_2)
+                self._journal.apply(Edit(REMOVE_TRACK, n_1, n_2, n_1.get_color(n_2)))
             else:
                 # else, add a track between them
-                n_1.add_track(n_2, self._curr_opt)
+                self._journal.apply(Edit(ADD_TRACK, n_1, n_2, self._curr_opt))
 
             # if either or both of the nodes is a corner and is not connected
             # to any other node, remove the node
             if n_1.get_neighbours() == set() and not n_1.is_station:
-                self.active_nodes.remove(n_1)
+                self._journal.apply(Edit(REMOVE_NODE, n_1))
 
             if n_2.get_neighbours() == set() and not n_2.is_station:
-                self.active_nodes.remove(n_2)
+                self._journal.apply(Edit(REMOVE_NODE, n_2))
 
     def _handle_left_click(self, event: pygame.event.Event) -> None:
         """Helper method for handle_mouse_click"""
@@ -247,13 +325,13 @@ class Admin(User):
         elif station.is_station:
             # remove the station and the tracks it is part of
             for neighbour in station.get_neighbours():
-                station.remove_track(neighbour)
+                self._journal.apply(Edit(REMOVE_TRACK, station, neighbour,
+                                         station.get_color(neighbour)))
                 if not neighbour.is_station and neighbour.get_neighbours() == set():
-                    self.active_nodes.remove(neighbour)
-            self.active_nodes.remove(station)
+                    self._journal.apply(Edit(REMOVE_NODE, neighbour))
+            self._journal.apply(Edit(REMOVE_NODE, station))
         else:
             # replace the corner with a station
-            self.active_nodes.remove(station)
             self.get_station_info(coordinates, station)
 
     def create_palette(self) -> None:
@@ -284,71 +362,82 @@ class Admin(User):
 
     def get_station_info(self, coordinates: tuple[int, int],
                          replace: Optional[Node] = None) -> None:
-        """Gets the information from the admin about the station such as the name and zone
-         and creates a new station.
+        """Open the dialog which gets the information from the admin about the station,
+        such as the name and zone, to create a new station at coordinates of the map.
 
-         If replace is not None, then tracks are added between the new station and the
-         neighbours of replace.
+        If replace is not None, then replace is a corner which the new station replaces,
+        taking over its tracks.
         """
-        screen = initialize_screen((700, 200))
-
-        base_font = pygame.font.Font(None, 32)
+        self._screen = initialize_screen((700, 200))
         pygame.display.set_caption('Station Information')
+        self._scheduler.invalidate()
 
-        info = ['', '']
-        # info[0] <=> name, info[1] <=> zone
-        info_active = [True, False]
-        # info_active[0] <=> whether name is the active input
-        # info_active[1] <=> whether zone is the active input
-        chk = [True, False]
-        # chk[0] <=> whether the input box is still active
-        # chk[1] <=> whether the name is unique or not
+        self._station_prompt = StationPrompt(
+            coordinates=coordinates,
+            replace=replace, font=pygame.font.Font(None, 32))
 
-        while chk[0]:
+    def _display_station_prompt(self) -> None:
+        """Display one frame of the station information dialog and handle its events.
 
-            screen.fill(WHITE)
-            rect = _refresh_input_display(screen, info_active[0], info_active[1], chk[1])
+        Once the admin is done, create the station and close the dialog.
+        """
+        prompt = self._station_prompt
+        info, info_active, chk = prompt.info, prompt.info_active, prompt.chk
 
-            for event in pygame.event.get():
+        for event in self._scheduler.get_events():
 
-                chk[1] = False
-                for node in self.active_nodes:
-                    if node.name == info[0]:
-                        chk[1] = True
+            if event.type == pygame.QUIT:
+                if self.is_proper_map() == '':
+                    self._save_and_exit()
+                continue
 
-                _handle_event_for_station_info(event, info, info_active, chk, rect)
-                if not chk[0]:
-                    break
+            chk[1] = False
+            for node in self.active_nodes:
+                if node.name == info[0]:
+                    chk[1] = True
 
+            _handle_event_for_station_info(event, info, info_active, chk,
+                                           (NAME_RECT, ZONE_RECT))
             if not chk[0]:
-                initialize_screen((WIDTH + PALETTE_WIDTH, HEIGHT))
-                station = Node(name=info[0], coordinates=self.scale_factor_transformations(coordinates, True),
-                               is_station=True, zone=info[1])
-
-                if replace is not None:
-                    for neighbour in replace.get_neighbours():
-                        station.add_track(neighbour, replace.get_color(neighbour))
-                        replace.remove_track(neighbour)
-
-                self.active_nodes.add(station)
-                self.display()
-                break
-
-            name_surface = base_font.render(info[0], True, (0, 0, 0))
-            zone_surface = base_font.render(info[1], True, (0, 0, 0))
-            screen.blit(name_surface, (rect[0].x + 5, rect[0].y + 2.5))
-            screen.blit(zone_surface, (rect[1].x + 5, rect[1].y + 2.5))
+                self._close_station_prompt()
+                return
+
+        if self._scheduler.should_redraw():
+            self._screen.fill(WHITE)
+            rect = _refresh_input_display(self._screen, info_active[0], info_active[1], chk[1])
+
+            name_surface = prompt.font.render(info[0], True, (0, 0, 0))
+            zone_surface = prompt.font.render(info[1], True, (0, 0, 0))
+            self._screen.blit(name_surface, (rect[0].x + 5, rect[0].y + 2.5))
+            self._screen.blit(zone_surface, (rect[1].x + 5, rect[1].y + 2.5))
             pygame.display.flip()
+            self._scheduler.frame_drawn()
+
+    def _close_station_prompt(self) -> None:
+        """Create the station entered in the station information dialog
+        and return to the map."""
+        prompt = self._station_prompt
+        self._station_prompt = None
+        self._screen = initialize_screen((WIDTH + PALETTE_WIDTH, HEIGHT))
+        pygame.display.set_caption('OpenMetroGuide')
+        self._scheduler.invalidate()
+
+        station = Node(name=prompt.info[0], coordinates=prompt.coordinates,
+                       is_station=True, zone=prompt.info[1])
+
+        if prompt.replace is not None:
+            self._journal.apply(Edit(REPLACE_CORNER, prompt.replace, station))
+        else:
+            self._journal.apply(Edit(ADD_NODE, station))
+
+        self._journal.end_step()
 
 
 def _handle_event_for_station_info(event: pygame.event.Event, info: list[str],
                                    info_active: list[bool], chk: list[bool],
                                    rect: tuple[pygame.Rect, pygame.Rect]) -> None:
     """Update all the parameters (except rect) using mutation based on the event."""
-    if event.type == pygame.QUIT:
-        sys.exit()
-
-    elif event.type == pygame.MOUSEBUTTONDOWN:
+    if event.type == pygame.MOUSEBUTTONDOWN:
         if rect[0].collidepoint(event.pos):
             info_active[0], info_active[1] = True, False
 
@@ -383,24 +472,20 @@ def _refresh_input_display(screen: pygame.Surface,
     not_active_color = pygame.Color((119, 136, 153))
 
     if active_name:
-        name_rect = pygame.Rect((295, 45, 400, 27))
         draw_text(screen, 'Enter the name of the Station ->', 27, (5, 50))
-        pygame.draw.rect(screen, active_color, name_rect, 3)
+        pygame.draw.rect(screen, active_color, NAME_RECT, 3)
 
     else:
-        name_rect = pygame.Rect((295, 45, 400, 27))
         draw_text(screen, 'Enter the name of the Station ->', 27, (5, 50))
-        pygame.draw.rect(screen, not_active_color, name_rect, 3)
+        pygame.draw.rect(screen, not_active_color, NAME_RECT, 3)
 
     if active_zone:
-        zone_rect = pygame.Rect((295, 115, 400, 27))
         draw_text(screen, 'Enter the zone of the Station ->', 27, (5, 120))
-        pygame.draw.rect(screen, active_color, zone_rect, 3)
+        pygame.draw.rect(screen, active_color, ZONE_RECT, 3)
 
     else:
-        zone_rect = pygame.Rect((295, 115, 400, 27))
         draw_text(screen, 'Enter the zone of the Station ->', 27, (5, 120))
-        pygame.draw.rect(screen, not_active_color, zone_rect, 3)
+        pygame.draw.rect(screen, not_active_color, ZONE_RECT, 3)
 
     draw_text(screen, '(Click on name or zone to enter respective info and press enter when done)',
               20, (150, 170))
@@ -408,4 +493,4 @@ def _refresh_input_display(screen: pygame.Surface,
     if check:
         draw_text(screen, 'Station with this name already exists', 20, (5, 70))
 
-    return name_rect, zone_rect
+    return NAME_RECT, ZONE_RECT
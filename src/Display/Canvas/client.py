@@ -15,6 +15,9 @@ from src.Display.Utils.general_utils import WIDTH, in_circle, PALETTE_WIDTH, \
 from src.Base.map import Map
 from src.Base.node import Node
 from src.Display.Canvas.user import User
+from src.Display.Render.level_of_detail import LevelOfDetail
+from src.Display.Utils.route_planner import RoutePlanner, RouteQuery
+from src.Display.Utils.storage_manager import RevisionWatcher, get_map
 
 
 class Client(User):
@@ -28,22 +31,74 @@ class Client(User):
         locate the stations and find the optimized path as per requirement.
     """
 
+    # Private Instance Attributes:
+    #   - _level_of_detail: The simplified geometry of metro_map for every zoom level.
+    #   - _start: The selected start station, if any.
+    #   - _end: The selected end station, if any.
+    #   - _watcher: Watches the stored maps, so that the map of the city is reloaded
+    #               when it is stored again, by an Admin in another process.
+    #   - _planner: Finds the route between the selected stations in the background.
+    #   - _route: The IDs of the nodes of the route shown, [] while it is being found,
+    #             or None if the end cannot be reached from the start.
+    #   - _hovered: The station under the cursor when the screen was last drawn, if it
+    #               is neither the start nor the end.
+
     metro_map: Map
+    _level_of_detail: LevelOfDetail
     _start: Optional[Node]
     _end: Optional[Node]
+    _watcher: RevisionWatcher
+    _planner: RoutePlanner
+    _route: Optional[list[int]]
+    _hovered: Optional[Node]
 
-    def __init__(self, input_map: Map, city_name: str) -> None:
+    def __init__(self, input_map: Map, city_name: str, is_weighted: bool = False) -> None:
         """ Initializes the Instance Attributes of
         the Client class which is a child of User.
+
+        The weights of input_map are updated unless is_weighted, as they are for maps
+        taken from a MapCache.
         """
         super(Client, self).__init__('distance', city_name)
-        self.metro_map = input_map
-        for node in self.metro_map.get_all_nodes():
-            for neighbor in node.get_neighbours():
-                node.update_weights(neighbor)
-
         self._start = None
         self._end = None
+        self._hovered = None
+        self._planner = RoutePlanner()
+        self._set_map(input_map, is_weighted)
+
+        self._watcher = RevisionWatcher()
+        self._watcher.poll()
+
+    def _set_map(self, input_map: Map, is_weighted: bool = False) -> None:
+        """Show input_map, keeping the selected stations which are still on it, and
+        update its weights unless is_weighted."""
+        self.metro_map = input_map
+        if not is_weighted:
+            self.metro_map.update_weights()
+        self.metro_map.prepare_landmarks()
+        self._level_of_detail = LevelOfDetail(self.metro_map.get_all_nodes())
+        self._start = self._find_station(self._start)
+        self._end = self._find_station(self._end)
+        self._hovered = None
+        self._request_route()
+
+    def _find_station(self, station: Optional[Node]) -> Optional[Node]:
+        """Return the station of metro_map with the name of station, if there is one."""
+        if station is None:
+            return None
+        try:
+            return self.metro_map.get_node(station.name)
+        except ValueError:
+            return None
+
+    def reload_if_changed(self) -> bool:
+        """Reload the map of the city if it was stored again since it was loaded, and
+        return whether it was."""
+        if self.city_name not in self._watcher.poll():
+            return False
+
+        self._set_map(get_map(self.city_name))
+        return True
 
     def handle_mouse_click(self, event: pygame.event.Event,
                            screen_size: tuple[int, int]) -> None:
@@ -81,6 +136,7 @@ class Client(User):
 
                 if input_rect.collidepoint(event.pos):
                     self._curr_opt = option
+                    self._request_route()
 
         else:  # The click is on the map.
 
@@ -92,21 +148,51 @@ class Client(User):
             elif event.button == 3:
                 self._end = station
 
+            self._request_route()
+
         return
 
-    def _connect_final_route(self, path: list[str]) -> None:
-        """Displays the final path highlighting the tracks being used,
-        making the others gray.
+    def _request_route(self) -> None:
+        """Start finding the route between the selected stations in the background,
+        cancelling the route asked for before, which is stale now."""
+        self._route = []
+        if self._start is None or self._end is None:
+            self._planner.cancel()
+        else:
+            self._planner.request(self.metro_map, RouteQuery(self._start.node_id,
+                                                             self._end.node_id,
+                                                             self._curr_opt))
+
+    def _apply_route(self) -> bool:
+        """Show the route found by the planner, if one is ready, and return whether
+        there was one."""
+        result = self._planner.take_result()
+        if result is None or result.metro_map is not self.metro_map:
+            return False
+
+        self._route = result.path
+        return True
+
+    def _prefetch_hovered(self) -> None:
+        """Start finding the route from the start to the station under the cursor in
+        the background, in case it is clicked as the end next, so that its route is
+        shown at once. The planner skips it if it is busy or prefetched too recently."""
+        if self._start is not None and self._hovered is not None:
+            self._planner.prefetch(self.metro_map, RouteQuery(self._start.node_id,
+                                                              self._hovered.node_id,
+                                                              self._curr_opt))
+
+    def _connect_final_route(self, path: list[int]) -> None:
+        """Displays the final path, given by the IDs of its nodes, highlighting the
+        tracks being used, over the other tracks drawn in gray.
         """
-        lst = [n for n in self.metro_map.get_all_nodes('') if n.name not in path]
-
         for i in range(0, len(path) - 1):
-            node = self.metro_map.get_node(path[i])
+            node = self.metro_map.get_node_by_id(path[i])
             transform_node = self.scale_factor_transformations(node.coordinates)
 
             for neighbours in node.get_neighbours():
 
-                if neighbours.name == path[i + 1]:
+                if neighbours.node_id == path[i + 1]:
                     color = node.get_color(neighbours)
 
                     transform_neighbor = self.scale_factor_transformations(neighbours.coordinates)
@@ -118,21 +204,6 @@ class Client(User):
                                          end_pos=transform_neighbor,
                                          width=5)
 
-        for node in lst:
-
-            transform_node = self.scale_factor_transformations(node.coordinates)
-
-            for neighbours in node.get_neighbours():
-
-                transform_neighbor = self.scale_factor_transformations(neighbours.coordinates)
-
-                if transform_neighbor[0] <= WIDTH and transform_node[0] <= WIDTH:
-                    pygame.draw.line(surface=self._screen,
-                                     color=THECOLORS['gray50'],
-                                     start_pos=transform_node,
-                                     end_pos=transform_neighbor,
-                                     width=3)
-
         return
 
     def create_palette(self) -> None:
@@ -166,76 +237,69 @@ class Client(User):
         pygame.draw.rect(self._screen, BLACK, input_rect, 3)
 
     def display(self) -> None:
-        """Performs the display of the screen for a Client."""
-        while True:
-            self._screen.fill(WHITE)
-            self.draw_grid()
-            self.create_palette()
-            self.set_selection(self._curr_opt)
-
-            visited = set()
+        """Performs the display of the screen for a Client.
 
-            for node in self.metro_map.get_all_nodes('station'):
-                transform_node = self.scale_factor_transformations(node.coordinates)
-
-                if 0 < transform_node[0] <= 800 and 0 < transform_node[1] < 800:
-                    pygame.draw.circle(self._screen, BLACK,
-                                       transform_node, 5)
-
-            for event in pygame.event.get():
+        The screen is only redrawn after an event, so an idle Client does not use the CPU.
+        Routes are found in the background, and the route found is applied as a whole
+        at the start of the next frame, which is woken up by the event of the planner.
+        """
+        while True:
+            for event in self._scheduler.get_events():
                 if event.type == pygame.QUIT:
+                    self._planner.close()
                     sys.exit()
+                elif self.handle_view_event(event):
+                    continue
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     self.handle_mouse_click(event, (WIDTH, HEIGHT))
-                elif event.type == pygame.KEYUP:
-                    if event.key == pygame.K_DOWN:
-                        self.handle_d_shift()
-                    elif event.key == pygame.K_UP:
-                        self.handle_u_shift()
-                    elif event.key == pygame.K_LEFT:
-                        self.handle_l_shift()
-                    elif event.key == pygame.K_RIGHT:
-                        self.handle_r_shift()
-                    elif event.key == pygame.K_p and pygame.key.get_mods() & pygame.KMOD_CTRL:
-                        self.handle_zoom_in()
-                    elif event.key == pygame.K_m and pygame.key.get_mods() & pygame.KMOD_CTRL:
-                        self.handle_zoom_out()
-
-            if self._start is not None and self._end is not None:
-                path = self.metro_map.optimized_route(start=self._start.name,
-                                                      destination=self._end.name,
-                                                      optimization=self._curr_opt)
-                self._connect_final_route(path)
 
+            # idle iterations run at least once a second, so changes show up within one
+            if self.reload_if_changed() or self._apply_route():
+                self._scheduler.invalidate()
+
+            if self._scheduler.should_redraw():
+                self._draw_map()
+                pygame.display.update()
+                self._scheduler.frame_drawn()
+
+            self._prefetch_hovered()
+
+    def _draw_map(self) -> None:
+        """Draw the map, and the route between the selected stations if both are
+        selected, with the grid and palette on the screen."""
+        self._screen.fill(WHITE)
+        self.draw_grid()
+        self.create_palette()
+        self.set_selection(self._curr_opt)
+
+        level = self._level_of_detail.get_level(self._view.zoom)
+
+        if self._start is not None and self._end is not None:
+            self.draw_detail_level(level, greyed=True)
+            if self._planner.is_pending():
+                draw_text(self._screen, 'Finding route...', 20, (10, 10), THECOLORS['gray'])
+            elif self._route is None:
+                draw_text(self._screen, 'No route', 20, (10, 10), THECOLORS['red'])
             else:
-                for node in self.metro_map.get_all_nodes(''):
-                    visited.add(node)
-                    transform_node = self.scale_factor_transformations(node.coordinates)
-
-                    for u in node.get_neighbours():
-                        if u not in visited:
-                            transform_u = self.scale_factor_transformations(u.coordinates)
-
-                            if transform_u[0] <= WIDTH and transform_node[0] <= WIDTH:
-                                pygame.draw.line(self._screen, node.get_color(u),
-                                                 transform_node,
-                                                 transform_u, 3)
+                self._connect_final_route(self._route)
 
-            self.hover_display()
+        else:
+            self.draw_detail_level(level)
 
-            pygame.display.update()
+        self.hover_display()
 
     def node_exists(self, coordinates: tuple[float, float]) -> Optional[Node]:
-        """Return the node if it exists at given coordinates. Else, return None.
+        """Return the node if it exists at given map coordinates. Else, return None.
         """
         for node in self.metro_map.get_all_nodes():
-            if self.scale_factor_transformations(node.coordinates) == coordinates:
+            if node.coordinates == coordinates:
                 return node
         return None
 
     def hover_display(self) -> None:
         """Gains the current nodes which can be displayed through
         the self.active_nodes attribute. Provides information on both name and zone."""
+        self._hovered = None
         for node in self.metro_map.get_all_nodes('station'):
             transformed = self.scale_factor_transformations(node.coordinates)
 
@@ -250,6 +314,7 @@ class Client(User):
                           (transformed[0] + 4, transformed[1] - 15), THECOLORS['red'])
 
             elif in_circle(5, transformed, pygame.mouse.get_pos()):
+                self._hovered = node
                 show = node.name + ' ' + '(' + node.zone + ')'
                 draw_text(self._screen, show, 17,
                           (transformed[0] + 4, transformed[1] - 15))
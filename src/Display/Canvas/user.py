@@ -5,13 +5,18 @@ admin and client inherit.
 import math
 from typing import Optional
 
-from pygame.colordict import THECOLORS
 import pygame
 
 from src.Base.node import Node
 from src.Display.Utils.general_utils import initialize_screen, PALETTE_WIDTH, WIDTH, HEIGHT
+from src.Display.Utils.scheduler import FrameScheduler
+from src.Display.Render.grid import GridLayer, CELL_SIZE, nearest_crossing, nearest_edge
+from src.Display.Render.level_of_detail import DetailLevel, STATION_RADIUS
+from src.Display.Render.tiles import TileRenderer
+from src.Display.Render.view import ViewTransform
 
-GRID_SIZE = 20
+# The factor by which one notch of the mouse wheel zooms out
+WHEEL_ZOOM_STEP = 1.1
 
 
 class User:
@@ -30,12 +35,19 @@ class User:
     #   - screen: The screen being used by pygame.
     #   - _curr_opt: The current optimization option which can be colors in the case of admin or
     #               'distance' or 'cost' in the case of client.
-    #   - _curr_zoom: The current zoom level of the canvas
-    #   - _curr_shift: The current amount by which the map is displaced
+    #   - _view: The transform from map coordinates to coordinates of the canvas, which
+    #            holds the current zoom level and the amount by which the map is displaced
+    #   - _grid: Draws the grid from a cache of lattice surfaces
+    #   - _tiles: Draws the map from a cache of tiles, reused while the view pans
+    #   - _dragging: Whether the map is being dragged with the middle mouse button
+    #   - _scheduler: Paces the main loop, which only redraws the screen when it is invalid
 
     _screen: pygame.Surface
-    _curr_zoom: int
-    _curr_shift: list[int, int]
+    _scheduler: FrameScheduler
+    _view: ViewTransform
+    _grid: GridLayer
+    _tiles: TileRenderer
+    _dragging: bool
     _curr_opt: str
     opt_to_center: dict[str: tuple[int, int]]
     city_name: str
@@ -45,135 +57,136 @@ class User:
         self.opt_to_center = {}
         self._curr_opt = init_selected
         self.city_name = city_name
-        self._curr_zoom = 1
-        self._curr_shift = [0, 0]
+        self._view = ViewTransform()
+        self._grid = GridLayer()
+        self._tiles = TileRenderer()
+        self._dragging = False
+        self._scheduler = FrameScheduler()
 
     def draw_grid(self) -> None:
         """Draws a square grid on the given surface.
 
-        The drawn grid has GRID_SIZE columns and rows.
+        The drawn grid has a line every CELL_SIZE map units, and the diagonals of
+        every cell, over the visible part of the map.
         You can use this to help you check whether you are drawing nodes and edges
         at the right spots.
         """
-        color = THECOLORS['grey']
-        width, height = WIDTH, HEIGHT
-        curr_grid_size = self._curr_zoom * GRID_SIZE
+        self._grid.draw(self._screen, pygame.Rect(0, 0, WIDTH, HEIGHT), self._view)
 
-        pygame.draw.line(self._screen, color, (0, 0), (width, height))
-        pygame.draw.line(self._screen, color, (0, height), (width, 0))
+    def scale_factor_transformations(self, actual: tuple[float, float],
+                                     reverse: bool = False) -> tuple[float, float]:
+        """Transforms the actual location (map coordinates) to where it should be displayed on
+        the screen, or the location on the screen back to map coordinates if reverse."""
+        if reverse:
+            return self._view.to_world(actual)
 
-        for dim in range(1, curr_grid_size):
-            x = dim * (width // curr_grid_size)  # for column (vertical lines)
-            y = dim * (height // curr_grid_size)  # for row (horizontal lines)
+        return self._view.to_screen(actual)
 
-            pygame.draw.line(self._screen, color, (x, 0), (x, height))
-            pygame.draw.line(self._screen, color, (0, y), (width, y))
+    def get_view(self) -> pygame.Rect:
+        """Return the rectangle, in map coordinates, which is visible on the canvas."""
+        left, top = self._view.to_world((0, 0))
+        right, bottom = self._view.to_world((WIDTH, HEIGHT))
+        margin = STATION_RADIUS * self._view.zoom
 
-            pygame.draw.line(self._screen, color, (x, 0), (0, y))
-            pygame.draw.line(self._screen, color, (width - x, height), (width, height - y))
-            pygame.draw.line(self._screen, color, (x, 0), (width, height - y))
-            pygame.draw.line(self._screen, color, (0, y), (width - x, height))
+        return pygame.Rect(math.floor(left - margin), math.floor(top - margin),
+                           math.ceil(right - left + 2 * margin),
+                           math.ceil(bottom - top + 2 * margin))
 
-    def scale_factor_transformations(self, actual: tuple[int, int], reverse: bool = False) -> tuple[int, int]:
-        """Transforms the actual location (scale factor of 1) to where it should be displayed on
-        the map"""
-        h_shift = self._curr_shift[0] * (WIDTH // (self._curr_zoom * GRID_SIZE))
-        v_shift = self._curr_shift[1] * (HEIGHT // (self._curr_zoom * GRID_SIZE))
+    def draw_detail_level(self, level: DetailLevel, greyed: bool = False) -> None:
+        """Draw the visible tracks, greyed out if greyed, and stations of level on the
+        canvas, without drawing over the palette."""
+        self._tiles.draw(self._screen, pygame.Rect(0, 0, WIDTH, HEIGHT), level,
+                         self._view, greyed)
 
-        if reverse:
-            return ((actual[0] + h_shift) * self._curr_zoom,
-                    (actual[1] + v_shift) * self._curr_zoom)
+    def handle_view_event(self, event: pygame.event.Event) -> bool:
+        """Zoom or pan the view if event asks to, and return whether it did.
 
-        return (actual[0] // self._curr_zoom - h_shift,
-                actual[1] // self._curr_zoom - v_shift)
+        The mouse wheel zooms around the mouse, dragging with the middle button pans,
+        and so do the arrow keys, one grid cell at a time. Ctrl+P and Ctrl+M zoom in
+        and out around the center of the canvas.
+        """
+        if event.type == pygame.MOUSEWHEEL:
+            if pygame.mouse.get_pos()[0] <= WIDTH:
+                self._view.zoom_at(WHEEL_ZOOM_STEP ** -event.y, pygame.mouse.get_pos())
+            return True
+
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button not in (1, 3):
+            # buttons 4 and 5 are the mouse wheel, which also sends MOUSEWHEEL events
+            self._dragging = event.button == 2 and event.pos[0] <= WIDTH
+            return True
+
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 2:
+            self._dragging = False
+            return True
+
+        elif event.type == pygame.MOUSEMOTION and self._dragging:
+            self._view.pan(*event.rel)
+            return True
+
+        elif event.type == pygame.KEYUP:
+            ctrl = pygame.key.get_mods() & pygame.KMOD_CTRL
+            if event.key == pygame.K_DOWN:
+                self.handle_d_shift()
+            elif event.key == pygame.K_UP:
+                self.handle_u_shift()
+            elif event.key == pygame.K_LEFT:
+                self.handle_l_shift()
+            elif event.key == pygame.K_RIGHT:
+                self.handle_r_shift()
+            elif event.key == pygame.K_p and ctrl:
+                self.handle_zoom_in()
+            elif event.key == pygame.K_m and ctrl:
+                self.handle_zoom_out()
+            else:
+                return False
+            return True
+
+        return False
 
     def handle_zoom_in(self) -> None:
         """Handles key down even for zooming in
         """
-        if self._curr_zoom != 1:
-            self._curr_zoom //= 2
+        self._view.zoom_at(1 / 2, (WIDTH // 2, HEIGHT // 2))
 
     def handle_zoom_out(self) -> None:
         """Handles key down even for zooming out
         """
-        if self._curr_zoom != 4:
-            self._curr_zoom *= 2
+        self._view.zoom_at(2, (WIDTH // 2, HEIGHT // 2))
 
     def handle_d_shift(self) -> None:
         """Handles key down even for down shift
         """
-        self._curr_shift[1] += 1
+        self._view.pan(0, -CELL_SIZE / self._view.zoom)
 
     def handle_u_shift(self) -> None:
         """Handles key down even for up shift
         """
-        self._curr_shift[1] -= 1
+        self._view.pan(0, CELL_SIZE / self._view.zoom)
 
     def handle_r_shift(self) -> None:
         """Handles key down even for right shift
         """
-        self._curr_shift[0] += 1
+        self._view.pan(-CELL_SIZE / self._view.zoom, 0)
 
     def handle_l_shift(self) -> None:
         """Handles key down even for left shift
         """
-        self._curr_shift[0] -= 1
+        self._view.pan(CELL_SIZE / self._view.zoom, 0)
 
     def get_click_pos(self, event: pygame.event.Event) -> tuple[int, int]:
-        """Return the approximated coordinates of the mouse click for the station"""
-        box_width = WIDTH // (GRID_SIZE * self._curr_zoom)
-        box_height = HEIGHT // (GRID_SIZE * self._curr_zoom)
-        
-        return (round(event.pos[0] / box_width) * box_width,
-                round(event.pos[1] / box_height) * box_height)
+        """Return the map coordinates of the crossing of the grid closest to the mouse click,
+        which is where a station is created or found."""
+        return nearest_crossing(self._view.to_world(event.pos))
 
     def approximate_edge_click(self, event: pygame.event.Event) -> tuple[tuple[int, int], tuple[int, int]]:
-        """Return the approximated coordinates of the mouse click for the track.
-
-        https://en.wikipedia.org/wiki/Distance_from_a_point_to_a_line
+        """Return the map coordinates of the ends of the edge of the grid closest to the
+        mouse click, which is where a track is created or found.
 
         Preconditions:
             - 0<= event.pos[0] <= WIDTH
             - 0 <= event.pos[1] <= HEIGHT
         """
-        x_0, y_0 = event.pos
-
-        all_edges = self._get_all_edges(event)
-
-        min_distance_so_far = math.inf
-        closest_edge_so_far = None
-
-        for edge in all_edges:
-            x_1, y_1 = edge[0]
-            x_2, y_2 = edge[1]
-
-            num = abs((x_2 - x_1) * (y_1 - y_0) - (x_1 - x_0) * (y_2 - y_1))
-            den = math.sqrt((x_2 - x_1) ** 2 + (y_2 - y_1) ** 2)
-
-            distance_from_edge = num / den
-
-            if distance_from_edge < min_distance_so_far:
-                min_distance_so_far = distance_from_edge
-                closest_edge_so_far = edge
-
-        return closest_edge_so_far
-
-    def _get_all_edges(self, event: pygame.event.Event) -> list[tuple[tuple[int, int], tuple[int, int]]]:
-        """event is a pygame mouse click event object in one of the boxes of the grid.
-
-        Return all edges in the box of the click (including the boundary edges).
-        """
-        box_width = WIDTH // (GRID_SIZE * self._curr_zoom)
-        box_height = HEIGHT // (GRID_SIZE * self._curr_zoom)
-        
-        top_left = ((event.pos[0] // box_width) * box_width,
-                    (event.pos[1] // box_height) * box_height)
-        top_right = (top_left[0] + box_width, top_left[1])
-        bottom_left = (top_left[0], top_left[1] + box_height)
-        bottom_right = (top_left[0] + box_width, top_left[1] + box_height)
-
-        return [(top_left, top_right), (top_left, bottom_left), (bottom_left, bottom_right),
-                (top_right, bottom_right), (top_left, bottom_right), (top_right, bottom_left)]
+        return nearest_edge(self._view.to_world(event.pos))
 
     def handle_mouse_click(self, event: pygame.event.Event,
                            screen_size: tuple[int, int], ) -> None:
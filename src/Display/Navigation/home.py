@@ -1,48 +1,118 @@
 """Runs the home application window.
+
+Importing this module has no side effects: pygame, the window, the database and
+the screens of the Admin and the Client are only loaded by run_home, and the list
+of stored cities is read in the background once the first frame is shown, so that
+tooling can import the package cheaply. run_home imports pygame and the names the
+home screens draw with into the globals of this module, once, for its helpers.
+Track the cost of importing it with
+    python -X importtime -c "import src.Display.Navigation.home"
+or python -m src.Benchmarks.startup.
 """
+from __future__ import annotations
+
 import sys
-import pygame
-from pygame.colordict import THECOLORS
+import threading
+from typing import Optional, TYPE_CHECKING
 
-from src.Display.Canvas.admin import Admin
-from src.Display.Utils.general_utils import draw_text, WHITE, BLACK, initialize_screen
-from src.Display.Canvas.client import Client
 from src.Base.map import Map
 
-from src.Display.Utils.storage_manager import get_map, init_db, get_cities
+if TYPE_CHECKING:
+    import pygame
+    from pygame.colordict import THECOLORS
+    from src.Display.Utils.general_utils import draw_text, BLACK, WHITE
+
+    from src.Display.Utils.storage_manager import RevisionWatcher
+    from src.Display.Utils.warmup import MapCache, WarmupService
+
+# The number of worker processes which prepare the stored cities while the home screen
+# is shown, or None for the default of the warm-up service
+WARMUP_PROCESSES = None
+
+# Where the name of a new city is typed: left, top, width and height
+ENTER_CITY_RECT = (110, 150, 200, 30)
 
-init_db()
 screen_type = 0
-screen = initialize_screen((400, 300))
-queue_lst = get_cities()
+screen = None
+queue_lst = []
 is_admin = True
 is_existing = True
 current_index = 0
-enter_city_rect = pygame.Rect((110, 150, 200, 30))
+
+
+class CityLoader(threading.Thread):
+    """Initializes the database and reads the list of stored cities in the background,
+    then posts an event of event_type, so that the main loop takes them.
+
+    Instance Attributes:
+        - event_type: The type of the event posted once the cities are loaded.
+        - cities: The stored cities, once they are loaded.
+    """
+    event_type: int
+    cities: Optional[list[str]]
+
+    def __init__(self, event_type: int) -> None:
+        super().__init__(daemon=True)
+        self.event_type = event_type
+        self.cities = None
+
+    def run(self) -> None:
+        """Load the cities and post the event."""
+        from src.Display.Utils.storage_manager import init_db, get_cities
+
+        init_db()
+        self.cities = get_cities()
+        pygame.event.post(pygame.event.Event(self.event_type))
+
+    def wait(self) -> list[str]:
+        """Return the stored cities, starting the loader first if it was not started,
+        and waiting for it to load them."""
+        if self.ident is None:
+            self.start()
+        self.join()
+        return self.cities
 
 
 def run_home() -> None:
     """Runs the home application which serves as a entrance
     to the OpenMetroGuide application.
     """
-    global is_admin, is_existing, current_index, screen_type
+    global is_admin, is_existing, current_index, screen_type, screen, queue_lst
+    global pygame, THECOLORS, draw_text, BLACK, WHITE
+
+    import pygame
+    from pygame.colordict import THECOLORS
+    from src.Display.Utils.general_utils import draw_text, WHITE, BLACK, initialize_screen
+    from src.Display.Utils.scheduler import FrameScheduler
+    from src.Display.Utils.storage_manager import RevisionWatcher
+    from src.Display.Utils.warmup import DEFAULT_PROCESSES, WarmupService
 
+    screen = initialize_screen((400, 300))
     pygame.display.set_caption("OpenMetroGuide")
     chk = True
     warning = city_name = ''
     base_font = pygame.font.Font(None, 32)
+    scheduler = FrameScheduler()
+    loader = CityLoader(pygame.event.custom_type())
+    watcher = warmup = None
 
     while chk:
 
-        screen.fill(WHITE)
-
-        _display_correct_screen()
-
-        for event in pygame.event.get():
+        for event in scheduler.get_events():
 
             if event.type == pygame.QUIT:
+                _close(warmup, watcher)
                 sys.exit()
 
+            elif event.type == loader.event_type:
+                queue_lst = loader.cities
+                # the revisions are read before the warm-up, so that no change made during
+                # it is missed
+                watcher = RevisionWatcher()
+                watcher.poll()
+                warmup = WarmupService(WARMUP_PROCESSES or DEFAULT_PROCESSES)
+                warmup.start(queue_lst)
+
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_DOWN:
                     if screen_type == 0:
@@ -66,6 +136,9 @@ def run_home() -> None:
                     current_index = (current_index - 1) % len(queue_lst)
 
                 elif event.key == pygame.K_RETURN:
+                    if screen_type == 0:
+                        # the next screens need the cities, which are loaded by now in general
+                        queue_lst = loader.wait()
 
                     if screen_type == 1 and (not is_admin or (queue_lst and is_existing)):
                         # Client stops at screen_type 1
@@ -95,17 +168,42 @@ def run_home() -> None:
                     if screen_type == 2:
                         city_name = _handle_event_for_run_home(event, city_name)
 
-        if chk and screen_type == 0:
-            set_selection()
+        if chk and scheduler.should_redraw():
+            screen.fill(WHITE)
+
+            _display_correct_screen()
+
+            if screen_type == 0:
+                set_selection()
+
+            name_surface = base_font.render(city_name, True, (0, 0, 0))
+            screen.blit(name_surface, (ENTER_CITY_RECT[0] + 5, ENTER_CITY_RECT[1] + 2.5))
 
-        name_surface = base_font.render(city_name, True, (0, 0, 0))
-        screen.blit(name_surface, (enter_city_rect.x + 5, enter_city_rect.y + 2.5))
+            draw_text(screen, warning, 15, (160, 190), BLACK)
+            pygame.display.flip()
+            scheduler.frame_drawn()
 
-        draw_text(screen, warning, 15, (160, 190), BLACK)
-        pygame.display.flip()
+            if loader.ident is None:
+                loader.start()
 
+    # Only the chosen city is needed any more, as it is stored now
+    cache = None
+    if warmup is not None:
+        warmup.close()
+        cache = warmup.cache
+        for changed in watcher.poll():
+            cache.discard(changed)
+    _close(None, watcher)
     metro_map = Map()
-    next_user(city_name, metro_map)
+    next_user(city_name, metro_map, cache)
+
+
+def _close(warmup: Optional[WarmupService], watcher: Optional[RevisionWatcher]) -> None:
+    """Close warmup and watcher, if they were started."""
+    if warmup is not None:
+        warmup.close()
+    if watcher is not None:
+        watcher.close()
 
 
 def _display_correct_screen() -> None:
@@ -122,26 +220,36 @@ def _display_correct_screen() -> None:
         refresh_display(active_color=THECOLORS['blue'])
 
 
-def next_user(city_name: str, metro_map: Map) -> None:
+def next_user(city_name: str, metro_map: Map, cache: Optional[MapCache] = None) -> None:
     """Uses the information received from the User to
     determine if User or Client, and use other details
-    to create the setup for edit/view of metro map"""
+    to create the setup for edit/view of metro map.
+
+    An existing map is taken from cache if it was prepared there,
+    and loaded from the database otherwise."""
+    from src.Display.Canvas.admin import Admin
+    from src.Display.Canvas.client import Client
+    from src.Display.Utils.storage_manager import get_map
+
+    is_weighted = False
     if is_existing and queue_lst:
         city_name = queue_lst[current_index]
-        metro_map = get_map(city_name)
+        metro_map = cache.get(city_name) if cache is not None else None
+        is_weighted = metro_map is not None
+        if metro_map is None:
+            metro_map = get_map(city_name)
 
     if is_admin:
         admin = Admin(city_name, metro_map)
         admin.display()
 
     else:
-        client = Client(metro_map, city_name)
+        client = Client(metro_map, city_name, is_weighted)
         client.display()
 
 
 def _handle_event_for_run_home(event: pygame.event.Event, name: str) -> str:
     """Update all the parameters (except rect) using mutation based on the event."""
-
     if event.key == pygame.K_BACKSPACE:
         name = name[:-1]
     else:
@@ -156,7 +264,6 @@ def refresh_display(active_color: tuple[int, int, int] = None) -> None:
     each refreshment of the screen, this code snippet is
     reused.
     """
-
     if screen_type == 0:  # Main Window
         draw_text(screen, 'Select an option (Use Up/Down keys):', 30, (20, 50))
         draw_text(screen, 'Run as Admin', 25, (150, 120))
@@ -207,7 +314,7 @@ def refresh_display(active_color: tuple[int, int, int] = None) -> None:
     else:  # Entering the city name
         draw_text(screen, 'Enter City Name', 30,
                   (120, 50), BLACK)
-        pygame.draw.rect(screen, active_color, enter_city_rect, 3)
+        pygame.draw.rect(screen, active_color, ENTER_CITY_RECT, 3)
 
 
 def set_selection() -> None:
@@ -216,7 +323,6 @@ def set_selection() -> None:
     or 'Run as 'Client'. Also whitens the borders of the
     unselected option. These options are represented by the
     selected attribute: 'admin' and 'client' respectively."""
-
     if is_admin:
         pygame.draw.rect(screen, BLACK,
                          (5, 100, screen.get_width() - 10, 55), 3)
@@ -0,0 +1,84 @@
+"""This file contains the geometry shared by the offscreen renderers of
+OpenMetroGuide. It does not depend on pygame, so that it can be used by
+renderers which do not need a display.
+"""
+from dataclasses import dataclass
+from typing import Iterable
+
+from src.Base.map import Map
+from src.Base.node import Node
+
+# The color of the tracks which are not part of a highlighted route
+GREY = (127, 127, 127)
+
+# The RGB values of the line colors of the Admin palette, as pygame draws them
+LINE_RGB = {'blue': (0, 0, 255), 'red': (255, 0, 0), 'yellow': (255, 255, 0),
+            'green': (0, 255, 0), 'brown': (165, 42, 42), 'purple': (160, 32, 240),
+            'orange': (255, 165, 0), 'pink': (255, 192, 203)}
+
+
+@dataclass(frozen=True)
+class CanvasFit:
+    """Maps the coordinates of a map onto a canvas.
+
+    Instance Attributes:
+        - scale: The canvas pixels per unit of map coordinates.
+        - offset_x: The canvas x coordinate of the map x coordinate 0.
+        - offset_y: The canvas y coordinate of the map y coordinate 0.
+    """
+    scale: float
+    offset_x: float
+    offset_y: float
+
+    def to_canvas(self, coordinates: tuple[int, int]) -> tuple[int, int]:
+        """Return the canvas pixel of the given map coordinates."""
+        return (round(coordinates[0] * self.scale + self.offset_x),
+                round(coordinates[1] * self.scale + self.offset_y))
+
+
+def fit_canvas(nodes: Iterable[Node], size: tuple[int, int], margin: int = 20) -> CanvasFit:
+    """Return the CanvasFit which centers nodes on a canvas of the given size,
+    as large as possible while leaving margin pixels on every side.
+    """
+    xs, ys = set(), set()
+    for node in nodes:
+        xs.add(node.coordinates[0])
+        ys.add(node.coordinates[1])
+
+    if not xs:
+        return CanvasFit(1, margin, margin)
+
+    width, height = max(xs) - min(xs), max(ys) - min(ys)
+    scale = min((size[0] - 2 * margin) / (width or 1), (size[1] - 2 * margin) / (height or 1))
+
+    return CanvasFit(scale, (size[0] - width * scale) / 2 - min(xs) * scale,
+                     (size[1] - height * scale) / 2 - min(ys) * scale)
+
+
+def track_segments(metro_map: Map) -> list[tuple[Node, Node, str]]:
+    """Return every track of metro_map once, as its two nodes and its color."""
+    segments = []
+    visited = set()
+    for node in metro_map.get_all_nodes():
+        visited.add(node)
+        for u in node.get_neighbours():
+            if u not in visited:
+                segments.append((node, u, node.get_color(u)))
+
+    return segments
+
+
+def route_segments(metro_map: Map, path: list[int]) -> list[tuple[Node, Node, str]]:
+    """Return the tracks along path, a route of metro_map given by the IDs of its
+    nodes, with their colors."""
+    segments = []
+    for id_1, id_2 in zip(path, path[1:]):
+        node_1, node_2 = metro_map.get_node_by_id(id_1), metro_map.get_node_by_id(id_2)
+        segments.append((node_1, node_2, node_1.get_color(node_2)))
+
+    return segments
+
+
+def rgb(color: str) -> tuple[int, int, int]:
+    """Return the RGB value of a line color, or GREY if it is unknown."""
+    return LINE_RGB.get(color, GREY)
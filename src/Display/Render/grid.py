@@ -0,0 +1,160 @@
+"""This file contains the grid of the Admin and Client canvases: the lattice of
+cells, with their diagonals, on which stations and tracks are placed.
+
+The lattice is drawn once per zoom level onto a cached surface which is larger
+than the canvas, and which is blitted at the current panning offset. Finding the
+edge of the lattice closest to a point uses a table, precomputed once, of the
+closest edge of every point of a cell, so it only takes integer arithmetic.
+"""
+import math
+from collections import OrderedDict
+
+from pygame.colordict import THECOLORS
+import pygame
+
+from src.Display.Render.view import ViewTransform
+from src.Display.Utils.general_utils import WIDTH, WHITE
+
+GRID_SIZE = 20
+
+# The side of a grid cell in map coordinates (GRID_SIZE cells over the canvas at zoom level 1)
+CELL_SIZE = WIDTH // GRID_SIZE
+
+# Pixels of the lattice drawn beyond every side of the canvas, so that panning by less
+# reuses the cached surface
+GRID_MARGIN = 200
+
+# The number of zoom levels whose lattice surfaces are kept
+GRID_CACHE_ZOOMS = 4
+
+# The edges of a cell, from its top left corner (0, 0), in the order in which ties are
+# broken: the top, left, bottom and right sides, and then the two diagonals
+CELL_EDGES = (((0, 0), (CELL_SIZE, 0)), ((0, 0), (0, CELL_SIZE)),
+              ((0, CELL_SIZE), (CELL_SIZE, CELL_SIZE)), ((CELL_SIZE, 0), (CELL_SIZE, CELL_SIZE)),
+              ((0, 0), (CELL_SIZE, CELL_SIZE)), ((CELL_SIZE, 0), (0, CELL_SIZE)))
+
+Edge = tuple[tuple[int, int], tuple[int, int]]
+
+
+class GridLayer:
+    """Draws the lattice on a canvas from surfaces cached for every zoom level."""
+
+    # Private Instance Attributes:
+    #   - _surfaces: The lattice surfaces of the most recently used zoom levels, with
+    #                the coordinates of their top left corners on the map scaled by the
+    #                zoom level, from the least to the most recently used.
+
+    _surfaces: OrderedDict[float, tuple[pygame.Surface, tuple[int, int]]]
+
+    def __init__(self) -> None:
+        self._surfaces = OrderedDict()
+
+    def draw(self, screen: pygame.Surface, canvas: pygame.Rect, view: ViewTransform) -> None:
+        """Draw the lattice, as seen through view, over canvas on screen."""
+        left = canvas.left - view.translation[0]
+        top = canvas.top - view.translation[1]
+
+        entry = self._surfaces.get(view.zoom)
+        if entry is None or not _covers(entry, left, top, canvas):
+            entry = _render(view.zoom, left - GRID_MARGIN, top - GRID_MARGIN,
+                            (canvas.width + 2 * GRID_MARGIN, canvas.height + 2 * GRID_MARGIN))
+            self._surfaces[view.zoom] = entry
+            if len(self._surfaces) > GRID_CACHE_ZOOMS:
+                self._surfaces.popitem(last=False)
+
+        self._surfaces.move_to_end(view.zoom)
+        surface, (origin_x, origin_y) = entry
+
+        clip = screen.get_clip()
+        screen.set_clip(canvas)
+        screen.blit(surface, (origin_x + view.translation[0], origin_y + view.translation[1]))
+        screen.set_clip(clip)
+
+
+def nearest_edge(point: tuple[float, float]) -> Edge:
+    """Return the edge of the lattice closest to point, both in map coordinates."""
+    x, y = math.floor(point[0]), math.floor(point[1])
+    left, top = x - x % CELL_SIZE, y - y % CELL_SIZE
+    (x_1, y_1), (x_2, y_2) = CELL_EDGES[_EDGE_TABLE[(y - top) * CELL_SIZE + x - left]]
+
+    return (left + x_1, top + y_1), (left + x_2, top + y_2)
+
+
+def nearest_crossing(point: tuple[float, float]) -> tuple[int, int]:
+    """Return the crossing of the lattice closest to point, both in map coordinates."""
+    return (round(point[0] / CELL_SIZE) * CELL_SIZE,
+            round(point[1] / CELL_SIZE) * CELL_SIZE)
+
+
+def _covers(entry: tuple[pygame.Surface, tuple[int, int]], left: int, top: int,
+            canvas: pygame.Rect) -> bool:
+    """Return whether the lattice surface of entry covers the canvas whose top left
+    corner is at (left, top) on the map scaled by the zoom level."""
+    surface, (origin_x, origin_y) = entry
+    width, height = surface.get_size()
+    return origin_x <= left and origin_y <= top and left + canvas.width <= origin_x + width \
+        and top + canvas.height <= origin_y + height
+
+
+def _render(zoom: float, origin_x: int, origin_y: int,
+            size: tuple[int, int]) -> tuple[pygame.Surface, tuple[int, int]]:
+    """Return a surface of the given size with the lattice at zoom, whose top left
+    corner is at (origin_x, origin_y) on the map scaled by zoom."""
+    surface = pygame.Surface(size)
+    surface.fill(WHITE)
+    color = THECOLORS['grey']
+    width, height = size
+
+    def to_surface(x: int, y: int) -> tuple[int, int]:
+        """Return the coordinates on the surface of the map coordinates (x, y)."""
+        return round(x / zoom) - origin_x, round(y / zoom) - origin_y
+
+    first_x = math.floor(origin_x * zoom / CELL_SIZE)
+    last_x = math.ceil((origin_x + width) * zoom / CELL_SIZE)
+    first_y = math.floor(origin_y * zoom / CELL_SIZE)
+    last_y = math.ceil((origin_y + height) * zoom / CELL_SIZE)
+
+    for column in range(first_x, last_x + 1):
+        x = to_surface(column * CELL_SIZE, 0)[0]
+        pygame.draw.line(surface, color, (x, 0), (x, height))
+
+    for row in range(first_y, last_y + 1):
+        y = to_surface(0, row * CELL_SIZE)[1]
+        pygame.draw.line(surface, color, (0, y), (width, y))
+
+    # the diagonals x - y = k * CELL_SIZE and x + y = k * CELL_SIZE crossing the surface
+    left, right = first_x * CELL_SIZE, last_x * CELL_SIZE
+    for k in range(first_x - last_y, last_x - first_y + 1):
+        pygame.draw.line(surface, color, to_surface(left, left - k * CELL_SIZE),
+                         to_surface(right, right - k * CELL_SIZE))
+
+    for k in range(first_x + first_y, last_x + last_y + 1):
+        pygame.draw.line(surface, color, to_surface(left, k * CELL_SIZE - left),
+                         to_surface(right, k * CELL_SIZE - right))
+
+    return surface, (origin_x, origin_y)
+
+
+def _build_edge_table() -> bytes:
+    """Return the index in CELL_EDGES of the edge closest to every point (x, y) of a cell,
+    at index y * CELL_SIZE + x.
+
+    The distance from a point to a side is a difference of coordinates, and to a
+    diagonal it is such a difference divided by sqrt(2), so comparing twice the
+    squared distances to the sides with the squared distances to the diagonals
+    only takes integers.
+    https://en.wikipedia.org/wiki/Distance_from_a_point_to_a_line
+    """
+    table = bytearray(CELL_SIZE * CELL_SIZE)
+    for y in range(CELL_SIZE):
+        for x in range(CELL_SIZE):
+            # twice the squared distance to each edge
+            distances = (2 * y ** 2, 2 * x ** 2, 2 * (CELL_SIZE - y) ** 2,
+                         2 * (CELL_SIZE - x) ** 2, (x - y) ** 2, (x + y - CELL_SIZE) ** 2)
+            table[y * CELL_SIZE + x] = distances.index(min(distances))
+
+    return bytes(table)
+
+
+# The index in CELL_EDGES of the edge closest to every point of a cell
+_EDGE_TABLE = _build_edge_table()
@@ -0,0 +1,262 @@
+"""This file contains the level-of-detail system used to draw metro maps on
+the Admin and Client screens.
+
+For each zoom level, the geometry of the map is simplified once: chains of
+corners are merged into polylines and simplified to within half a pixel,
+polylines smaller than a pixel are suppressed, and stations closer than a
+station circle are clustered. Drawing a level then only issues one draw call
+per visible polyline and station cluster, which are found through a grid of
+buckets rather than by testing every polyline and station of the map.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+import pygame
+
+from src.Base.node import Node
+from src.Display.Utils.general_utils import BLACK
+
+# The zoom levels (map units per pixel) for which geometry is precomputed
+ZOOM_LEVELS = (1, 2, 4)
+
+# The radius, in pixels, of the circle of a station
+STATION_RADIUS = 5
+
+# The width, in pixels, of a track
+TRACK_WIDTH = 3
+
+# The side, in map units, of the buckets which index the geometry of a level
+BUCKET_SIZE = 1024
+
+Point = tuple[int, int]
+Bucket = tuple[int, int]
+
+
+@dataclass(frozen=True)
+class Polyline:
+    """A chain of tracks of the same color, between two nodes which are either
+    stations, corners where the color changes, or track intersections.
+
+    Instance Attributes:
+        - points: The map coordinates of the chain, in order.
+        - color: The color of the tracks.
+        - bounds: The bounding box (min_x, min_y, max_x, max_y) of points.
+    """
+    points: tuple[Point, ...]
+    color: str
+    bounds: tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class DetailLevel:
+    """The simplified geometry of a map at one zoom level.
+
+    Instance Attributes:
+        - zoom: The zoom level (map units per pixel) of this geometry.
+        - polylines: The tracks to draw.
+        - stations: The map coordinates of the station (clusters) to draw.
+        - track_buckets: Maps every bucket to the indices of the polylines crossing it.
+        - station_buckets: Maps every bucket to the indices of the stations in it.
+    """
+    zoom: int
+    polylines: tuple[Polyline, ...]
+    stations: tuple[Point, ...]
+    track_buckets: dict[Bucket, list[int]] = field(compare=False, repr=False)
+    station_buckets: dict[Bucket, list[int]] = field(compare=False, repr=False)
+
+    def visible_polylines(self, view: pygame.Rect) -> list[Polyline]:
+        """Return the polylines whose bounding box intersects view, in drawing order."""
+        indices = set()
+        for bucket in _buckets(view.left, view.top, view.right, view.bottom):
+            indices.update(self.track_buckets.get(bucket, ()))
+
+        visible = []
+        for i in sorted(indices):
+            min_x, min_y, max_x, max_y = self.polylines[i].bounds
+            if min_x <= view.right and max_x >= view.left and min_y <= view.bottom \
+                    and max_y >= view.top:
+                visible.append(self.polylines[i])
+
+        return visible
+
+    def visible_stations(self, view: pygame.Rect) -> list[Point]:
+        """Return the stations within view."""
+        return [self.stations[i]
+                for bucket in _buckets(view.left, view.top, view.right, view.bottom)
+                for i in self.station_buckets.get(bucket, ())
+                if view.collidepoint(self.stations[i])]
+
+
+class LevelOfDetail:
+    """The simplified geometry of a map for every zoom level in ZOOM_LEVELS."""
+
+    # Private Instance Attributes:
+    #   - _levels: Maps every zoom level to its geometry.
+
+    _levels: dict[int, DetailLevel]
+
+    def __init__(self, nodes: Iterable[Node]) -> None:
+        nodes = list(nodes)
+        chains = _corner_chains(nodes)
+        stations = [node.coordinates for node in nodes if node.is_station]
+        self._levels = {zoom: _build_level(zoom, chains, stations) for zoom in ZOOM_LEVELS}
+
+    def get_level(self, zoom: float) -> DetailLevel:
+        """Return the geometry of the most detailed level which is coarse enough for zoom."""
+        best = ZOOM_LEVELS[0]
+        for level in ZOOM_LEVELS:
+            if level <= zoom:
+                best = level
+
+        return self._levels[best]
+
+
+def draw_level(surface: pygame.Surface, level: DetailLevel, view: pygame.Rect,
+               transform: Callable[[Point], Point],
+               track_color: Optional[tuple[int, int, int]] = None) -> None:
+    """Draw the tracks, then the stations, of level which are within view, a rectangle
+    in map coordinates, on surface. transform maps coordinates of the map to
+    coordinates of surface.
+
+    The tracks are drawn in track_color, or in their line colors if it is None.
+    """
+    draw_tracks(surface, level, view, transform, track_color)
+    draw_stations(surface, level, view, transform)
+
+
+def draw_tracks(surface: pygame.Surface, level: DetailLevel, view: pygame.Rect,
+                transform: Callable[[Point], Point],
+                track_color: Optional[tuple[int, int, int]] = None) -> None:
+    """Draw the tracks of level which are within view on surface (see draw_level)."""
+    for polyline in level.visible_polylines(view):
+        pygame.draw.lines(surface, track_color or polyline.color, False,
+                          [transform(point) for point in polyline.points], TRACK_WIDTH)
+
+
+def draw_stations(surface: pygame.Surface, level: DetailLevel, view: pygame.Rect,
+                  transform: Callable[[Point], Point]) -> None:
+    """Draw the stations of level which are within view on surface (see draw_level)."""
+    for station in level.visible_stations(view):
+        pygame.draw.circle(surface, BLACK, transform(station), STATION_RADIUS)
+
+
+def _build_level(zoom: int, chains: list[tuple[list[Point], str]],
+                 stations: list[Point]) -> DetailLevel:
+    """Return the geometry of chains and stations simplified for zoom."""
+    polylines = []
+    for points, color in chains:
+        points = _simplify(points, zoom / 2)
+        xs = [point[0] for point in points]
+        ys = [point[1] for point in points]
+
+        # suppress chains which are smaller than a pixel
+        if max(xs) - min(xs) >= zoom or max(ys) - min(ys) >= zoom:
+            polylines.append(Polyline(tuple(points), color, (min(xs), min(ys), max(xs), max(ys))))
+
+    # keep the first station of every cell the size of a station circle
+    clusters = {}
+    cell = 2 * STATION_RADIUS * zoom
+    for station in sorted(stations):
+        clusters.setdefault((station[0] // cell, station[1] // cell), station)
+
+    track_buckets = {}
+    for i, polyline in enumerate(polylines):
+        for bucket in _buckets(*polyline.bounds):
+            track_buckets.setdefault(bucket, []).append(i)
+
+    station_buckets = {}
+    for i, station in enumerate(clusters.values()):
+        station_buckets.setdefault((station[0] // BUCKET_SIZE, station[1] // BUCKET_SIZE),
+                                   []).append(i)
+
+    return DetailLevel(zoom, tuple(polylines), tuple(clusters.values()),
+                       track_buckets, station_buckets)
+
+
+def _buckets(min_x: int, min_y: int, max_x: int, max_y: int) -> list[Bucket]:
+    """Return the buckets which the box from (min_x, min_y) to (max_x, max_y) intersects."""
+    return [(x, y) for x in range(min_x // BUCKET_SIZE, max_x // BUCKET_SIZE + 1)
+            for y in range(min_y // BUCKET_SIZE, max_y // BUCKET_SIZE + 1)]
+
+
+def _corner_chains(nodes: list[Node]) -> list[tuple[list[Point], str]]:
+    """Return every track of nodes once, merged into chains of the same color
+    through the corners which only continue a single line."""
+
+    def continues(node: Node) -> bool:
+        """Return whether node is a corner which only continues a single line."""
+        neighbours = node.get_neighbours()
+        return not node.is_station and len(neighbours) == 2 and \
+            len({node.get_color(u) for u in neighbours}) == 1
+
+    chains = []
+    walked = set()
+
+    for start in nodes:
+        if continues(start):
+            continue
+
+        for first in start.get_neighbours():
+            if (start, first) in walked:
+                continue
+
+            color = start.get_color(first)
+            points = [start.coordinates]
+            previous, node = start, first
+            while continues(node) and node not in walked:
+                walked.add(node)
+                points.append(node.coordinates)
+                previous, node = node, next(u for u in node.get_neighbours() if u != previous)
+
+            points.append(node.coordinates)
+            walked.add((node, previous))
+            chains.append((points, color))
+
+    # what is left are loops made only of corners which continue a line
+    for start in nodes:
+        if continues(start) and start not in walked:
+            walked.add(start)
+            points = [start.coordinates]
+            previous, node = start, next(iter(start.get_neighbours()))
+            color = start.get_color(node)
+            while node not in walked:
+                walked.add(node)
+                points.append(node.coordinates)
+                previous, node = node, next(u for u in node.get_neighbours() if u != previous)
+
+            points.append(node.coordinates)
+            chains.append((points, color))
+
+    return chains
+
+
+def _simplify(points: list[Point], tolerance: float) -> list[Point]:
+    """Return points simplified with the Ramer-Douglas-Peucker algorithm: no removed
+    point is further than tolerance from the returned polyline."""
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        (x_1, y_1), (x_2, y_2) = points[first], points[last]
+        d_x, d_y = x_2 - x_1, y_2 - y_1
+        length_squared = d_x ** 2 + d_y ** 2
+
+        farthest, distance = first, tolerance
+        for i in range(first + 1, last):
+            x_0, y_0 = points[i]
+            # the distance to the closest point of the segment, not of its line,
+            # so that chains which turn back are kept
+            t = 0 if length_squared == 0 else \
+                min(1, max(0, ((x_0 - x_1) * d_x + (y_0 - y_1) * d_y) / length_squared))
+            d = ((x_1 + t * d_x - x_0) ** 2 + (y_1 + t * d_y - y_0) ** 2) ** 0.5
+            if d > distance:
+                farthest, distance = i, d
+
+        if farthest != first:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
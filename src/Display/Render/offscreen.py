@@ -0,0 +1,191 @@
+"""This file contains the offscreen renderer of OpenMetroGuide, which draws
+a metro map and highlighted routes straight to PNG files without a window.
+
+Batches of routes are rendered by a pool of processes. The base layer of the map
+(every track and station) is rendered once, and each process only draws each
+route on top of a copy of it. The processes do not load the map: they find the
+routes on its graph, published once in a shared-memory GraphStore, from which
+they also take the coordinates and colors of the routes they draw.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import pygame
+
+from src.Base.map import Map
+from src.Display.Render.geometry import CanvasFit, GREY, fit_canvas, track_segments, \
+    route_segments, rgb
+from src.Display.Utils.general_utils import BLACK, WHITE
+from src.Display.Utils.graph_store import GraphReader, GraphStore
+
+# The city the graph of the map is published as, in the store of a batch
+GRAPH_CITY = 'offscreen'
+
+# The route query of an image: start station, destination station and optimization
+RouteQuery = tuple[str, str, str]
+
+
+class BaseLayer:
+    """The cached drawing of every track and station of a map, on which
+    routes are highlighted.
+
+    Instance Attributes:
+        - metro_map: The map being drawn.
+        - fit: Where the coordinates of the map are drawn on the surface.
+        - surface: The drawing of the map, with the tracks greyed out.
+    """
+    metro_map: Map
+    fit: CanvasFit
+    surface: pygame.Surface
+
+    def __init__(self, metro_map: Map, size: tuple[int, int]) -> None:
+        self.metro_map = metro_map
+        self.fit = fit_canvas(metro_map.get_all_nodes(), size)
+        self.surface = pygame.Surface(size)
+        self.surface.fill(WHITE)
+        _draw_tracks(self.surface, self.fit, track_segments(metro_map), 3, greyed=True)
+        _draw_stations(self.surface, self.fit, metro_map)
+
+    def render_route(self, path: list[int]) -> pygame.Surface:
+        """Return a new surface of the map with path, the IDs of the nodes of a route,
+        highlighted in its line colors, and its start and end stations labelled."""
+        nodes = [self.metro_map.get_node_by_id(node_id) for node_id in path]
+        return _draw_route(self.surface, self.fit,
+                           [(node_1.coordinates, node_2.coordinates, rgb(color))
+                            for node_1, node_2, color in route_segments(self.metro_map, path)],
+                           [node.coordinates for node in nodes if node.is_station],
+                           [(node.name, node.coordinates) for node in (nodes[0], nodes[-1])])
+
+
+def render_map(metro_map: Map, size: tuple[int, int] = (800, 800)) -> pygame.Surface:
+    """Return a surface of the given size with every track of metro_map in its
+    line color and every station."""
+    fit = fit_canvas(metro_map.get_all_nodes(), size)
+    surface = pygame.Surface(size)
+    surface.fill(WHITE)
+    _draw_tracks(surface, fit, track_segments(metro_map), 3)
+    _draw_stations(surface, fit, metro_map)
+
+    return surface
+
+
+def render_routes(metro_map: Map, queries: list[RouteQuery], out_dir: str,
+                  size: tuple[int, int] = (800, 800),
+                  processes: Optional[int] = None) -> list[Optional[str]]:
+    """Render a PNG image of each route query to out_dir, using processes worker
+    processes (os.cpu_count() if None). Return the paths of the images, in order,
+    with None for every query whose destination cannot be reached from its start.
+
+    Preconditions:
+        - every query's stations are stations of metro_map
+        - every query's optimization is in {'distance', 'cost'}
+        - the weights of the tracks of metro_map have been updated
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    layer = BaseLayer(metro_map, size)
+    jobs = [(i, query, out_dir) for i, query in enumerate(queries)]
+    processes = processes or os.cpu_count() or 1
+
+    store = GraphStore()
+    try:
+        store.publish(GRAPH_CITY, metro_map)
+        with ProcessPoolExecutor(processes, initializer=_init_worker,
+                                 initargs=(store.namespace,
+                                           pygame.image.tostring(layer.surface, 'RGB'),
+                                           layer.fit, size)) as executor:
+            return list(executor.map(_render_job, jobs,
+                                     chunksize=max(1, len(jobs) // (4 * processes))))
+    finally:
+        store.close()
+
+
+def route_file_name(index: int, query: RouteQuery) -> str:
+    """Return the file name of the image of the index-th route query."""
+    start, destination, optimization = query
+    safe = re.sub(r'[^\w-]+', '_', start + '-' + destination)
+
+    return str(index) + '-' + safe + '-' + optimization + '.png'
+
+
+# The surface of the base layer of the map, and where the map is drawn on it, in
+# this worker process
+_worker_base: Optional[tuple[pygame.Surface, CanvasFit]] = None
+
+# The reader of the store of the graph of the map, in this worker process
+_worker_reader: Optional[GraphReader] = None
+
+
+def _init_worker(namespace: str, base: bytes, fit: CanvasFit, size: tuple[int, int]) -> None:
+    """Attach a new worker process to the graph of the map in the store of namespace,
+    and take the base layer from base, the RGB bytes of its surface."""
+    global _worker_base, _worker_reader
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.font.init()
+    _worker_base = (pygame.image.fromstring(base, size, 'RGB'), fit)
+    _worker_reader = GraphReader(namespace)
+
+
+def _render_job(job: tuple[int, RouteQuery, str]) -> Optional[str]:
+    """Render the route of a job to a PNG file in a worker process and return its path,
+    or None if its destination cannot be reached from its start."""
+    index, query, out_dir = job
+    start, destination, optimization = query
+    graph = _worker_reader.get(GRAPH_CITY)
+    try:
+        path, _ = graph.route_ids(graph.get_id(start), graph.get_id(destination), optimization)
+    except ValueError:
+        return None
+
+    ends = [(graph.get_name(node_id), graph.get_coordinates(node_id))
+            for node_id in (path[0], path[-1])]
+    surface = _draw_route(*_worker_base,
+                          [(graph.get_coordinates(id_1), graph.get_coordinates(id_2),
+                            graph.get_color(id_1, id_2)) for id_1, id_2 in zip(path, path[1:])],
+                          [graph.get_coordinates(node_id) for node_id in path
+                           if graph.is_station(node_id)], ends)
+    file = os.path.join(out_dir, route_file_name(index, query))
+    pygame.image.save(surface, file)
+
+    return file
+
+
+def _draw_route(base: pygame.Surface, fit: CanvasFit,
+                segments: list[tuple[tuple[float, float], tuple[float, float],
+                                     tuple[int, int, int]]],
+                stations: list[tuple[float, float]],
+                ends: list[tuple[str, tuple[float, float]]]) -> pygame.Surface:
+    """Return a copy of base with a route drawn on it: its track segments, given by the
+    coordinates of their ends and their RGB values, its stations, given by their
+    coordinates, and the names of its ends, given with their coordinates."""
+    surface = base.copy()
+    for coordinates_1, coordinates_2, color in segments:
+        pygame.draw.line(surface, color, fit.to_canvas(coordinates_1),
+                         fit.to_canvas(coordinates_2), 5)
+
+    for coordinates in stations:
+        pygame.draw.circle(surface, BLACK, fit.to_canvas(coordinates), 5)
+
+    font = pygame.font.Font(None, 18)
+    for name, coordinates in dict(ends).items():
+        pos = fit.to_canvas(coordinates)
+        surface.blit(font.render(name, True, BLACK), (pos[0] + 4, pos[1] - 15))
+
+    return surface
+
+
+def _draw_tracks(surface: pygame.Surface, fit: CanvasFit, segments: list,
+                 width: int, greyed: bool = False) -> None:
+    """Draw the track segments on surface, in GREY if greyed and otherwise in their colors."""
+    for node_1, node_2, color in segments:
+        pygame.draw.line(surface, GREY if greyed else rgb(color),
+                         fit.to_canvas(node_1.coordinates), fit.to_canvas(node_2.coordinates),
+                         width)
+
+
+def _draw_stations(surface: pygame.Surface, fit: CanvasFit, metro_map: Map) -> None:
+    """Draw every station of metro_map on surface."""
+    for node in metro_map.get_all_nodes('station'):
+        pygame.draw.circle(surface, BLACK, fit.to_canvas(node.coordinates), 5)
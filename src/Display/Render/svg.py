@@ -0,0 +1,66 @@
+"""This file contains the SVG writer of OpenMetroGuide, which draws a metro
+map and an optional highlighted route as an SVG document. It does not depend
+on pygame.
+"""
+from typing import Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from src.Base.map import Map
+from src.Display.Render.geometry import GREY, fit_canvas, track_segments, route_segments, rgb
+
+
+def map_to_svg(metro_map: Map, size: tuple[int, int] = (800, 800),
+               path: Optional[list[int]] = None) -> str:
+    """Return an SVG document of the given size drawing metro_map.
+
+    If path, the IDs of the nodes of a route, is not None, the other tracks are
+    greyed out, path is highlighted in its line colors and its start and end stations
+    are labelled.
+    """
+    fit = fit_canvas(metro_map.get_all_nodes(), size)
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{size[0]}" '
+             f'height="{size[1]}" viewBox="0 0 {size[0]} {size[1]}">',
+             '<rect width="100%" height="100%" fill="white"/>',
+             '<g stroke-linecap="round" fill="none">']
+
+    for node_1, node_2, color in track_segments(metro_map):
+        parts.append(_line(fit.to_canvas(node_1.coordinates), fit.to_canvas(node_2.coordinates),
+                           GREY if path is not None else rgb(color), 3))
+
+    if path is not None:
+        for node_1, node_2, color in route_segments(metro_map, path):
+            parts.append(_line(fit.to_canvas(node_1.coordinates),
+                               fit.to_canvas(node_2.coordinates), rgb(color), 5))
+
+    parts.append('</g>')
+    parts.append('<g fill="black">')
+    for node in metro_map.get_all_nodes('station'):
+        x, y = fit.to_canvas(node.coordinates)
+        parts.append(f'<circle cx="{x}" cy="{y}" r="5"/>')
+
+    if path is not None:
+        for node_id in dict.fromkeys((path[0], path[-1])):
+            node = metro_map.get_node_by_id(node_id)
+            x, y = fit.to_canvas(node.coordinates)
+            parts.append(f'<text x="{x + 4}" y="{y - 6}" font-family="sans-serif" '
+                         f'font-size="14">{escape(node.name)}</text>')
+
+    parts.append('</g>')
+    parts.append('</svg>')
+
+    return '\n'.join(parts)
+
+
+def save_svg(metro_map: Map, file: str, size: tuple[int, int] = (800, 800),
+             path: Optional[list[int]] = None) -> None:
+    """Write the SVG document of metro_map (see map_to_svg) to file."""
+    with open(file, 'w', encoding='utf-8') as f:
+        f.write(map_to_svg(metro_map, size, path))
+
+
+def _line(start: tuple[int, int], end: tuple[int, int], color: tuple[int, int, int],
+          width: int) -> str:
+    """Return the SVG line element from start to end."""
+    stroke = quoteattr('rgb' + str(color))
+    return (f'<line x1="{start[0]}" y1="{start[1]}" x2="{end[0]}" y2="{end[1]}" '
+            f'stroke={stroke} stroke-width="{width}"/>')
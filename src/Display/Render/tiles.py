@@ -0,0 +1,157 @@
+"""This file contains the tiled renderer of the Admin and Client canvases.
+
+The map, as seen at a zoom level, is split into square tiles of TILE_SIZE pixels
+which are only drawn once they become visible. Drawn tiles are kept in a least
+recently used cache bounded by a memory budget, so a view over a map of any size
+only draws the tiles it has not seen before, and then blits the visible tiles.
+
+When the map is edited, only the tiles which the changed tracks and stations
+touch are dropped from the cache.
+"""
+import math
+from collections import OrderedDict
+
+import pygame
+
+from src.Display.Render.geometry import GREY
+from src.Display.Render.level_of_detail import DetailLevel, STATION_RADIUS, TRACK_WIDTH, \
+    draw_level
+from src.Display.Render.view import ViewTransform
+
+# The side of a tile, in pixels
+TILE_SIZE = 256
+
+# The default number of bytes the drawn tiles may take up
+TILE_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Pixels around a tile whose tracks and stations can still be drawn over it
+TILE_BLEED = STATION_RADIUS + TRACK_WIDTH
+
+# The zoom level of a tile and whether its tracks are greyed out
+Style = tuple[float, bool]
+TileKey = tuple[float, bool, int, int]
+
+
+class TileRenderer:
+    """Draws detail levels on a canvas from a cache of tiles.
+
+    Instance Attributes:
+        - memory_budget: The number of bytes the cached tiles may take up.
+    """
+
+    # Private Instance Attributes:
+    #   - _tiles: The drawn tiles, from the least to the most recently used, by zoom
+    #             level, whether they are greyed out, and column and row.
+    #   - _levels: The detail level which the tiles of every zoom level and greying
+    #              were drawn from.
+    #   - _memory: The number of bytes the drawn tiles take up.
+
+    memory_budget: int
+    _tiles: OrderedDict[TileKey, pygame.Surface]
+    _levels: dict[Style, DetailLevel]
+    _memory: int
+
+    def __init__(self, memory_budget: int = TILE_MEMORY_BUDGET) -> None:
+        self.memory_budget = memory_budget
+        self._tiles = OrderedDict()
+        self._levels = {}
+        self._memory = 0
+
+    def draw(self, screen: pygame.Surface, canvas: pygame.Rect, level: DetailLevel,
+             view: ViewTransform, greyed: bool = False) -> None:
+        """Draw the tracks, greyed out if greyed, and the stations of level within
+        canvas on screen, as seen through view.
+
+        If level is not the level the cached tiles were drawn from, only the tiles
+        touched by what changed in between are drawn again.
+        """
+        style = (view.zoom, greyed)
+        previous = self._levels.get(style)
+        if previous is not level:
+            if previous is not None:
+                self._invalidate_changes(style, previous, level)
+
+            # forget the levels of the styles without tiles left, so that they can be freed
+            cached = {(zoom, grey) for zoom, grey, _, _ in self._tiles}
+            self._levels = {other: self._levels[other] for other in self._levels
+                            if other in cached}
+            self._levels[style] = level
+
+        # the tiles are laid out on the map scaled by the zoom level, which the view
+        # translation then places on the canvas
+        left = canvas.left - view.translation[0]
+        top = canvas.top - view.translation[1]
+
+        clip = screen.get_clip()
+        screen.set_clip(canvas)
+
+        for row in range(top // TILE_SIZE, (top + canvas.height - 1) // TILE_SIZE + 1):
+            for column in range(left // TILE_SIZE, (left + canvas.width - 1) // TILE_SIZE + 1):
+                tile = self._get_tile((view.zoom, greyed, column, row), level)
+                screen.blit(tile, (column * TILE_SIZE + view.translation[0],
+                                   row * TILE_SIZE + view.translation[1]))
+
+        screen.set_clip(clip)
+        self._evict()
+
+    def get_memory(self) -> int:
+        """Return the number of bytes the cached tiles take up."""
+        return self._memory
+
+    def _get_tile(self, key: TileKey, level: DetailLevel) -> pygame.Surface:
+        """Return the tile of key, drawing it from level if it is not cached."""
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            return tile
+
+        zoom, greyed, column, row = key
+        tile = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+        tile.fill((0, 0, 0, 0))
+
+        left, top = column * TILE_SIZE, row * TILE_SIZE
+
+        def transform(point: tuple[int, int]) -> tuple[int, int]:
+            """Return the coordinates of point on the tile."""
+            return round(point[0] / zoom) - left, round(point[1] / zoom) - top
+
+        view = pygame.Rect(math.floor((left - TILE_BLEED) * zoom),
+                           math.floor((top - TILE_BLEED) * zoom),
+                           math.ceil((TILE_SIZE + 2 * TILE_BLEED) * zoom),
+                           math.ceil((TILE_SIZE + 2 * TILE_BLEED) * zoom))
+        draw_level(tile, level, view, transform, GREY if greyed else None)
+
+        self._tiles[key] = tile
+        self._memory += tile.get_bytesize() * TILE_SIZE * TILE_SIZE
+        return tile
+
+    def _evict(self) -> None:
+        """Drop the least recently used tiles until they fit in memory_budget."""
+        while self._memory > self.memory_budget and self._tiles:
+            _, tile = self._tiles.popitem(last=False)
+            self._memory -= tile.get_bytesize() * TILE_SIZE * TILE_SIZE
+
+    def _invalidate_changes(self, style: Style, previous: DetailLevel,
+                            level: DetailLevel) -> None:
+        """Drop the cached tiles of style touched by the tracks and stations
+        which are only in one of previous and level."""
+        for polyline in set(previous.polylines) ^ set(level.polylines):
+            self._invalidate_box(style, polyline.bounds)
+
+        for x, y in set(previous.stations) ^ set(level.stations):
+            self._invalidate_box(style, (x, y, x, y))
+
+    def _invalidate_box(self, style: Style, bounds: tuple[int, int, int, int]) -> None:
+        """Drop the cached tiles of style which touch bounds, in map coordinates."""
+        zoom, greyed = style
+        min_x, min_y, max_x, max_y = bounds
+        first_column = (round(min_x / zoom) - TILE_BLEED) // TILE_SIZE
+        last_column = (round(max_x / zoom) + TILE_BLEED) // TILE_SIZE
+        first_row = (round(min_y / zoom) - TILE_BLEED) // TILE_SIZE
+        last_row = (round(max_y / zoom) + TILE_BLEED) // TILE_SIZE
+
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                tile = self._tiles.pop((zoom, greyed, column, row), None)
+                if tile is not None:
+                    self._memory -= tile.get_bytesize() * TILE_SIZE * TILE_SIZE
@@ -0,0 +1,58 @@
+"""This file contains the view transform of the Admin and Client canvases,
+which maps coordinates of the map to coordinates of the screen.
+
+The transform is affine: a uniform scale by 1 / zoom followed by a translation.
+Hit-testing uses the inverse of the same transform, so what is clicked is always
+what is drawn, at any fractional zoom level and panning offset.
+"""
+# The bounds of the zoom level, in map units per pixel
+MIN_ZOOM = 1
+MAX_ZOOM = 4
+
+Point = tuple[float, float]
+
+
+class ViewTransform:
+    """The affine transformation from map coordinates to screen coordinates
+
+        screen = round(map / zoom) + translation
+
+    The translation is kept in whole pixels, so that panning moves everything
+    drawn by the same whole number of pixels.
+
+    Instance Attributes:
+        - zoom: The number of map units per pixel.
+        - translation: The screen coordinates of the origin of the map.
+
+    Representation Invariants:
+        - MIN_ZOOM <= self.zoom <= MAX_ZOOM
+    """
+    zoom: float
+    translation: tuple[int, int]
+
+    def __init__(self, zoom: float = MIN_ZOOM, translation: tuple[int, int] = (0, 0)) -> None:
+        self.zoom = zoom
+        self.translation = translation
+
+    def to_screen(self, point: Point) -> tuple[int, int]:
+        """Return the screen coordinates of point, given in map coordinates."""
+        return (round(point[0] / self.zoom) + self.translation[0],
+                round(point[1] / self.zoom) + self.translation[1])
+
+    def to_world(self, point: Point) -> tuple[float, float]:
+        """Return the map coordinates of point, given in screen coordinates.
+        This is the inverse of to_screen, without its rounding."""
+        return ((point[0] - self.translation[0]) * self.zoom,
+                (point[1] - self.translation[1]) * self.zoom)
+
+    def pan(self, d_x: float, d_y: float) -> None:
+        """Move everything drawn by (d_x, d_y) pixels, rounded to whole pixels."""
+        self.translation = (self.translation[0] + round(d_x), self.translation[1] + round(d_y))
+
+    def zoom_at(self, factor: float, anchor: tuple[int, int]) -> None:
+        """Multiply the zoom level by factor, within MIN_ZOOM and MAX_ZOOM, keeping
+        the map point under anchor, in screen coordinates, in place."""
+        world = self.to_world(anchor)
+        self.zoom = min(MAX_ZOOM, max(MIN_ZOOM, self.zoom * factor))
+        self.translation = (round(anchor[0] - world[0] / self.zoom),
+                            round(anchor[1] - world[1] / self.zoom))
@@ -0,0 +1,182 @@
+"""This file contains the edit journal of the Admin editor. Every change to the
+active nodes is made through the journal, which makes it possible to undo/redo
+changes and to save them as row deltas instead of rewriting the whole map.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from src.Base.node import Node
+from src.Display.Utils.storage_manager import INSERT_NODE, DELETE_NODE, \
+    INSERT_CONNECTION, DELETE_CONNECTION
+
+ADD_NODE = 'add_node'
+REMOVE_NODE = 'remove_node'
+ADD_TRACK = 'add_track'
+REMOVE_TRACK = 'remove_track'
+REPLACE_CORNER = 'replace_corner'
+
+# The number of steps which can be undone
+UNDO_LIMIT = 100
+
+
+@dataclass(frozen=True)
+class Edit:
+    """A single reversible change to the active nodes of the editor.
+
+    Instance Attributes:
+        - kind: The kind of change.
+        - node: The node added/removed, an endpoint of the track, or the node being replaced.
+        - other: The other endpoint of the track, or the node replacing node.
+        - color: The color of the track.
+
+    Representation Invariants:
+        - self.kind in {ADD_NODE, REMOVE_NODE, ADD_TRACK, REMOVE_TRACK, REPLACE_CORNER}
+        - (self.kind in {ADD_NODE, REMOVE_NODE}) == (self.other is None)
+    """
+    kind: str
+    node: Node
+    other: Optional[Node] = None
+    color: str = ''
+
+    def inverse(self) -> Edit:
+        """Return the edit which reverts this edit."""
+        if self.kind == ADD_NODE:
+            return Edit(REMOVE_NODE, self.node)
+        elif self.kind == REMOVE_NODE:
+            return Edit(ADD_NODE, self.node)
+        elif self.kind == ADD_TRACK:
+            return Edit(REMOVE_TRACK, self.node, self.other, self.color)
+        elif self.kind == REMOVE_TRACK:
+            return Edit(ADD_TRACK, self.node, self.other, self.color)
+        else:
+            return Edit(REPLACE_CORNER, self.other, self.node)
+
+
+class EditJournal:
+    """The log of edits made by an Admin to the nodes of a city.
+
+    Edits are grouped into steps; a step is what a single undo/redo reverts/reapplies.
+    Only the latest UNDO_LIMIT steps are kept, so the journal does not grow with the
+    length of the editing session.
+
+    Instance Attributes:
+        - city_name: The city whose nodes are being edited.
+        - active_nodes: The nodes being edited.
+        - version: The number of edits performed on active_nodes so far, including
+        undone and redone ones. It changes whenever active_nodes does.
+    """
+
+    # Private Instance Attributes:
+    #   - _step: The edits of the step which is still in progress.
+    #   - _undo_stack: The latest UNDO_LIMIT completed steps, the latest one last.
+    #   - _redo_stack: The undone steps, the latest undone one last.
+    #   - _deltas: The row deltas which have not been taken for saving yet.
+
+    city_name: str
+    active_nodes: set[Node]
+    version: int
+    _step: list[Edit]
+    _undo_stack: deque[list[Edit]]
+    _redo_stack: list[list[Edit]]
+    _deltas: list[tuple[str, tuple]]
+
+    def __init__(self, city_name: str, active_nodes: set[Node]) -> None:
+        self.city_name = city_name
+        self.active_nodes = active_nodes
+        self.version = 0
+        self._step = []
+        self._undo_stack = deque(maxlen=UNDO_LIMIT)
+        self._redo_stack = []
+        self._deltas = []
+
+    def apply(self, edit: Edit) -> None:
+        """Apply edit to the active nodes as part of the current step."""
+        self._perform(edit)
+        self._step.append(edit)
+
+    def end_step(self) -> None:
+        """Complete the current step. Any undone steps can no longer be redone."""
+        if self._step:
+            self._undo_stack.append(self._step)
+            self._redo_stack = []
+            self._step = []
+
+    def undo(self) -> None:
+        """Revert the latest completed step, if any."""
+        self.end_step()
+        if self._undo_stack:
+            step = self._undo_stack.pop()
+            for edit in reversed(step):
+                self._perform(edit.inverse())
+            self._redo_stack.append(step)
+
+    def redo(self) -> None:
+        """Reapply the latest undone step, if any."""
+        if self._redo_stack and not self._step:
+            step = self._redo_stack.pop()
+            for edit in step:
+                self._perform(edit)
+            self._undo_stack.append(step)
+
+    def has_changes(self) -> bool:
+        """Return whether there are row deltas which have not been taken yet."""
+        return self._deltas != []
+
+    def take_deltas(self) -> tuple[tuple[str, tuple], ...]:
+        """Return, in order, the row deltas of every edit performed since the
+        last call, to be replayed by storage_manager.write_deltas."""
+        deltas, self._deltas = tuple(self._deltas), []
+        return deltas
+
+    def _perform(self, edit: Edit) -> None:
+        """Mutate the active nodes according to edit and record its row deltas.
+
+        Preconditions:
+            - edit.kind != REMOVE_NODE or edit.node.get_neighbours() == set()
+            - edit.kind != ADD_TRACK or not edit.node.is_adjacent(edit.other)
+            - edit.kind != REMOVE_TRACK or edit.node.is_adjacent(edit.other)
+        """
+        self.version += 1
+
+        if edit.kind == ADD_NODE:
+            self.active_nodes.add(edit.node)
+            self._deltas.append((INSERT_NODE, self._node_row(edit.node)))
+
+        elif edit.kind == REMOVE_NODE:
+            self.active_nodes.remove(edit.node)
+            self._deltas.append((DELETE_NODE, self._node_row(edit.node)))
+
+        elif edit.kind == ADD_TRACK:
+            edit.node.add_track(edit.other, edit.color)
+            self._record_track(INSERT_CONNECTION, edit.node, edit.other, edit.color)
+
+        elif edit.kind == REMOVE_TRACK:
+            edit.node.remove_track(edit.other)
+            self._record_track(DELETE_CONNECTION, edit.node, edit.other, edit.color)
+
+        else:
+            old, new = edit.node, edit.other
+            for neighbour in old.get_neighbours():
+                color = old.get_color(neighbour)
+                old.remove_track(neighbour)
+                self._record_track(DELETE_CONNECTION, old, neighbour, color)
+                new.add_track(neighbour, color)
+                self._record_track(INSERT_CONNECTION, new, neighbour, color)
+
+            self.active_nodes.remove(old)
+            self._deltas.append((DELETE_NODE, self._node_row(old)))
+            self.active_nodes.add(new)
+            self._deltas.append((INSERT_NODE, self._node_row(new)))
+
+    def _record_track(self, kind: str, node_1: Node, node_2: Node, color: str) -> None:
+        """Record the deltas of both connection rows of the track between node_1 and node_2."""
+        self._deltas.append((kind, (self.city_name, node_1.name, node_2.name, color)))
+        self._deltas.append((kind, (self.city_name, node_2.name, node_1.name, color)))
+
+    def _node_row(self, node: Node) -> tuple[str, str, str, int, int, str]:
+        """Return the row of the nodes table which represents node."""
+        return (self.city_name, node.name, str(node.is_station), node.coordinates[0],
+                node.coordinates[1], node.zone)
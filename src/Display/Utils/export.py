@@ -0,0 +1,105 @@
+"""This file contains the exporter of OpenMetroGuide, which dumps the maps stored
+in the local database as JSON lines or CSV files.
+
+Rows are streamed from the database and written as they are read, so a database
+of any number of cities is exported in constant memory.
+
+Run from the repository root:
+    python -m src.Display.Utils.export jsonl OUT.jsonl [--city CITY ...] [--db map_storage.db]
+    python -m src.Display.Utils.export csv OUT_DIR [--city CITY ...] [--db map_storage.db]
+"""
+import argparse
+import csv
+import json
+import os
+from typing import Iterable, Iterator, Optional, TextIO
+
+from src.Display.Utils import storage_manager
+
+# The columns of the nodes and connections tables, as written to CSV files
+NODE_COLUMNS = ('city', 'name', 'is_station', 'x', 'y', 'zone')
+CONNECTION_COLUMNS = ('city', 'name_1', 'name_2', 'color')
+
+
+def iter_records(cities: Optional[Iterable[str]] = None) -> Iterator[dict]:
+    """Yield a record for each of cities (every city if None), followed by a record for
+    each of its nodes and then for each of its connections.
+
+    A record is a dict whose 'type' is 'city', 'node' or 'connection', and whose other
+    items are the columns of the corresponding row. Every track has a connection
+    record in each direction, as it is stored.
+    """
+    for city in cities if cities is not None else storage_manager.iter_cities():
+        yield {'type': 'city', 'city': city}
+
+        for row in storage_manager.iter_node_rows(city):
+            record = dict(zip(NODE_COLUMNS, row))
+            record['is_station'] = record['is_station'] == 'True'
+            yield {'type': 'node', **record}
+
+        for row in storage_manager.iter_connection_rows(city):
+            yield {'type': 'connection', **dict(zip(CONNECTION_COLUMNS, row))}
+
+
+def export_jsonl(out: TextIO, cities: Optional[Iterable[str]] = None) -> int:
+    """Write the records of cities (see iter_records) to out as JSON lines, and return
+    the number of records written."""
+    count = 0
+    for record in iter_records(cities):
+        out.write(json.dumps(record))
+        out.write('\n')
+        count += 1
+
+    return count
+
+
+def export_csv(nodes_out: TextIO, connections_out: TextIO,
+               cities: Optional[Iterable[str]] = None) -> int:
+    """Write the node rows of cities (every city if None) to nodes_out and their
+    connection rows to connections_out as CSV with a header, and return the number
+    of rows written."""
+    nodes_writer = csv.writer(nodes_out)
+    connections_writer = csv.writer(connections_out)
+    nodes_writer.writerow(NODE_COLUMNS)
+    connections_writer.writerow(CONNECTION_COLUMNS)
+    count = 0
+
+    for city in cities if cities is not None else storage_manager.iter_cities():
+        for row in storage_manager.iter_node_rows(city):
+            nodes_writer.writerow(row)
+            count += 1
+
+        for row in storage_manager.iter_connection_rows(city):
+            connections_writer.writerow(row)
+            count += 1
+
+    return count
+
+
+def main() -> None:
+    """Run an export from the command line."""
+    parser = argparse.ArgumentParser(description='Export the maps of OpenMetroGuide.')
+    parser.add_argument('format', choices=('jsonl', 'csv'))
+    parser.add_argument('out', help='the JSON lines file, or the directory of the CSV files')
+    parser.add_argument('--city', action='append', help='a city to export (default: all)')
+    parser.add_argument('--db', default='src/Display/Utils/map_storage.db',
+                        help='the database to export from')
+    args = parser.parse_args()
+
+    storage_manager.DB_PATH = args.db
+    if args.format == 'jsonl':
+        with open(args.out, 'w', encoding='utf-8') as out:
+            count = export_jsonl(out, args.city)
+    else:
+        os.makedirs(args.out, exist_ok=True)
+        with open(os.path.join(args.out, 'nodes.csv'), 'w', newline='', encoding='utf-8') \
+                as nodes_out, \
+                open(os.path.join(args.out, 'connections.csv'), 'w', newline='',
+                     encoding='utf-8') as connections_out:
+            count = export_csv(nodes_out, connections_out, args.city)
+
+    print(f'{count} records written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
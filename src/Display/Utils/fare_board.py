@@ -0,0 +1,44 @@
+"""This file contains the fare board stage of OpenMetroGuide, which computes the
+fare matrix of a stored map and saves it for fare boards to look fares up in.
+
+Run from the repository root:
+    python -m src.Display.Utils.fare_board CITY OUT.npy [--db map_storage.db]
+"""
+import argparse
+import time
+
+from src.Base.fares import FareMatrix
+from src.Display.Utils import storage_manager
+
+
+def save_fares(city: str, path: str) -> FareMatrix:
+    """Compute the fare matrix of the stored map of city, save it to path and return it.
+
+    Preconditions:
+        - city exists in the local database
+    """
+    metro_map = storage_manager.get_map(city)
+    metro_map.update_weights()
+    matrix = FareMatrix.from_map(metro_map)
+    matrix.save(path)
+    return matrix
+
+
+def main() -> None:
+    """Save the fare matrix of a city from the command line."""
+    parser = argparse.ArgumentParser(description='Save the fare matrix of a stored map.')
+    parser.add_argument('city')
+    parser.add_argument('out', help='the .npy file of the matrix')
+    parser.add_argument('--db', default='src/Display/Utils/map_storage.db',
+                        help='the database to read the map from')
+    args = parser.parse_args()
+
+    storage_manager.DB_PATH = args.db
+    start = time.perf_counter()
+    matrix = save_fares(args.city, args.out)
+    print(f'fares between {len(matrix.stations)} stations saved to {args.out} in '
+          f'{time.perf_counter() - start:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
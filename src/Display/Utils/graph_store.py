@@ -0,0 +1,408 @@
+"""This file contains the shared-memory graph store of OpenMetroGuide, from which
+worker processes find routes on the graphs of cities without each building its
+own copy of their Map and Node objects.
+
+The graph of a city is published by one process as a single shared memory
+segment of flat arrays: the tracks of every node in compressed sparse rows, with
+their distance and cost weights, the coordinates of the nodes, and their names,
+sorted so that a name is found by binary search. Whether every node is a station
+and the color of every track are kept too, so that routes can be drawn from it. Worker processes attach to the
+segment read-only, so every array is shared by all of them.
+
+Every city also has a pointer segment, which holds the generation of its graph.
+Publishing a new revision of a city writes a new segment first, and only then
+the new generation into the pointer, so that a worker sees either the old graph
+or the new one as a whole. The old segment is unlinked right away, and is freed
+once the last worker which attached to it lets it go.
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import math
+import secrets
+import struct
+from array import array
+from multiprocessing import shared_memory
+from typing import Optional
+
+from src.Base.map import Map
+from src.Display.Render.geometry import rgb
+
+# The header of a graph segment: a magic number, then the number of nodes, of
+# tracks (counting both ways), and of bytes of the names. The arrays after it are
+# in the byte order of the machine, which every worker shares.
+HEADER = struct.Struct('=8sQQQ')
+
+# The magic number of a graph segment
+MAGIC = b'OMGRAPH2'
+
+# The layout of a pointer segment: the generation of the graph of its city
+POINTER = struct.Struct('=Q')
+
+
+class SharedGraph:
+    """The read-only graph of a city, as published in shared memory.
+
+    Instance Attributes:
+        - city: The city of the graph.
+        - generation: The generation of the graph, counting its publications.
+        - node_count: The number of nodes of the graph.
+
+    Representation Invariants:
+        - the names of the nodes are sorted by their IDs
+    """
+
+    # Private Instance Attributes:
+    #   - _segment: The shared memory segment of the graph.
+    #   - _views: Every view of _segment, which are released before it is closed.
+    #   - _offsets: The index of the first track of every node, at the index of its
+    #               ID, and the number of tracks at the end.
+    #   - _targets: The ID of the node every track leads to.
+    #   - _weights: The weight of every track, by optimization.
+    #   - _x: The x coordinate of every node.
+    #   - _y: The y coordinate of every node.
+    #   - _name_offsets: The index of the first byte of the name of every node in
+    #                    _names, and the number of bytes at the end.
+    #   - _names: The names of the nodes, encoded in UTF-8 one after another.
+    #   - _stations: 1 for every node which is a station, and 0 for every corner.
+    #   - _colors: The red, green and blue of the color of every track.
+
+    city: str
+    generation: int
+    node_count: int
+    _segment: shared_memory.SharedMemory
+    _views: list[memoryview]
+    _offsets: memoryview
+    _targets: memoryview
+    _weights: dict[str, memoryview]
+    _x: memoryview
+    _y: memoryview
+    _name_offsets: memoryview
+    _names: memoryview
+    _stations: memoryview
+    _colors: memoryview
+
+    def __init__(self, city: str, generation: int, segment: shared_memory.SharedMemory) -> None:
+        """Preconditions:
+            - segment holds the contents returned by graph_bytes
+        """
+        self.city = city
+        self.generation = generation
+        self._segment = segment
+        self._views = []
+
+        magic, nodes, tracks, name_bytes = HEADER.unpack_from(segment.buf)
+        if magic != MAGIC:
+            raise ValueError
+        self.node_count = nodes
+
+        position = HEADER.size
+        views = []
+        for length, code in ((nodes + 1, 'q'), (tracks, 'q'), (tracks, 'd'), (tracks, 'd'),
+                             (nodes, 'd'), (nodes, 'd'), (nodes + 1, 'q'), (name_bytes, 'B'),
+                             (nodes, 'B'), (3 * tracks, 'B')):
+            size = length * struct.calcsize(code)
+            view = segment.buf[position:position + size]
+            readonly = view.toreadonly()
+            views.append(readonly.cast(code))
+            self._views.extend((view, readonly, views[-1]))
+            position += size
+
+        self._offsets, self._targets, distance, cost, self._x, self._y, \
+            self._name_offsets, self._names, self._stations, self._colors = views
+        self._weights = {'distance': distance, 'cost': cost}
+
+    def get_name(self, node_id: int) -> str:
+        """Return the name of the node whose ID is node_id.
+
+        Preconditions:
+            - 0 <= node_id < self.node_count
+        """
+        return bytes(self._names[self._name_offsets[node_id]:
+                                 self._name_offsets[node_id + 1]]).decode('utf-8')
+
+    def get_id(self, name: str) -> int:
+        """Return the ID of the node named name. Raise ValueError if there is none."""
+        low, high = 0, self.node_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_name(middle) < name:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == self.node_count or self.get_name(low) != name:
+            raise ValueError
+        return low
+
+    def get_coordinates(self, node_id: int) -> tuple[float, float]:
+        """Return the coordinates of the node whose ID is node_id.
+
+        Preconditions:
+            - 0 <= node_id < self.node_count
+        """
+        return self._x[node_id], self._y[node_id]
+
+    def is_station(self, node_id: int) -> bool:
+        """Return whether the node whose ID is node_id is a station.
+
+        Preconditions:
+            - 0 <= node_id < self.node_count
+        """
+        return self._stations[node_id] == 1
+
+    def get_color(self, node_id: int, neighbour_id: int) -> tuple[int, int, int]:
+        """Return the RGB value of the color of the track between the nodes whose IDs are
+        node_id and neighbour_id. Raise ValueError if there is no such track.
+
+        Preconditions:
+            - 0 <= node_id < self.node_count
+        """
+        for track in range(self._offsets[node_id], self._offsets[node_id + 1]):
+            if self._targets[track] == neighbour_id:
+                return self._colors[3 * track], self._colors[3 * track + 1], \
+                    self._colors[3 * track + 2]
+        raise ValueError
+
+    def route_ids(self, start: int, destination: int,
+                  optimization: str) -> tuple[list[int], float]:
+        """Return the IDs of the nodes of the most optimized route from the node whose
+        ID is start to the node whose ID is destination, and its score.
+
+        The search is A*, guided by the straight distance when optimizing by distance,
+        and Dijkstra's algorithm otherwise. Raise ValueError if the destination cannot
+        be reached from the start.
+
+        Preconditions:
+            - optimization in {'distance', 'cost'}
+            - 0 <= start < self.node_count
+            - 0 <= destination < self.node_count
+        """
+        offsets, targets, weights = self._offsets, self._targets, self._weights[optimization]
+        xs, ys = self._x, self._y
+        end_x, end_y = xs[destination], ys[destination]
+
+        def straight(node_id: int) -> float:
+            """Return the straight distance from node_id to the destination."""
+            return math.hypot(xs[node_id] - end_x, ys[node_id] - end_y)
+
+        heuristic = straight if optimization == 'distance' else None
+        scores = [math.inf] * self.node_count
+        previous = [-1] * self.node_count
+        is_settled = bytearray(self.node_count)
+        scores[start] = 0
+        queue = [(heuristic(start) if heuristic is not None else 0, start)]
+
+        while queue:
+            node_id = heapq.heappop(queue)[1]
+            if is_settled[node_id]:
+                continue
+            is_settled[node_id] = 1
+            if node_id == destination:
+                break
+
+            score = scores[node_id]
+            for track in range(offsets[node_id], offsets[node_id + 1]):
+                neighbour_id = targets[track]
+                new_score = score + weights[track]
+                if new_score < scores[neighbour_id]:
+                    scores[neighbour_id] = new_score
+                    previous[neighbour_id] = node_id
+                    heapq.heappush(queue, (new_score + heuristic(neighbour_id)
+                                           if heuristic is not None else new_score,
+                                           neighbour_id))
+        else:
+            raise ValueError
+
+        path = [destination]
+        while path[-1] != start:
+            path.append(previous[path[-1]])
+        path.reverse()
+
+        return path, scores[destination]
+
+    def optimized_route(self, start: str, destination: str,
+                        optimization: str = 'distance') -> list[str]:
+        """Return the names of the nodes of the most optimized route from the node
+        named start to the node named destination (see route_ids).
+
+        Preconditions:
+            - optimization in {'distance', 'cost'}
+        """
+        path, _ = self.route_ids(self.get_id(start), self.get_id(destination), optimization)
+        return [self.get_name(node_id) for node_id in path]
+
+    def close(self) -> None:
+        """Let the segment of the graph go. The graph cannot be used afterwards."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._segment.close()
+
+
+class GraphStore:
+    """Publishes the graphs of cities in shared memory, as their owner.
+
+    Instance Attributes:
+        - namespace: The prefix of the names of the segments of this store, which
+        workers attach to it by.
+    """
+
+    # Private Instance Attributes:
+    #   - _pointers: The pointer segment of every published city.
+    #   - _segments: The graph segment of the latest generation of every published city.
+
+    namespace: str
+    _pointers: dict[str, shared_memory.SharedMemory]
+    _segments: dict[str, shared_memory.SharedMemory]
+
+    def __init__(self, namespace: Optional[str] = None) -> None:
+        self.namespace = namespace if namespace is not None else 'omg' + secrets.token_hex(3)
+        self._pointers = {}
+        self._segments = {}
+
+    def publish(self, city: str, metro_map: Map) -> int:
+        """Publish the graph of metro_map as the graph of city, in place of its previous
+        graph, and return its generation.
+
+        Preconditions:
+            - the weights of the tracks of metro_map have been updated
+        """
+        pointer = self._pointers.get(city)
+        if pointer is None:
+            pointer = shared_memory.SharedMemory(pointer_name(self.namespace, city), create=True,
+                                                 size=POINTER.size)
+            POINTER.pack_into(pointer.buf, 0, 0)
+            self._pointers[city] = pointer
+
+        generation = POINTER.unpack_from(pointer.buf)[0] + 1
+        content = graph_bytes(metro_map)
+        segment = shared_memory.SharedMemory(segment_name(self.namespace, city, generation),
+                                             create=True, size=len(content))
+        segment.buf[:len(content)] = content
+
+        # the graph is complete before the pointer moves to it
+        POINTER.pack_into(pointer.buf, 0, generation)
+        previous = self._segments.get(city)
+        self._segments[city] = segment
+        if previous is not None:
+            previous.close()
+            previous.unlink()
+
+        return generation
+
+    def close(self) -> None:
+        """Unlink every segment of the store. Workers which are still attached keep
+        their graphs until they let them go."""
+        for segment in list(self._segments.values()) + list(self._pointers.values()):
+            segment.close()
+            segment.unlink()
+        self._segments = {}
+        self._pointers = {}
+
+
+class GraphReader:
+    """Attaches a worker process to the graphs of a GraphStore, and to the latest
+    generation of every graph as it is published.
+
+    Instance Attributes:
+        - namespace: The namespace of the store.
+    """
+
+    # Private Instance Attributes:
+    #   - _pointers: The pointer segment of every city the worker attached to.
+    #   - _graphs: The graph of every city the worker attached to.
+
+    namespace: str
+    _pointers: dict[str, shared_memory.SharedMemory]
+    _graphs: dict[str, SharedGraph]
+
+    def __init__(self, namespace: str) -> None:
+        self.namespace = namespace
+        self._pointers = {}
+        self._graphs = {}
+
+    def get(self, city: str) -> SharedGraph:
+        """Return the latest published graph of city, attaching to it if a new
+        generation was published since the previous call.
+        Raise ValueError if no graph of city was published.
+        """
+        try:
+            if city not in self._pointers:
+                self._pointers[city] = shared_memory.SharedMemory(
+                    pointer_name(self.namespace, city))
+
+            graph = self._graphs.get(city)
+            while True:
+                generation = POINTER.unpack_from(self._pointers[city].buf)[0]
+                if graph is not None and graph.generation == generation:
+                    return graph
+                try:
+                    segment = shared_memory.SharedMemory(
+                        segment_name(self.namespace, city, generation))
+                    break
+                except FileNotFoundError:
+                    # a newer generation replaced it meanwhile
+                    continue
+        except FileNotFoundError:
+            raise ValueError
+
+        if graph is not None:
+            graph.close()
+        graph = SharedGraph(city, generation, segment)
+        self._graphs[city] = graph
+        return graph
+
+    def close(self) -> None:
+        """Let every graph and pointer go."""
+        for graph in self._graphs.values():
+            graph.close()
+        for pointer in self._pointers.values():
+            pointer.close()
+        self._graphs = {}
+        self._pointers = {}
+
+
+def graph_bytes(metro_map: Map) -> bytes:
+    """Return the contents of the graph segment of metro_map, with the IDs of its nodes
+    given in the order of their names.
+
+    Preconditions:
+        - the weights of the tracks of metro_map have been updated
+    """
+    nodes = sorted(metro_map.get_all_nodes(), key=lambda node: node.name)
+    ids = {node: i for i, node in enumerate(nodes)}
+    offsets, targets, distance, cost = array('q', [0]), array('q'), array('d'), array('d')
+    colors = bytearray()
+    for node in nodes:
+        for (neighbour, distance_weight), (_, cost_weight) in zip(node.get_weights('distance'),
+                                                                  node.get_weights('cost')):
+            targets.append(ids[neighbour])
+            distance.append(distance_weight)
+            cost.append(cost_weight)
+            colors.extend(rgb(node.get_color(neighbour)))
+        offsets.append(len(targets))
+
+    names = [node.name.encode('utf-8') for node in nodes]
+    name_offsets = array('q', [0])
+    for name in names:
+        name_offsets.append(name_offsets[-1] + len(name))
+
+    return b''.join([
+        HEADER.pack(MAGIC, len(nodes), len(targets), name_offsets[-1]),
+        offsets.tobytes(), targets.tobytes(), distance.tobytes(), cost.tobytes(),
+        array('d', (node.coordinates[0] for node in nodes)).tobytes(),
+        array('d', (node.coordinates[1] for node in nodes)).tobytes(),
+        name_offsets.tobytes(), *names,
+        bytes(node.is_station for node in nodes), bytes(colors)])
+
+
+def pointer_name(namespace: str, city: str) -> str:
+    """Return the name of the pointer segment of city in namespace."""
+    return namespace + '_' + hashlib.blake2b(city.encode('utf-8'), digest_size=4).hexdigest()
+
+
+def segment_name(namespace: str, city: str, generation: int) -> str:
+    """Return the name of the graph segment of the given generation of city in namespace."""
+    return pointer_name(namespace, city) + '_' + str(generation)
@@ -0,0 +1,644 @@
+"""This file contains the importer of OpenMetroGuide, which loads metro networks
+from local GTFS-style CSV files or GeoJSON files into the local database.
+
+Stops become stations and line shapes become tracks. Both are projected onto
+the grid of the Admin editor: every shape is followed from crossing to crossing
+of the grid, creating a corner at every crossing without a station, exactly as
+if it had been drawn in the editor. The files are streamed, and the rows are
+written to the database in chunks, so memory only grows with the size of the
+network and not with the size of the files.
+
+Once every shape is added, the map is made a proper metro map, as the Admin
+requires before saving (see check_map): the corners where shapes cross or split
+between stations become junction stations, and shapes which run past their last
+station are trimmed back to it. This only uses what was recorded as the tracks
+were written, not the map read back. An import which still is not proper,
+because it has no station or is not connected, is rolled back.
+
+Run from the repository root:
+    python -m src.Display.Utils.importer CITY --stops stops.txt [--shapes shapes.txt]
+        [--zones zones.csv] [--db map_storage.db]
+    python -m src.Display.Utils.importer CITY --geojson network.geojson [--db map_storage.db]
+"""
+import argparse
+import csv
+import json
+import math
+import sqlite3
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Iterable, Iterator, Optional
+
+from src.Base.node import corner_name
+from src.Display.Render.geometry import LINE_RGB
+from src.Display.Utils import storage_manager
+
+# The side of a grid cell in map coordinates
+CELL_SIZE = 40
+
+# The default number of meters covered by a grid cell
+METERS_PER_CELL = 200
+
+# The default number of rows written to the database at once
+CHUNK_ROWS = 5000
+
+# The number of characters read from a GeoJSON file at once
+READ_CHARS = 1 << 16
+
+# The zone of the stops which are not assigned one
+DEFAULT_ZONE = '1'
+
+# The prefix of the names of the stations which corners where shapes cross or split
+# between stations become
+JUNCTION_PREFIX = 'Junction '
+
+# The mean radius of the Earth, in meters
+EARTH_RADIUS = 6371000
+
+# The GTFS location types of the stops which are imported: stops and stations, but
+# not entrances, generic nodes or boarding areas
+STOP_LOCATION_TYPES = ('', '0', '1')
+
+Point = tuple[int, int]
+
+
+@dataclass
+class ImportReport:
+    """What an import added to the database.
+
+    Instance Attributes:
+        - stations: The number of stations created.
+        - merged_stops: The number of stops merged into the station of another stop at
+        the same crossing of the grid.
+        - corners: The number of corners created.
+        - tracks: The number of tracks created.
+        - shared_tracks: The number of times a shape ran along a track created by a shape
+        of another color. A track keeps the color of the first shape along it.
+        - junctions: The points of the corners where shapes crossed or split between
+        stations, which became stations.
+        - loose_ends: The points of the corners where shapes ended without a station,
+        which were trimmed back to the last station of the shape.
+        - status: Why the imported map is not a proper metro map (see check_map), in
+        which case the import was not committed, or '' if it is.
+    """
+    stations: int = 0
+    merged_stops: int = 0
+    corners: int = 0
+    tracks: int = 0
+    shared_tracks: int = 0
+    junctions: list[Point] = field(default_factory=list)
+    loose_ends: list[Point] = field(default_factory=list)
+    status: str = ''
+
+
+class GridProjection:
+    """Projects latitudes and longitudes onto the crossings of the grid, with the
+    equirectangular projection around the middle latitude of the network, north up.
+
+    Instance Attributes:
+        - north: The northernmost latitude of the network, which is at y = CELL_SIZE.
+        - west: The westernmost longitude of the network, which is at x = CELL_SIZE.
+        - meters_per_cell: The distance covered by a grid cell.
+    """
+    north: float
+    west: float
+    meters_per_cell: float
+
+    # Private Instance Attributes:
+    #   - _x_scale: Map units per degree of longitude.
+    #   - _y_scale: Map units per degree of latitude.
+
+    _x_scale: float
+    _y_scale: float
+
+    def __init__(self, north: float, south: float, west: float,
+                 meters_per_cell: float = METERS_PER_CELL) -> None:
+        self.north = north
+        self.west = west
+        self.meters_per_cell = meters_per_cell
+        self._y_scale = math.radians(EARTH_RADIUS) * CELL_SIZE / meters_per_cell
+        self._x_scale = self._y_scale * math.cos(math.radians((north + south) / 2))
+
+    def project(self, lat: float, lon: float) -> Point:
+        """Return the crossing of the grid closest to the given latitude and longitude."""
+        x = (lon - self.west) * self._x_scale
+        y = (self.north - lat) * self._y_scale
+        return (round(x / CELL_SIZE) * CELL_SIZE + CELL_SIZE,
+                round(y / CELL_SIZE) * CELL_SIZE + CELL_SIZE)
+
+
+class MapImporter:
+    """Writes the stations and tracks of a city to the database, in chunks, as
+    they are added.
+
+    Stations must all be added before the shapes of the lines, so that the shapes
+    go through the stations they serve.
+
+    Instance Attributes:
+        - city: The city being imported.
+        - projection: Where latitudes and longitudes are on the grid.
+        - report: What was imported so far.
+    """
+    city: str
+    projection: GridProjection
+    report: ImportReport
+
+    # Private Instance Attributes:
+    #   - _conn: The connection to the database.
+    #   - _chunk_rows: The number of rows written at once.
+    #   - _node_rows: The node rows waiting to be written.
+    #   - _connection_rows: The connection rows waiting to be written.
+    #   - _nodes: Maps every crossing of the grid with a node to the name of the node.
+    #   - _stations: Maps the id of every imported stop to the name of its station.
+    #   - _names: The names of the stations.
+    #   - _zones: Maps the name of every station to its zone.
+    #   - _tracks: Maps the pair of names, in order, of the nodes of every track to its
+    #              color.
+    #   - _corners: Maps the name of every corner to its point and the names of the
+    #               nodes it has tracks to.
+    #   - _parents: Maps the name of every node to the name of another node of its
+    #               component, or to itself at the root of the component.
+    #   - _components: The number of connected components of the nodes.
+    #   - _content_hash: The content hash of the rows written so far (see
+    #                    storage_manager.Revision).
+
+    _conn: sqlite3.Connection
+    _chunk_rows: int
+    _node_rows: list[tuple[str, str, str, int, int, str]]
+    _connection_rows: list[tuple[str, str, str, str]]
+    _nodes: dict[Point, str]
+    _stations: dict[str, str]
+    _names: set[str]
+    _zones: dict[str, str]
+    _tracks: dict[tuple[str, str], str]
+    _corners: dict[str, tuple[Point, list[str]]]
+    _parents: dict[str, str]
+    _components: int
+    _content_hash: int
+
+    def __init__(self, conn: sqlite3.Connection, city: str, projection: GridProjection,
+                 chunk_rows: int = CHUNK_ROWS) -> None:
+        self._conn = conn
+        self.city = city
+        self.projection = projection
+        self.report = ImportReport()
+        self._chunk_rows = chunk_rows
+        self._node_rows = []
+        self._connection_rows = []
+        self._nodes = {}
+        self._stations = {}
+        self._names = set()
+        self._zones = {}
+        self._tracks = {}
+        self._corners = {}
+        self._parents = {}
+        self._components = 0
+        self._content_hash = 0
+
+        conn.execute("DELETE FROM nodes WHERE city=?", (city,))
+        conn.execute("DELETE FROM connections WHERE city=?", (city,))
+
+    def add_station(self, stop_id: str, name: str, lat: float, lon: float,
+                    zone: str = DEFAULT_ZONE) -> None:
+        """Add the station of a stop. A stop at the same crossing of the grid as an
+        earlier stop is merged into the station of that stop."""
+        point = self.projection.project(lat, lon)
+        if point in self._nodes:
+            self._stations[stop_id] = self._nodes[point]
+            self.report.merged_stops += 1
+            return
+
+        if name in self._names:
+            name += ' (' + stop_id + ')'
+        self._names.add(name)
+        self._zones[name] = zone or DEFAULT_ZONE
+        self._nodes[point] = name
+        self._stations[stop_id] = name
+        self._write_node((self.city, name, 'True', point[0], point[1], self._zones[name]))
+        self.report.stations += 1
+
+    def add_shape(self, points: Iterable[tuple[float, float]], color: str) -> None:
+        """Add the tracks of color along points, a line shape of latitudes and longitudes.
+
+        Every point of the shape next to a station is moved onto the station, and the
+        shape is followed from crossing to crossing of the grid.
+        """
+        previous = None
+        for lat, lon in points:
+            point = self._attach(self.projection.project(lat, lon))
+            if previous is not None and point != previous:
+                for crossing in _crossings(previous, point):
+                    self._add_track(previous, crossing, color)
+                    previous = crossing
+            previous = point
+
+    def station_of(self, stop_id: str) -> Optional[str]:
+        """Return the name of the station of the stop with stop_id, if it was imported."""
+        return self._stations.get(stop_id)
+
+    def finish(self) -> ImportReport:
+        """Write the remaining rows, trim the loose ends and turn the junctions into
+        stations, then write the revision of the city and commit the import.
+
+        If the map is still not proper, roll the import back instead, keeping any map of
+        the city stored before, and report why in the status of the report.
+        """
+        self._flush()
+        self._trim_loose_ends()
+        self._add_junctions()
+
+        # every corner joins exactly two tracks by now, which leaves the rest of check_map
+        if self.report.stations + len(self.report.junctions) == 0:
+            self.report.status = 'MAP IS INCOMPLETE'
+        elif self._components > 1:
+            self.report.status = 'MAP IS NOT CONNECTED'
+
+        if self.report.status != '':
+            self._conn.rollback()
+            return self.report
+
+        storage_manager.write_revision(self._conn, self.city, self._content_hash)
+        self._conn.commit()
+        return self.report
+
+    def _attach(self, point: Point) -> Point:
+        """Return the crossing of a station which is at or next to point, or point if
+        there is none."""
+        if point in self._nodes and self._nodes[point] in self._names:
+            return point
+
+        x, y = point
+        for d_x in (0, -CELL_SIZE, CELL_SIZE):
+            for d_y in (0, -CELL_SIZE, CELL_SIZE):
+                name = self._nodes.get((x + d_x, y + d_y))
+                if name is not None and name in self._names:
+                    return x + d_x, y + d_y
+
+        return point
+
+    def _add_track(self, point_1: Point, point_2: Point, color: str) -> None:
+        """Add a track of color between the nodes at point_1 and point_2, which are
+        neighbouring crossings of the grid, creating corners where there are no nodes."""
+        name_1, name_2 = self._node_at(point_1), self._node_at(point_2)
+        pair = _pair(name_1, name_2)
+        if pair in self._tracks:
+            self.report.shared_tracks += self._tracks[pair] != color
+            return
+
+        # like the connections table, the tracks are stored once in each direction
+        self._tracks[pair] = color
+        self._connection_rows.append((self.city, name_1, name_2, color))
+        self._connection_rows.append((self.city, name_2, name_1, color))
+        self.report.tracks += 1
+
+        for name, other in ((name_1, name_2), (name_2, name_1)):
+            if name in self._corners:
+                self._corners[name][1].append(other)
+        root_1, root_2 = self._root(name_1), self._root(name_2)
+        if root_1 != root_2:
+            self._parents[root_1] = root_2
+            self._components -= 1
+
+        if len(self._connection_rows) >= self._chunk_rows:
+            self._flush()
+
+    def _node_at(self, point: Point) -> str:
+        """Return the name of the node at point, creating a corner if there is none."""
+        name = self._nodes.get(point)
+        if name is None:
+            name = corner_name(point)
+            self._nodes[point] = name
+            self._corners[name] = (point, [])
+            self._write_node((self.city, name, 'False', point[0], point[1], ''))
+            self.report.corners += 1
+
+        return name
+
+    def _root(self, name: str) -> str:
+        """Return the name of the root of the component of the node named name."""
+        parents = self._parents
+        while parents[name] != name:
+            parents[name] = parents[parents[name]]
+            name = parents[name]
+        return name
+
+    def _trim_loose_ends(self) -> None:
+        """Remove every corner with less than two tracks, and then the corners which are
+        left with less than two tracks, until only corners with two tracks or more lead
+        to them. Record the corners which were loose ends to begin with in the report.
+        """
+        ends = [name for name, (_, neighbours) in self._corners.items() if len(neighbours) < 2]
+        self.report.loose_ends = sorted(self._corners[name][0] for name in ends)
+
+        while ends:
+            name = ends.pop()
+            point, neighbours = self._corners.pop(name)
+            self._delete_row('nodes', (self.city, name, 'False', point[0], point[1], ''))
+            self.report.corners -= 1
+            if not neighbours:
+                # the last node of a component without stations
+                self._components -= 1
+
+            for neighbour in neighbours:
+                color = self._tracks.pop(_pair(name, neighbour))
+                self._delete_row('connections', (self.city, name, neighbour, color))
+                self._delete_row('connections', (self.city, neighbour, name, color))
+                self.report.tracks -= 1
+                if neighbour in self._corners:
+                    others = self._corners[neighbour][1]
+                    others.remove(name)
+                    if len(others) == 1:
+                        ends.append(neighbour)
+
+    def _add_junctions(self) -> None:
+        """Turn every corner with more than two tracks into a station, in the zone of the
+        station closest to it, and record their points in the report."""
+        junctions = [(name, self._closest_zone(name)) for name, (_, neighbours)
+                     in self._corners.items() if len(neighbours) > 2]
+
+        for name, zone in junctions:
+            point, neighbours = self._corners.pop(name)
+            station = JUNCTION_PREFIX + name
+            while station in self._names:
+                station += "'"
+            self._names.add(station)
+            self._nodes[point] = station
+            self._replace_row('nodes', (self.city, name, 'False', point[0], point[1], ''),
+                              (self.city, station, 'True', point[0], point[1], zone))
+            self._conn.execute("UPDATE nodes SET name=?, is_station='True', zone=? "
+                               "WHERE city=? AND name=?", (station, zone, self.city, name))
+
+            for neighbour in neighbours:
+                color = self._tracks.pop(_pair(name, neighbour))
+                self._tracks[_pair(station, neighbour)] = color
+                self._replace_row('connections', (self.city, name, neighbour, color),
+                                  (self.city, station, neighbour, color))
+                self._replace_row('connections', (self.city, neighbour, name, color),
+                                  (self.city, neighbour, station, color))
+                if neighbour in self._corners:
+                    others = self._corners[neighbour][1]
+                    others[others.index(name)] = station
+            self._conn.execute("UPDATE connections SET name_1=? WHERE city=? AND name_1=?",
+                               (station, self.city, name))
+            self._conn.execute("UPDATE connections SET name_2=? WHERE city=? AND name_2=?",
+                               (station, self.city, name))
+            self.report.corners -= 1
+            self.report.junctions.append(point)
+
+        self.report.junctions.sort()
+
+    def _closest_zone(self, name: str) -> str:
+        """Return the zone of the station the fewest tracks away from the corner named
+        name, going through corners only, or DEFAULT_ZONE if no station is reached."""
+        visited, queue = {name}, deque([name])
+        while queue:
+            for neighbour in self._corners[queue.popleft()][1]:
+                if neighbour in self._zones:
+                    return self._zones[neighbour]
+                elif neighbour not in visited and neighbour in self._corners:
+                    visited.add(neighbour)
+                    queue.append(neighbour)
+
+        return DEFAULT_ZONE
+
+    def _delete_row(self, table: str, row: tuple) -> None:
+        """Delete row, a written row of table, from the database."""
+        self._content_hash = (self._content_hash - storage_manager.row_hash(table, row)) \
+            % storage_manager.HASH_MODULUS
+        if table == 'nodes':
+            self._conn.execute("DELETE FROM nodes WHERE city=? AND name=?", (row[0], row[1]))
+        else:
+            self._conn.execute("DELETE FROM connections WHERE city=? AND name_1=? AND name_2=?",
+                               row[:3])
+
+    def _replace_row(self, table: str, old: tuple, new: tuple) -> None:
+        """Account for old, a written row of table, being replaced by new in the content
+        hash. The caller updates the database."""
+        self._content_hash = (self._content_hash - storage_manager.row_hash(table, old)
+                              + storage_manager.row_hash(table, new)) \
+            % storage_manager.HASH_MODULUS
+
+    def _write_node(self, row: tuple[str, str, str, int, int, str]) -> None:
+        """Queue row to be written to the nodes table."""
+        self._node_rows.append(row)
+        self._parents[row[1]] = row[1]
+        self._components += 1
+        if len(self._node_rows) >= self._chunk_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Write the queued rows to the database."""
+        added = storage_manager.MapSnapshot(self.city, frozenset(self._node_rows),
+                                            frozenset(self._connection_rows))
+        self._content_hash = (self._content_hash + storage_manager.snapshot_hash(added)) \
+            % storage_manager.HASH_MODULUS
+        self._conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?)", self._node_rows)
+        self._conn.executemany("INSERT INTO connections VALUES (?, ?, ?, ?)",
+                               self._connection_rows)
+        self._node_rows.clear()
+        self._connection_rows.clear()
+
+
+def import_gtfs(city: str, stops_path: str, shapes_path: Optional[str] = None,
+                zones_path: Optional[str] = None, meters_per_cell: float = METERS_PER_CELL,
+                chunk_rows: int = CHUNK_ROWS) -> ImportReport:
+    """Import the network of city from GTFS-style CSV files into the database at
+    storage_manager.DB_PATH, replacing any map of city stored there if the imported map
+    is proper (see MapImporter.finish).
+
+    stops_path has the columns stop_id, stop_name, stop_lat and stop_lon, and
+    optionally zone_id and location_type. shapes_path has the columns shape_id,
+    shape_pt_lat, shape_pt_lon and shape_pt_sequence, and optionally shape_color
+    (a palette color name or a hex RGB value), with the points of every shape on
+    consecutive rows. zones_path has the columns stop_id and zone_id, and overrides
+    the zones of stops_path.
+    """
+    zones = {}
+    if zones_path is not None:
+        zones = {row['stop_id']: row['zone_id'] for row in _read_csv(zones_path)}
+
+    north, south, west = -90.0, 90.0, 180.0
+    for row in _stop_rows(stops_path):
+        lat, lon = float(row['stop_lat']), float(row['stop_lon'])
+        north, south, west = max(north, lat), min(south, lat), min(west, lon)
+
+    storage_manager.init_db()
+    conn = sqlite3.connect(storage_manager.DB_PATH)
+    try:
+        importer = MapImporter(conn, city, GridProjection(north, south, west, meters_per_cell),
+                               chunk_rows)
+        for row in _stop_rows(stops_path):
+            importer.add_station(row['stop_id'], row['stop_name'], float(row['stop_lat']),
+                                 float(row['stop_lon']),
+                                 zones.get(row['stop_id'], row.get('zone_id', '')))
+
+        if shapes_path is not None:
+            for i, (_, rows) in enumerate(groupby(_read_csv(shapes_path),
+                                                  key=lambda row: row['shape_id'])):
+                rows = sorted(rows, key=lambda row: float(row['shape_pt_sequence']))
+                importer.add_shape(((float(row['shape_pt_lat']), float(row['shape_pt_lon']))
+                                    for row in rows),
+                                   palette_color(rows[0].get('shape_color', ''), i))
+
+        return importer.finish()
+    finally:
+        conn.close()
+
+
+def import_geojson(city: str, path: str, meters_per_cell: float = METERS_PER_CELL,
+                   chunk_rows: int = CHUNK_ROWS) -> ImportReport:
+    """Import the network of city from a GeoJSON FeatureCollection into the database at
+    storage_manager.DB_PATH, replacing any map of city stored there if the imported map
+    is proper (see MapImporter.finish).
+
+    Point features are stops, with the optional properties id, name and zone.
+    LineString and MultiLineString features are line shapes, with the optional
+    property color (a palette color name or a hex RGB value).
+    """
+    north, south, west = -90.0, 90.0, 180.0
+    for feature in iter_features(path):
+        if feature['geometry']['type'] == 'Point':
+            lon, lat = feature['geometry']['coordinates'][:2]
+            north, south, west = max(north, lat), min(south, lat), min(west, lon)
+
+    storage_manager.init_db()
+    conn = sqlite3.connect(storage_manager.DB_PATH)
+    try:
+        importer = MapImporter(conn, city, GridProjection(north, south, west, meters_per_cell),
+                               chunk_rows)
+        for i, feature in enumerate(iter_features(path)):
+            if feature['geometry']['type'] == 'Point':
+                properties = feature.get('properties') or {}
+                stop_id = str(properties.get('id', i))
+                lon, lat = feature['geometry']['coordinates'][:2]
+                importer.add_station(stop_id, str(properties.get('name', stop_id)), lat, lon,
+                                     str(properties.get('zone', DEFAULT_ZONE)))
+
+        lines = 0
+        for feature in iter_features(path):
+            geometry = feature['geometry']
+            if geometry['type'] in ('LineString', 'MultiLineString'):
+                color = palette_color(str((feature.get('properties') or {}).get('color', '')),
+                                      lines)
+                parts = [geometry['coordinates']] if geometry['type'] == 'LineString' \
+                    else geometry['coordinates']
+                for part in parts:
+                    importer.add_shape(((point[1], point[0]) for point in part), color)
+                lines += 1
+
+        return importer.finish()
+    finally:
+        conn.close()
+
+
+def iter_features(path: str) -> Iterator[dict]:
+    """Yield the features of the GeoJSON FeatureCollection in the file at path, one at
+    a time, without reading the whole file into memory."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as f:
+        buffer = ''
+        # skip to the start of the features array
+        while '"features"' not in buffer or '[' not in buffer[buffer.index('"features"'):]:
+            chunk = f.read(READ_CHARS)
+            if chunk == '':
+                return
+            buffer += chunk
+        start = buffer.index('"features"')
+        buffer = buffer[buffer.index('[', start) + 1:]
+
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+
+            try:
+                feature, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # the feature continues in the next chunk
+                chunk = f.read(READ_CHARS)
+                if chunk == '':
+                    raise
+                buffer += chunk
+                continue
+
+            yield feature
+            buffer = buffer[end:]
+
+
+def palette_color(color: str, index: int) -> str:
+    """Return the color of the Admin palette for color, which is either the name of a
+    palette color, or a hex RGB value which is matched to the closest palette color.
+    If color is empty, return the index-th palette color, cycling through the palette.
+    """
+    names = list(LINE_RGB)
+    color = color.strip().lstrip('#').lower()
+    if color in LINE_RGB:
+        return color
+    elif len(color) != 6:
+        return names[index % len(names)]
+
+    rgb = tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+    return min(names, key=lambda name: sum((a - b) ** 2 for a, b in zip(LINE_RGB[name], rgb)))
+
+
+def _pair(name_1: str, name_2: str) -> tuple[str, str]:
+    """Return the names of the nodes of a track, in order."""
+    return (name_1, name_2) if name_1 < name_2 else (name_2, name_1)
+
+
+def _crossings(start: Point, end: Point) -> list[Point]:
+    """Return the crossings of the grid from start, exclusive, to end, inclusive, along
+    the straight line between them, each next to the one before it."""
+    d_x, d_y = (end[0] - start[0]) // CELL_SIZE, (end[1] - start[1]) // CELL_SIZE
+    steps = max(abs(d_x), abs(d_y))
+    return [(start[0] + round(i * d_x / steps) * CELL_SIZE,
+             start[1] + round(i * d_y / steps) * CELL_SIZE) for i in range(1, steps + 1)]
+
+
+def _read_csv(path: str) -> Iterator[dict[str, str]]:
+    """Yield the rows of the CSV file at path, one at a time."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        yield from csv.DictReader(f)
+
+
+def _stop_rows(path: str) -> Iterator[dict[str, str]]:
+    """Yield the rows of the stops which are imported from the stops file at path."""
+    for row in _read_csv(path):
+        if row.get('location_type', '') in STOP_LOCATION_TYPES:
+            yield row
+
+
+def main() -> None:
+    """Run an import from the command line."""
+    parser = argparse.ArgumentParser(description='Import a metro network into OpenMetroGuide.')
+    parser.add_argument('city')
+    parser.add_argument('--stops', help='GTFS-style stops CSV file')
+    parser.add_argument('--shapes', help='GTFS-style shapes CSV file')
+    parser.add_argument('--zones', help='CSV file of stop_id and zone_id')
+    parser.add_argument('--geojson', help='GeoJSON file of stops and line shapes')
+    parser.add_argument('--meters-per-cell', type=float, default=METERS_PER_CELL)
+    parser.add_argument('--db', default='src/Display/Utils/map_storage.db',
+                        help='the database to import into')
+    args = parser.parse_args()
+
+    storage_manager.DB_PATH = args.db
+    if args.geojson is not None:
+        report = import_geojson(args.city, args.geojson, args.meters_per_cell)
+    elif args.stops is not None:
+        report = import_gtfs(args.city, args.stops, args.shapes, args.zones,
+                             args.meters_per_cell)
+    else:
+        parser.error('either --stops or --geojson is required')
+        return
+
+    print(f'{args.city}: {report.stations} stations ({report.merged_stops} stops merged), '
+          f'{report.corners} corners, {report.tracks} tracks')
+    print(f'{len(report.junctions)} junctions became stations, {len(report.loose_ends)} '
+          f'loose ends were trimmed, {report.shared_tracks} tracks are shared by lines')
+    if report.status != '':
+        print(f'Not imported: {report.status}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""This file contains the background worker which persists the metro map
+being edited by an Admin, so that saving never blocks the pygame event loop.
+"""
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from src.Display.Utils import storage_manager
+from src.Display.Utils.storage_manager import init_db, write_deltas
+
+# The number of latest save latencies which are kept
+LATENCY_HISTORY = 1000
+
+# Seconds the worker waits before it writes deltas again after a save failed
+RETRY_INTERVAL = 1.0
+
+# The number of times the deltas still pending are written once the worker is closed,
+# before it gives up on them
+CLOSE_ATTEMPTS = 3
+
+
+class PersistenceWorker(threading.Thread):
+    """A thread, with its own SQLite connection, that replays the row deltas
+    of a metro map on the local database.
+
+    Deltas submitted while a save is in progress are batched together into the
+    next save, so the cost of a save is proportional to the number of edits it holds.
+
+    A save which fails, such as when the database is locked or the disk is full, is
+    rolled back as a whole, and its deltas are kept pending to be written again every
+    RETRY_INTERVAL seconds, before any delta submitted after them.
+
+    Instance Attributes:
+        - city_name: The city whose map is being persisted.
+        - save_latencies: The time (in seconds) taken by each of the latest
+        LATENCY_HISTORY completed saves.
+        - error: The error of the latest save if it failed, and None once a save
+        succeeds.
+    """
+
+    # Private Instance Attributes:
+    #   - _condition: Guards _pending and _closing, and wakes the worker up.
+    #   - _pending: The deltas which have not been written yet, in order.
+    #   - _closing: Whether the worker should exit once _pending is written.
+
+    city_name: str
+    save_latencies: deque[float]
+    error: Optional[sqlite3.Error]
+    _condition: threading.Condition
+    _pending: list[tuple[str, tuple]]
+    _closing: bool
+
+    def __init__(self, city_name: str) -> None:
+        super(PersistenceWorker, self).__init__(name='persistence-' + city_name, daemon=True)
+        self.city_name = city_name
+        self.save_latencies = deque(maxlen=LATENCY_HISTORY)
+        self.error = None
+        self._condition = threading.Condition()
+        self._pending = []
+        self._closing = False
+
+    def submit(self, deltas: tuple[tuple[str, tuple], ...]) -> None:
+        """Schedule deltas to be written after all previously submitted ones.
+        Returns immediately.
+        """
+        with self._condition:
+            self._pending.extend(deltas)
+            self._condition.notify()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write any pending deltas and wait for the worker to exit.
+
+        Raise the error of the latest save if deltas could not be written, which
+        take_pending returns.
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+
+        if self.is_alive():
+            self.join(timeout)
+
+        with self._condition:
+            if self._pending and self.error is not None:
+                raise self.error
+
+    def take_pending(self) -> list[tuple[str, tuple]]:
+        """Return the deltas which have not been written, in order, and forget them,
+        so that they can be submitted to another worker."""
+        with self._condition:
+            deltas, self._pending = self._pending, []
+            return deltas
+
+    def run(self) -> None:
+        """Write submitted deltas until the worker is closed."""
+        conn = None
+        failed_attempts = 0
+
+        try:
+            while True:
+                with self._condition:
+                    while not self._pending and not self._closing:
+                        self._condition.wait()
+                    if self.error is not None:
+                        self._condition.wait(RETRY_INTERVAL)
+
+                    deltas, self._pending = self._pending, []
+                    if not deltas:
+                        return
+
+                try:
+                    if conn is None:
+                        init_db()
+                        conn = sqlite3.connect(storage_manager.DB_PATH)
+                    start = time.perf_counter()
+                    write_deltas(conn, self.city_name, deltas)
+                    self.save_latencies.append(time.perf_counter() - start)
+                    self.error = None
+                except sqlite3.Error as error:
+                    # the save was rolled back, so its deltas are written again as a whole
+                    with self._condition:
+                        self._pending[:0] = deltas
+                        self.error = error
+                        failed_attempts += self._closing
+                        if failed_attempts >= CLOSE_ATTEMPTS:
+                            return
+        finally:
+            if conn is not None:
+                conn.close()
@@ -0,0 +1,265 @@
+"""This file contains the route planner of OpenMetroGuide, which finds the routes
+asked for by a Client in a worker thread, so that a long route on a large map
+never blocks the pygame event loop.
+
+Only the latest query matters: asking for a new route cancels the previous one if
+it has not started yet, and the result of a query which has been superseded is
+dropped. The result of the latest query is kept until the main loop takes it, and
+an event is posted when it is ready, so that an idle screen wakes up to show it.
+
+Routes can also be prefetched speculatively, such as the route to the station
+under the cursor before it is clicked. Found routes are kept in a least recently
+used cache, from which a query is answered at once. A prefetch only starts when
+the worker is idle and PREFETCH_INTERVAL has passed since the previous one, so
+that sweeping the cursor over many stations never delays the routes clicked.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import pygame
+
+from src.Base.map import Map
+
+# The number of found routes which are cached
+ROUTE_CACHE_SIZE = 64
+
+# The least number of seconds between the starts of two prefetches
+PREFETCH_INTERVAL = 0.05
+
+
+@dataclass(frozen=True)
+class RouteQuery:
+    """A route asked for by a Client.
+
+    Instance Attributes:
+        - start: The ID of the start station.
+        - destination: The ID of the destination station.
+        - optimization: What the route is optimized for.
+
+    Representation Invariants:
+        - self.optimization in {'distance', 'cost'}
+    """
+    start: int
+    destination: int
+    optimization: str
+
+
+@dataclass(frozen=True)
+class RouteResult:
+    """The route found for a query.
+
+    Instance Attributes:
+        - query: The query which was answered.
+        - metro_map: The map the route was found on.
+        - path: The IDs of the nodes of the route, or None if the destination
+        cannot be reached from the start.
+    """
+    query: RouteQuery
+    metro_map: Map
+    path: Optional[list[int]]
+
+
+class RoutePlanner:
+    """Finds the routes of the queries of a Client in a worker thread.
+
+    Instance Attributes:
+        - event_type: The type of the event posted when the result of the latest
+        query is ready.
+        - cache_size: The number of found routes which are cached.
+        - prefetch_interval: The least number of seconds between the starts of two
+        prefetches.
+        - hits: The number of requests answered from the cache.
+        - prefetches: The number of prefetches started.
+    """
+
+    # Private Instance Attributes:
+    #   - _executor: The worker thread.
+    #   - _lock: Guards the other private attributes.
+    #   - _latest: The latest query, the map it was asked on, and its future, if any.
+    #   - _result: The result of the latest query, until it is taken.
+    #   - _cache: The found routes, from the least to the most recently used, by query.
+    #   - _prefetch: The latest prefetched query, the map it was asked on, and its
+    #                future, if any.
+    #   - _prefetched_at: The time the latest prefetch started.
+
+    event_type: int
+    cache_size: int
+    prefetch_interval: float
+    hits: int
+    prefetches: int
+    _executor: ThreadPoolExecutor
+    _lock: threading.Lock
+    _latest: Optional[tuple[RouteQuery, Map, Future]]
+    _result: Optional[RouteResult]
+    _cache: OrderedDict[RouteQuery, RouteResult]
+    _prefetch: Optional[tuple[RouteQuery, Map, Future]]
+    _prefetched_at: float
+
+    def __init__(self, event_type: Optional[int] = None, cache_size: int = ROUTE_CACHE_SIZE,
+                 prefetch_interval: float = PREFETCH_INTERVAL) -> None:
+        self.event_type = event_type if event_type is not None else pygame.event.custom_type()
+        self.cache_size = cache_size
+        self.prefetch_interval = prefetch_interval
+        self.hits = 0
+        self.prefetches = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='route-planner')
+        self._lock = threading.Lock()
+        self._latest = None
+        self._result = None
+        self._cache = OrderedDict()
+        self._prefetch = None
+        self._prefetched_at = -prefetch_interval
+
+    def request(self, metro_map: Map, query: RouteQuery) -> Future:
+        """Start finding the route of query on metro_map in the background, and return
+        its future. The previous query is cancelled, unless it is the same query on the
+        same map and is still being found, whose future is returned instead. Returns
+        immediately.
+
+        If the route of query on metro_map is cached, the returned future is done
+        already, and the result is ready to be taken. If it is being prefetched, the
+        future of the prefetch is returned.
+        """
+        with self._lock:
+            if self._latest is not None and self._latest[:2] == (query, metro_map) \
+                    and not self._latest[2].done():
+                return self._latest[2]
+
+            self._cancel_latest()
+            cached = self._get_cached(metro_map, query)
+            if cached is not None:
+                self.hits += 1
+                future = Future()
+                future.set_result(cached)
+            elif self._prefetch is not None and self._prefetch[:2] == (query, metro_map):
+                future = self._prefetch[2]
+            else:
+                future = self._executor.submit(_find_route, metro_map, query)
+            self._latest = (query, metro_map, future)
+
+        future.add_done_callback(self._finished)
+        return future
+
+    def prefetch(self, metro_map: Map, query: RouteQuery) -> bool:
+        """Start finding the route of query on metro_map in the background, to be
+        cached for when it is requested, and return whether it was started.
+
+        It is not started if the route is cached, if the worker is busy, or if less
+        than prefetch_interval seconds have passed since the previous prefetch.
+        Returns immediately.
+        """
+        with self._lock:
+            now = time.perf_counter()
+            if self._get_cached(metro_map, query) is not None \
+                    or (self._latest is not None and not self._latest[2].done()) \
+                    or (self._prefetch is not None and not self._prefetch[2].done()) \
+                    or now - self._prefetched_at < self.prefetch_interval:
+                return False
+
+            future = self._executor.submit(_find_route, metro_map, query)
+            self._prefetch = (query, metro_map, future)
+            self._prefetched_at = now
+            self.prefetches += 1
+
+        future.add_done_callback(self._prefetched)
+        return True
+
+    def cancel(self) -> None:
+        """Cancel the latest query, and drop its result if it was not taken."""
+        with self._lock:
+            self._cancel_latest()
+            self._latest = None
+            self._result = None
+
+    def is_pending(self) -> bool:
+        """Return whether the route of the latest query is still being found."""
+        with self._lock:
+            return self._latest is not None and not self._latest[2].done()
+
+    def take_result(self) -> Optional[RouteResult]:
+        """Return the result of the latest query if it is ready and was not taken yet,
+        and None otherwise."""
+        with self._lock:
+            result, self._result = self._result, None
+            return result
+
+    def close(self) -> None:
+        """Cancel the latest query and stop the worker thread, without waiting for it."""
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_cached(self, metro_map: Map, query: RouteQuery) -> Optional[RouteResult]:
+        """Return the cached result of query on metro_map, if any.
+
+        Preconditions:
+            - self._lock is held
+        """
+        result = self._cache.get(query)
+        if result is None or result.metro_map is not metro_map:
+            return None
+
+        self._cache.move_to_end(query)
+        return result
+
+    def _put_cached(self, result: RouteResult) -> None:
+        """Cache result, dropping the least recently used results which do not fit.
+
+        Preconditions:
+            - self._lock is held
+        """
+        self._cache[result.query] = result
+        self._cache.move_to_end(result.query)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _cancel_latest(self) -> None:
+        """Cancel the future of the latest query if it has not started.
+
+        Preconditions:
+            - self._lock is held
+        """
+        if self._latest is not None:
+            self._latest[2].cancel()
+
+    def _finished(self, future: Future) -> None:
+        """Keep the result of future, if it is the future of the latest query, and post
+        an event to say that it is ready."""
+        try:
+            result = future.result()
+        except CancelledError:
+            return
+
+        with self._lock:
+            self._put_cached(result)
+            if self._latest is None or self._latest[2] is not future:
+                return
+            self._result = result
+
+        if pygame.display.get_init():
+            pygame.event.post(pygame.event.Event(self.event_type))
+
+    def _prefetched(self, future: Future) -> None:
+        """Cache the result of future, a prefetch."""
+        try:
+            result = future.result()
+        except CancelledError:
+            return
+
+        with self._lock:
+            self._put_cached(result)
+
+
+def _find_route(metro_map: Map, query: RouteQuery) -> RouteResult:
+    """Return the result of query on metro_map. Runs in the worker thread."""
+    try:
+        path = metro_map.optimized_route_ids(start=query.start,
+                                             destination=query.destination,
+                                             optimization=query.optimization)
+    except ValueError:
+        path = None
+
+    return RouteResult(query, metro_map, path)
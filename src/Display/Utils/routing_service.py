@@ -0,0 +1,425 @@
+"""This file contains the sharded routing service of OpenMetroGuide, which answers
+route queries for more cities than one process can keep loaded, with several
+local processes.
+
+Every route node is a process which keeps the maps of the cities it owns loaded
+from the local database, and finds their routes. A front router assigns every
+city to a node by consistent hashing of its name, and forwards every query to the
+node which owns its city. A node joining or leaving only moves the cities next to
+it on the ring: the nodes which take cities over load them before the router
+forwards any query to them, and the nodes which give cities up drop them after.
+
+The protocol is a JSON object per line over TCP, and every request gets a reply:
+    {"op": "route", "city": ..., "start": ..., "destination": ...,
+     "optimization": "distance"}  ->  {"path": [...]} or {"error": ...}
+Nodes also answer "load" and "drop" (with "cities"), and "cities". The router
+also answers "join" and "leave" (with "address", [host, port]) and "owners".
+
+Run from the repository root:
+    python -m src.Display.Utils.routing_service node PORT [--db map_storage.db]
+    python -m src.Display.Utils.routing_service router PORT NODE_PORT... [--db ...]
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import io
+import json
+import socket
+import socketserver
+import threading
+from typing import Optional
+
+from src.Base.map import Map
+from src.Display.Utils import storage_manager
+from src.Display.Utils.storage_manager import RevisionWatcher
+
+# The host every process of the service listens on
+HOST = '127.0.0.1'
+
+# The number of points of every node on the hash ring
+VIRTUAL_NODES = 64
+
+Address = tuple[str, int]
+
+
+class HashRing:
+    """Assigns every key to a node by consistent hashing: the key belongs to the
+    first point of a node at or after the hash of the key, around the ring, and
+    every node has replicas points, so that the keys are spread evenly.
+
+    Instance Attributes:
+        - replicas: The number of points of every node.
+    """
+
+    # Private Instance Attributes:
+    #   - _positions: The positions of the points on the ring, in order.
+    #   - _nodes: The node of every point, in the order of _positions.
+
+    replicas: int
+    _positions: list[int]
+    _nodes: list[Address]
+
+    def __init__(self, nodes: tuple[Address, ...] = (), replicas: int = VIRTUAL_NODES) -> None:
+        self.replicas = replicas
+        self._positions = []
+        self._nodes = []
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self) -> int:
+        return len(set(self._nodes))
+
+    def add(self, node: Address) -> None:
+        """Add the points of node to the ring, if it has none."""
+        if node in self._nodes:
+            return
+
+        for replica in range(self.replicas):
+            position = _position(f'{node[0]}:{node[1]}#{replica}')
+            index = bisect.bisect(self._positions, position)
+            self._positions.insert(index, position)
+            self._nodes.insert(index, node)
+
+    def remove(self, node: Address) -> None:
+        """Remove the points of node from the ring."""
+        kept = [(position, other) for position, other in zip(self._positions, self._nodes)
+                if other != node]
+        self._positions = [position for position, _ in kept]
+        self._nodes = [other for _, other in kept]
+
+    def get(self, key: str) -> Address:
+        """Return the node which key belongs to. Raise ValueError if the ring is empty."""
+        if not self._nodes:
+            raise ValueError
+        index = bisect.bisect_left(self._positions, _position(key))
+        return self._nodes[index % len(self._nodes)]
+
+    def get_nodes(self) -> list[Address]:
+        """Return the nodes of the ring, in order."""
+        return sorted(set(self._nodes))
+
+    def copy(self) -> HashRing:
+        """Return a copy of the ring."""
+        ring = HashRing(replicas=self.replicas)
+        ring._positions = list(self._positions)
+        ring._nodes = list(self._nodes)
+        return ring
+
+
+class Connection:
+    """A connection to a process of the service, which sends it a request and
+    receives its reply at a time."""
+
+    # Private Instance Attributes:
+    #   - _socket: The socket of the connection.
+    #   - _file: The buffered file of _socket.
+
+    _socket: socket.socket
+    _file: io.BufferedRWPair
+
+    def __init__(self, address: Address, timeout: Optional[float] = None) -> None:
+        self._socket = socket.create_connection(address, timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile('rwb')
+
+    def request(self, message: dict) -> dict:
+        """Send message and return the reply. Raise ConnectionError if the connection
+        was closed."""
+        self._file.write(json.dumps(message).encode('utf-8') + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError
+        return json.loads(line)
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self) -> Connection:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class RouteNode:
+    """The cities owned by a route node, and the loaded maps they are routed on.
+
+    The maps are reloaded when they are stored again, by any process. Maps are loaded
+    outside of the lock, so that loading one does not hold up the queries of the
+    cities which are loaded already.
+    """
+
+    # Private Instance Attributes:
+    #   - _maps: The loaded map of every owned city.
+    #   - _dropped: The number of times the map of every city was dropped or found to be
+    #               stored again, so that a map loaded meanwhile is not kept.
+    #   - _lock: Guards _maps, _dropped and _watcher.
+    #   - _watcher: Watches the stored maps, for the owned maps which changed.
+
+    _maps: dict[str, Map]
+    _dropped: dict[str, int]
+    _lock: threading.Lock
+    _watcher: RevisionWatcher
+
+    def __init__(self) -> None:
+        self._maps = {}
+        self._dropped = {}
+        self._lock = threading.Lock()
+        self._watcher = RevisionWatcher()
+        self._watcher.poll()
+
+    def handle(self, message: dict) -> dict:
+        """Return the reply to message."""
+        op = message.get('op')
+        if op == 'route':
+            try:
+                metro_map = self.get_map(message['city'])
+                path = metro_map.optimized_route(message['start'], message['destination'],
+                                                 message.get('optimization', 'distance'))
+            except ValueError:
+                return {'error': 'no route'}
+            return {'path': path}
+        elif op == 'load':
+            for city in message['cities']:
+                try:
+                    self.get_map(city)
+                except ValueError:
+                    continue
+        elif op == 'drop':
+            with self._lock:
+                for city in message['cities']:
+                    self._drop(city)
+        elif op != 'cities':
+            return {'error': 'unknown op'}
+
+        with self._lock:
+            return {'cities': sorted(self._maps)}
+
+    def get_map(self, city: str) -> Map:
+        """Return the map of city, loading it if it is not loaded or was stored again.
+        Raise ValueError if city has no stored map."""
+        with self._lock:
+            for changed in self._watcher.poll():
+                self._drop(changed)
+
+            metro_map = self._maps.get(city)
+            if metro_map is not None:
+                return metro_map
+            dropped = self._dropped.get(city, 0)
+
+        metro_map = storage_manager.get_map(city)
+        if not metro_map.get_all_nodes():
+            raise ValueError
+        metro_map.update_weights()
+        metro_map.prepare_landmarks()
+
+        with self._lock:
+            # unless the city was dropped or stored again while it was loaded
+            if self._dropped.get(city, 0) == dropped:
+                self._maps.setdefault(city, metro_map)
+                return self._maps[city]
+            return metro_map
+
+    def _drop(self, city: str) -> None:
+        """Forget the map of city, and any map of it being loaded.
+
+        Preconditions:
+            - self._lock is held
+        """
+        self._maps.pop(city, None)
+        self._dropped[city] = self._dropped.get(city, 0) + 1
+
+
+class Router:
+    """Forwards every route query to the node which owns its city, and moves the
+    cities between the nodes as they join and leave."""
+
+    # Private Instance Attributes:
+    #   - _ring: The ring of the nodes. It is replaced as a whole when a node joins or
+    #            leaves, so that queries forwarded meanwhile see the old ring or the new.
+    #   - _lock: Serializes the nodes joining and leaving.
+    #   - _local: The connections of the thread of every client to the nodes.
+
+    _ring: HashRing
+    _lock: threading.Lock
+    _local: threading.local
+
+    def __init__(self, nodes: tuple[Address, ...] = ()) -> None:
+        self._ring = HashRing()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        for node in nodes:
+            self.join(node)
+
+    def handle(self, message: dict) -> dict:
+        """Return the reply to message."""
+        op = message.get('op')
+        if op == 'route':
+            return self.route(message)
+        elif op == 'join':
+            return {'moved': self.join(tuple(message['address']))}
+        elif op == 'leave':
+            return {'moved': self.leave(tuple(message['address']))}
+        elif op == 'owners':
+            ring = self._ring
+            return {'owners': {city: list(ring.get(city)) for city in
+                               storage_manager.get_cities()} if len(ring) > 0 else {}}
+        return {'error': 'unknown op'}
+
+    def route(self, message: dict) -> dict:
+        """Forward message, a route query, to the node which owns its city, and return
+        its reply. A node which cannot be reached leaves the ring, and the query is
+        forwarded to the node which takes its city over."""
+        while True:
+            try:
+                node = self._ring.get(message['city'])
+            except ValueError:
+                return {'error': 'no nodes'}
+
+            # a connection may have been closed by a node which restarted, so a new one
+            # is tried before the node is taken for gone
+            for _ in range(2):
+                try:
+                    return self._connect(node).request(message)
+                except OSError:
+                    self._disconnect(node)
+            self.leave(node, graceful=False)
+
+    def join(self, node: Address) -> list[str]:
+        """Add node to the ring, and return the cities which moved to it."""
+        with self._lock:
+            ring = self._ring.copy()
+            ring.add(node)
+            return self._rebalance(ring, True)
+
+    def leave(self, node: Address, graceful: bool = True) -> list[str]:
+        """Remove node from the ring, and return the cities which moved from it.
+        If not graceful, node cannot be reached, and is not told to drop them."""
+        with self._lock:
+            if node not in self._ring.get_nodes():
+                return []
+            ring = self._ring.copy()
+            ring.remove(node)
+            return self._rebalance(ring, graceful)
+
+    def _rebalance(self, ring: HashRing, graceful: bool) -> list[str]:
+        """Make ring the ring of the router: the nodes which take stored cities over load
+        them first, and then, if graceful, the nodes which give them up drop them.
+        Return the cities which moved.
+
+        Preconditions:
+            - self._lock is held
+        """
+        cities = storage_manager.get_cities()
+        old = {city: self._ring.get(city) for city in cities} if len(self._ring) > 0 else {}
+        new = {city: ring.get(city) for city in cities} if len(ring) > 0 else {}
+        moved = [city for city in cities if old.get(city) != new.get(city)]
+
+        for node, owned in _group(moved, new).items():
+            with Connection(node) as connection:
+                connection.request({'op': 'load', 'cities': owned})
+        self._ring = ring
+        if graceful:
+            for node, owned in _group(moved, old).items():
+                with Connection(node) as connection:
+                    connection.request({'op': 'drop', 'cities': owned})
+
+        return moved
+
+    def _connect(self, node: Address) -> Connection:
+        """Return the connection of this thread to node, opening it if needed."""
+        connections = self._local.__dict__.setdefault('connections', {})
+        if node not in connections:
+            connections[node] = Connection(node)
+        return connections[node]
+
+    def _disconnect(self, node: Address) -> None:
+        """Close the connection of this thread to node, if it is open."""
+        connection = self._local.__dict__.get('connections', {}).pop(node, None)
+        if connection is not None:
+            connection.close()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Replies to the requests of a connection, one line at a time."""
+
+    def setup(self) -> None:
+        """Turn off the delay of small replies."""
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self) -> None:
+        """Reply to every request until the connection is closed."""
+        for line in self.rfile:
+            try:
+                reply = self.server.service.handle(json.loads(line))
+            except (KeyError, TypeError, json.JSONDecodeError):
+                reply = {'error': 'bad request'}
+            except OSError:
+                reply = {'error': 'node unreachable'}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    """Serves a route node or router, with a thread per connection.
+
+    Instance Attributes:
+        - service: The RouteNode or Router which replies to the requests.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+    service: RouteNode | Router
+
+    def __init__(self, address: Address, service: RouteNode | Router) -> None:
+        super().__init__(address, _Handler)
+        self.service = service
+
+
+def make_server(address: Address, service: RouteNode | Router) -> socketserver.BaseServer:
+    """Return a server of service listening on address, which has not started serving.
+    The port of address may be 0, for any free port."""
+    return _Server(address, service)
+
+
+def _group(cities: list[str], owners: dict[str, Address]) -> dict[Address, list[str]]:
+    """Return the cities of cities which every node owns, according to owners."""
+    grouped = {}
+    for city in cities:
+        if city in owners:
+            grouped.setdefault(owners[city], []).append(city)
+    return grouped
+
+
+def _position(key: str) -> int:
+    """Return the position of key on the ring."""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def main() -> None:
+    """Run a route node or a router from the command line."""
+    parser = argparse.ArgumentParser(description='Run a process of the routing service.')
+    parser.add_argument('role', choices=('node', 'router'))
+    parser.add_argument('port', type=int)
+    parser.add_argument('nodes', type=int, nargs='*', help='the ports of the nodes of a router')
+    parser.add_argument('--db', default='src/Display/Utils/map_storage.db',
+                        help='the database of the stored maps')
+    args = parser.parse_args()
+
+    storage_manager.DB_PATH = args.db
+    if args.role == 'node':
+        service = RouteNode()
+    else:
+        service = Router(tuple((HOST, port) for port in args.nodes))
+    server = make_server((HOST, args.port), service)
+    print(f'{args.role} listening on {HOST}:{server.server_address[1]}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""This file contains the scheduler of the pygame main loops of OpenMetroGuide.
+It blocks while a screen is idle instead of polling, caps the frame rate while
+events keep a screen redrawing, and tells the loop when the screen has to be redrawn.
+"""
+import pygame
+
+# The highest frame rate of a screen which is redrawn on every iteration, such as
+# while the view is dragged
+MAX_FPS = 60
+
+# Milliseconds an idle screen waits for an event before its loop runs anyway
+IDLE_TIMEOUT = 1000
+
+
+class FrameScheduler:
+    """Paces the iterations of a pygame main loop.
+
+    A loop iteration gets its events from get_events, and redraws the screen
+    only if should_redraw, calling frame_drawn afterwards. Any event invalidates
+    the screen, since input is what changes the state of every screen.
+
+    Instance Attributes:
+        - max_fps: The highest frame rate while redrawing. 0 means no cap.
+        - idle_timeout: Milliseconds to block for while the screen is valid.
+    """
+
+    # Private Instance Attributes:
+    #   - _clock: The clock which caps the frame rate.
+    #   - _dirty: Whether the screen is invalid and has to be redrawn.
+
+    max_fps: int
+    idle_timeout: int
+    _clock: pygame.time.Clock
+    _dirty: bool
+
+    def __init__(self, max_fps: int = MAX_FPS, idle_timeout: int = IDLE_TIMEOUT) -> None:
+        self.max_fps = max_fps
+        self.idle_timeout = idle_timeout
+        self._clock = pygame.time.Clock()
+        self._dirty = True
+
+    def invalidate(self) -> None:
+        """Mark the screen to be redrawn in the next loop iteration."""
+        self._dirty = True
+
+    def should_redraw(self) -> bool:
+        """Return whether the screen has to be redrawn in this loop iteration."""
+        return self._dirty
+
+    def frame_drawn(self) -> None:
+        """Mark the screen as valid after it was redrawn."""
+        self._dirty = False
+
+    def get_events(self) -> list[pygame.event.Event]:
+        """Return the pending events of this loop iteration.
+
+        If the screen has to be redrawn, wait only as long as needed to stay under
+        max_fps. Otherwise, block until an event arrives or idle_timeout passes.
+        """
+        if self.should_redraw():
+            self._clock.tick(self.max_fps)
+            events = pygame.event.get()
+        else:
+            event = pygame.event.wait(self.idle_timeout)
+            events = [] if event.type == pygame.NOEVENT else [event] + pygame.event.get()
+
+        if events:
+            self._dirty = True
+
+        return events
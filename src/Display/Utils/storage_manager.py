@@ -1,15 +1,65 @@
 """This file is the manager of the links to the database of
 OpenMetroGuide (currently local database). It will handle reading and writing
 to be used by all pygame windows that interact with stored Metro lines.
+
+Every write of the map of a city also updates its revision, in the same
+transaction, so that caches of the map in any process can be invalidated when,
+and only when, the map changes.
 """
+import hashlib
 import sqlite3
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
 from src.Base.map import Map
 from src.Base.node import Node
+from src.Base.timetable import Schedule
+
+DB_PATH = '../Utils/map_storage.db'
+
+# The kinds of row changes replayed by write_deltas
+INSERT_NODE = 'insert_node'
+DELETE_NODE = 'delete_node'
+INSERT_CONNECTION = 'insert_connection'
+DELETE_CONNECTION = 'delete_connection'
+
+# The number of rows fetched at once by the row iterators
+FETCH_ROWS = 1000
+
+# Content hashes are sums of the hashes of the rows of a map, modulo this
+HASH_MODULUS = 1 << 64
+
+
+@dataclass(frozen=True)
+class MapSnapshot:
+    """An immutable copy of the rows that represent the metro map of a city.
+
+    Two snapshots of the same city can be compared by write_snapshot, so that only
+    the rows which changed are written.
+    """
+    city: str
+    node_rows: frozenset[tuple[str, str, str, int, int, str]]
+    connection_rows: frozenset[tuple[str, str, str, str]]
+
+
+@dataclass(frozen=True)
+class Revision:
+    """The revision of the stored map of a city.
+
+    Instance Attributes:
+        - city: The city.
+        - counter: The number of writes which changed the map, which only increases.
+        - content_hash: The hash of the rows of the nodes and connections of the map,
+        which only depends on the rows, whatever the writes that led to them.
+    """
+    city: str
+    counter: int
+    content_hash: str
 
 
 def init_db() -> None:
     """Initializes the database with tables as required."""
-    conn = sqlite3.connect('../Utils/map_storage.db')
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
     with conn:
@@ -23,6 +73,22 @@ def init_db() -> None:
 
         cursor.execute(connection_cmd)
 
+        schedule_cmd = """CREATE TABLE IF NOT EXISTS
+        schedules(city TEXT, color TEXT, first INT, last INT, headway INT, speed REAL,
+        dwell REAL)"""
+
+        cursor.execute(schedule_cmd)
+
+        revision_cmd = """CREATE TABLE IF NOT EXISTS
+        revisions(city TEXT PRIMARY KEY, counter INT, content_hash TEXT)"""
+
+        cursor.execute(revision_cmd)
+
+        # Rows are looked up by city and name when writing deltas
+        cursor.execute("CREATE INDEX IF NOT EXISTS nodes_city_name ON nodes(city, name)")
+        cursor.execute("""CREATE INDEX IF NOT EXISTS connections_city_names
+        ON connections(city, name_1, name_2)""")
+
 
 def store_map(city: str, active_nodes: set) -> None:
     """Takes in the current active nodes in the metro map of provided city
@@ -31,49 +97,213 @@ def store_map(city: str, active_nodes: set) -> None:
     Preconditions:
         - Used by Admin only.
     """
-    conn = sqlite3.connect('../Utils/map_storage.db')
+    conn = sqlite3.connect(DB_PATH)
+    write_snapshot(conn, snapshot_map(city, active_nodes))
+
+
+def store_schedules(city: str, schedules: Iterable[Schedule]) -> None:
+    """Replace the stored schedules of the lines of city with schedules."""
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        conn.execute("DELETE FROM schedules WHERE city=?", (city,))
+        conn.executemany("INSERT INTO schedules VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         [(city, schedule.color, schedule.first, schedule.last,
+                           schedule.headway, schedule.speed, schedule.dwell)
+                          for schedule in schedules])
+
+
+def get_schedules(city: str) -> dict[str, Schedule]:
+    """Return the stored schedule of every line of city which has one, by color."""
+    return {row[1]: Schedule(*row[1:])
+            for row in iter_rows("SELECT * FROM schedules WHERE city=?", (city,))}
+
+
+def write_deltas(conn: sqlite3.Connection, city: str,
+                 deltas: Iterable[tuple[str, tuple]]) -> None:
+    """Replay deltas, in order, on the stored map of city in a single transaction.
+
+    Each delta is a (kind, row) pair where kind is one of INSERT_NODE, DELETE_NODE,
+    INSERT_CONNECTION and DELETE_CONNECTION, and row is a row of the corresponding table.
+    """
+    cursor = conn.cursor()
+    deltas = list(deltas)
+    if not deltas:
+        return
+
+    with conn:
+        content_hash = _read_hash(conn, city)
+        for kind, row in deltas:
+            table = 'nodes' if kind in (INSERT_NODE, DELETE_NODE) else 'connections'
+            if kind in (INSERT_NODE, INSERT_CONNECTION):
+                content_hash = (content_hash + row_hash(table, row)) % HASH_MODULUS
+            else:
+                content_hash = (content_hash - row_hash(table, row)) % HASH_MODULUS
+
+            if kind == INSERT_NODE:
+                cursor.execute("""INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?)""", row)
+            elif kind == DELETE_NODE:
+                cursor.execute("DELETE FROM nodes WHERE city=? AND name=?", (city, row[1]))
+            elif kind == INSERT_CONNECTION:
+                cursor.execute("""INSERT INTO connections VALUES (?, ?, ?, ?)""", row)
+            else:
+                cursor.execute("DELETE FROM connections WHERE city=? AND name_1=? AND name_2=?",
+                               (city, row[1], row[2]))
+
+        write_revision(conn, city, content_hash)
+
+
+def snapshot_map(city: str, active_nodes: set[Node]) -> MapSnapshot:
+    """Return an immutable snapshot of the active nodes of the city."""
+    return MapSnapshot(city, frozenset(create_rows_stations(city, active_nodes)),
+                       frozenset(create_connection_stations(city, active_nodes)))
+
+
+def read_snapshot(conn: sqlite3.Connection, city: str) -> MapSnapshot:
+    """Return the snapshot of city as it is currently stored in the database
+    that conn is connected to."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM nodes WHERE city=?", (city,))
+    node_rows = frozenset(cursor.fetchall())
+    cursor.execute("SELECT * FROM connections WHERE city=?", (city,))
+    connection_rows = frozenset(cursor.fetchall())
+
+    return MapSnapshot(city, node_rows, connection_rows)
+
+
+def write_snapshot(conn: sqlite3.Connection, snapshot: MapSnapshot,
+                   previous: Optional[MapSnapshot] = None) -> None:
+    """Write snapshot to the database that conn is connected to.
+
+    Only the rows that differ from previous are written. If previous is None,
+    the rows currently stored for the city are used instead.
+
+    Preconditions:
+        - previous is None or previous.city == snapshot.city
+    """
+    city = snapshot.city
     cursor = conn.cursor()
 
-    active_rows = create_rows_stations(city, active_nodes)
     with conn:
-        cursor.execute("SELECT * FROM nodes WHERE city=?", (city,))
-        curr_rows = set(cursor.fetchall())
-        to_add = {element for element in active_rows if not nodes_row_similar(curr_rows, element)}
-        to_remove = {element for element in curr_rows if
-                     not nodes_row_similar(active_rows, element)}
-        to_update = {element for element in active_rows if nodes_row_similar(curr_rows, element)}
-
-        for element in to_add:
-            cursor.execute(
-                """INSERT INTO nodes VALUES (:city, :name, :is_station, :x, :y, :zone)""",
-                {'city': element[0], 'name': element[1], 'is_station': element[2],
-                 'x': element[3], 'y': element[4], 'zone': element[5]})
-
-        for element in to_remove:
+        if previous is None:
+            previous = read_snapshot(conn, city)
+        if previous == snapshot:
+            return
+        removed = MapSnapshot(city, previous.node_rows - snapshot.node_rows,
+                              previous.connection_rows - snapshot.connection_rows)
+        added = MapSnapshot(city, snapshot.node_rows - previous.node_rows,
+                            snapshot.connection_rows - previous.connection_rows)
+        content_hash = (_read_hash(conn, city) + snapshot_hash(added)
+                        - snapshot_hash(removed)) % HASH_MODULUS
+
+        for element in removed.node_rows:
             cursor.execute("DELETE FROM nodes WHERE city=? AND name=?", (city, element[1]))
 
-        for element in to_update:
-            cursor.execute(
-                """UPDATE nodes SET is_station=?, x=?, y=?, zone=? WHERE city=? AND name=?""",
-                (element[2], element[3], element[4], element[5], city, element[1]))
+        cursor.executemany("""INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?)""", added.node_rows)
+
+        for element in removed.connection_rows:
+            cursor.execute("DELETE FROM connections WHERE city=? AND name_1=? AND name_2=?",
+                           (city, element[1], element[2]))
 
-        cursor.execute("DELETE FROM connections WHERE city=?", (city,))
-        active_connections = create_connection_stations(city, active_nodes)
+        cursor.executemany("""INSERT INTO connections VALUES (?, ?, ?, ?)""",
+                           added.connection_rows)
 
-        for element in active_connections:
-            cursor.execute("""INSERT INTO connections VALUES (:city, :name_1, :name_2, :colors)""",
-                           {'city': element[0], 'name_1': element[1], 'name_2': element[2],
-                            'colors': element[3]})
+        write_revision(conn, city, content_hash)
 
 
-def nodes_row_similar(all_rows: set[tuple[str, str, str, int, int, int]],
-                      identifier: tuple[str, str, str, int, int, int]) -> bool:
-    """Returns whether the identifier exists in the input rows.
+def row_hash(table: str, row: tuple) -> int:
+    """Return the hash of row, a row of table, without its city.
+
+    Preconditions:
+        - table in {'nodes', 'connections'}
+    """
+    # whole floats are stored as integers, so they are hashed as such
+    values = [table] + [str(int(value)) if isinstance(value, float) and value.is_integer()
+                        else str(value) for value in row[1:]]
+    digest = hashlib.blake2b('\x1f'.join(values).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def snapshot_hash(snapshot: MapSnapshot) -> int:
+    """Return the content hash of the rows of snapshot."""
+    return (sum(row_hash('nodes', row) for row in snapshot.node_rows)
+            + sum(row_hash('connections', row) for row in snapshot.connection_rows)) \
+        % HASH_MODULUS
+
+
+def write_revision(conn: sqlite3.Connection, city: str, content_hash: int) -> None:
+    """Record that the stored map of city changed and that its content hash is now
+    content_hash, in the current transaction of conn."""
+    conn.execute("""INSERT INTO revisions VALUES (?, 1, ?)
+    ON CONFLICT(city) DO UPDATE SET counter=counter + 1, content_hash=excluded.content_hash""",
+                 (city, format(content_hash, '016x')))
+
+
+def _read_hash(conn: sqlite3.Connection, city: str) -> int:
+    """Return the content hash of the map of city as it is stored in the database that
+    conn is connected to. Maps stored before revisions were recorded are hashed row
+    by row."""
+    row = conn.execute("SELECT content_hash FROM revisions WHERE city=?", (city,)).fetchone()
+    if row is not None:
+        return int(row[0], 16)
+    return snapshot_hash(read_snapshot(conn, city))
+
+
+def get_revision(city: str) -> Optional[Revision]:
+    """Return the revision of the stored map of city, or None if it has none."""
+    for row in iter_rows("SELECT * FROM revisions WHERE city=?", (city,)):
+        return Revision(*row)
+    return None
+
+
+def get_revisions() -> dict[str, Revision]:
+    """Return the revision of every stored map which has one, by city."""
+    return {row[0]: Revision(*row) for row in iter_rows("SELECT * FROM revisions")}
+
+
+class RevisionWatcher:
+    """Watches the revisions of the stored maps for the changes made by other
+    connections, such as those of other processes.
+
+    Polling first asks SQLite whether another connection committed to the database
+    since the last poll (PRAGMA data_version), which does not read any table, and
+    only then reads the revisions.
+
+    Instance Attributes:
+        - revisions: The revision of every city as of the last poll.
     """
-    for row in all_rows:
-        if row[0] == identifier[0] and row[1] == identifier[1]:
-            return True
-    return False
+
+    # Private Instance Attributes:
+    #   - _conn: The connection of the watcher, which it never writes with, so that
+    #            data_version changes with every commit to the database.
+    #   - _data_version: The data_version as of the last poll, or None before the first.
+
+    revisions: dict[str, Revision]
+    _conn: sqlite3.Connection
+    _data_version: Optional[int]
+
+    def __init__(self) -> None:
+        self.revisions = {}
+        self._conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        self._data_version = None
+
+    def poll(self) -> list[str]:
+        """Return, in order, the cities whose maps were added, changed or removed since
+        the last poll, or every city with a revision on the first poll."""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+
+        revisions = {row[0]: Revision(*row)
+                     for row in self._conn.execute("SELECT * FROM revisions")}
+        changed = sorted(city for city in revisions.keys() | self.revisions.keys()
+                         if revisions.get(city) != self.revisions.get(city))
+        self.revisions = revisions
+        return changed
+
+    def close(self) -> None:
+        """Close the connection of the watcher."""
+        self._conn.close()
 
 
 def create_rows_stations(city: str, active_nodes: set[Node]) -> \
@@ -105,38 +335,59 @@ def get_map(city: str) -> Map:
     Preconditions:
         - city exists in the local database
     """
-    conn = sqlite3.connect('../Utils/map_storage.db')
-    cursor = conn.cursor()
-    metro_map = Map()
+    return build_map(iter_node_rows(city), iter_connection_rows(city))
 
-    with conn:
-        cursor.execute("SELECT * FROM nodes WHERE city=?", (city,))
-        node_info_lst = cursor.fetchall()
 
-        cursor.execute("SELECT * FROM connections WHERE city=?", (city,))
-        connection_info_lst = cursor.fetchall()
+def iter_rows(query: str, parameters: tuple = (),
+              fetch_rows: int = FETCH_ROWS) -> Iterator[tuple]:
+    """Yield the rows of query on the database, fetching fetch_rows rows at a time,
+    so that only that many rows are held in memory at once."""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        cursor = conn.execute(query, parameters)
+        while rows := cursor.fetchmany(fetch_rows):
+            yield from rows
+    finally:
+        conn.close()
 
-        for node_info in node_info_lst:
-            is_station = True if node_info[2] == 'True' else False
-            metro_map.add_node(Node(node_info[1], (node_info[3], node_info[4]), is_station,
-                                    str(node_info[5])))
 
-        for connection_info in connection_info_lst:
-            metro_map.add_track(connection_info[1], connection_info[2], connection_info[3])
+def iter_cities() -> Iterator[str]:
+    """Yield every city in the database, in order."""
+    for row in iter_rows("SELECT DISTINCT city FROM nodes ORDER BY city"):
+        yield row[0]
 
-    return metro_map
 
+def iter_node_rows(city: Optional[str] = None) -> Iterator[tuple[str, str, str, int, int, str]]:
+    """Yield the rows of the nodes table of city, or of every city if city is None."""
+    if city is None:
+        return iter_rows("SELECT * FROM nodes")
+    return iter_rows("SELECT * FROM nodes WHERE city=?", (city,))
 
-def get_cities() -> list[str]:
-    """Get all the possible city options in the current local database"""
-    conn = sqlite3.connect('../Utils/map_storage.db')
-    cursor = conn.cursor()
-    ret_set = set()
 
-    with conn:
-        cursor.execute("SELECT city FROM nodes")
+def iter_connection_rows(city: Optional[str] = None) -> Iterator[tuple[str, str, str, str]]:
+    """Yield the rows of the connections table of city, or of every city if city is None.
+    Every track has a row in each direction."""
+    if city is None:
+        return iter_rows("SELECT * FROM connections")
+    return iter_rows("SELECT * FROM connections WHERE city=?", (city,))
+
+
+def build_map(node_rows: Iterable[tuple[str, str, str, int, int, str]],
+              connection_rows: Iterable[tuple[str, str, str, str]]) -> Map:
+    """Return the map described by rows of the nodes and connections tables."""
+    metro_map = Map()
+
+    for node_info in node_rows:
+        is_station = True if node_info[2] == 'True' else False
+        metro_map.add_node(Node(node_info[1], (node_info[3], node_info[4]), is_station,
+                                str(node_info[5])))
 
-        for element in cursor.fetchall():
-            ret_set.add(element[0])
+    for connection_info in connection_rows:
+        metro_map.add_track(connection_info[1], connection_info[2], connection_info[3])
 
-    return list(ret_set)
+    return metro_map
+
+
+def get_cities() -> list[str]:
+    """Get all the possible city options in the current local database"""
+    return list(iter_cities())
@@ -0,0 +1,262 @@
+"""This file contains the warm-up service of OpenMetroGuide, which loads, weights
+and validates every stored city in parallel worker processes at start-up, and
+keeps the prepared maps in a cache from which the screens that open a city take
+them instead of reading the database again.
+
+Workers send a city back as its rows rather than as a Map, since the nodes of a
+map refer to each other too deeply to be pickled, together with the cost weight
+of every track they computed (see Map.get_costs). The map is rebuilt from them in the starting
+process when it is first taken from the cache, and its weights are set rather
+than computed again.
+
+Run from the repository root to report how every stored city warms up:
+    python -m src.Display.Utils.warmup [--processes N] [--db map_storage.db]
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from src.Base.map import Map, check_map
+from src.Display.Utils import storage_manager
+from src.Display.Utils.storage_manager import build_map
+
+# The number of worker processes used by default
+DEFAULT_PROCESSES = min(4, os.cpu_count() or 1)
+
+
+@dataclass(frozen=True)
+class WarmupReport:
+    """How a city was warmed up.
+
+    Instance Attributes:
+        - city: The city which was warmed up.
+        - load_time: The time (in seconds) its worker took to read, build, weight
+        and validate its map.
+        - status: Why its map is not a proper metro map (see check_map), '' if it is,
+        or why it could not be loaded.
+        - nodes: The number of nodes of its map.
+        - loaded: Whether its map was loaded, even if it is not proper.
+    """
+    city: str
+    load_time: float
+    status: str
+    nodes: int
+    loaded: bool
+
+
+class MapCache:
+    """The stored maps of the cities being warmed up, shared by every thread.
+
+    A city is kept as the rows of its nodes and connections, and the cost weight of
+    every track, until its map is first taken, so that only the maps which are
+    opened are built. Maps are built outside of the lock, so that building one does
+    not hold up the other threads. Getting the map of a city whose warm-up is still
+    running waits for it.
+    """
+
+    # Private Instance Attributes:
+    #   - _condition: Guards the other attributes, and wakes up the threads waiting
+    #                 for a map.
+    #   - _rows: The rows of the nodes and connections, and the cost weight of every
+    #            track, of every warmed up city whose map has not been built yet.
+    #   - _maps: The weighted map of every warmed up city which has been built.
+    #   - _pending: The cities being warmed up.
+
+    _condition: threading.Condition
+    _rows: dict[str, tuple[list[tuple], list[tuple], list[float]]]
+    _maps: dict[str, Map]
+    _pending: set[str]
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._rows = {}
+        self._maps = {}
+        self._pending = set()
+
+    def expect(self, cities: Iterable[str]) -> None:
+        """Mark cities as being warmed up."""
+        with self._condition:
+            self._pending.update(cities)
+
+    def put(self, city: str,
+            rows: Optional[tuple[list[tuple], list[tuple], list[float]]]) -> None:
+        """Store the rows of the nodes and connections of city and the cost weight of
+        every track (see Map.get_costs), or mark its warm-up as finished without a map if rows is None."""
+        with self._condition:
+            if rows is not None:
+                self._rows[city] = rows
+                self._maps.pop(city, None)
+            self._pending.discard(city)
+            self._condition.notify_all()
+
+    def get(self, city: str, timeout: Optional[float] = None) -> Optional[Map]:
+        """Return the weighted map of city, waiting up to timeout seconds (forever if
+        None) for its warm-up to finish. Return None if it has no map."""
+        with self._condition:
+            self._condition.wait_for(lambda: city not in self._pending, timeout)
+            rows = self._rows.get(city)
+            if rows is None:
+                return self._maps.get(city)
+
+        metro_map = build_map(rows[0], rows[1])
+        metro_map.set_costs(rows[2])
+
+        with self._condition:
+            # unless the city was put again or discarded while it was built
+            if self._rows.get(city) is rows:
+                del self._rows[city]
+                self._maps[city] = metro_map
+            return self._maps.get(city, metro_map)
+
+    def discard(self, city: str) -> None:
+        """Forget the map of city, so that it is loaded from the database again."""
+        with self._condition:
+            self._rows.pop(city, None)
+            self._maps.pop(city, None)
+
+
+class WarmupService:
+    """Warms up stored cities in a pool of worker processes, and puts their rows
+    into a MapCache as soon as each is ready.
+
+    Instance Attributes:
+        - cache: The cache which the warmed up cities are put into.
+        - reports: The report of every city whose warm-up finished.
+    """
+
+    # Private Instance Attributes:
+    #   - _processes: The number of worker processes.
+    #   - _executor: The pool of worker processes, while warming up.
+    #   - _futures: The warm-up of every city, in the order they were started.
+    #   - _lock: Guards reports.
+    #   - _done: Set once every city has been warmed up.
+
+    cache: MapCache
+    reports: dict[str, WarmupReport]
+    _processes: int
+    _executor: Optional[ProcessPoolExecutor]
+    _futures: list[Future]
+    _lock: threading.Lock
+    _done: threading.Event
+
+    def __init__(self, processes: int = DEFAULT_PROCESSES,
+                 cache: Optional[MapCache] = None) -> None:
+        """Preconditions:
+            - processes >= 1
+        """
+        self.cache = cache if cache is not None else MapCache()
+        self.reports = {}
+        self._processes = processes
+        self._executor = None
+        self._futures = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self, cities: Iterable[str]) -> None:
+        """Start warming up cities in the background. Returns immediately."""
+        cities = list(cities)
+        self.cache.expect(cities)
+        if not cities:
+            self._done.set()
+            return
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=min(self._processes, len(cities)),
+            initializer=_init_worker, initargs=(os.path.abspath(storage_manager.DB_PATH),))
+        remaining = [len(cities)]
+
+        def finished(future: Future, city: str) -> None:
+            """Put the rows of city, read by future, into the cache."""
+            rows = None
+            try:
+                report, node_rows, connection_rows, costs = future.result()
+                rows = (node_rows, connection_rows, costs)
+            except CancelledError:
+                report = WarmupReport(city, 0, 'CANCELLED', 0, False)
+            except Exception as error:
+                report = WarmupReport(city, 0, 'LOAD FAILED: ' + repr(error), 0, False)
+
+            self.cache.put(city, rows)
+            with self._lock:
+                self.reports[city] = report
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    self._done.set()
+
+        for city in cities:
+            future = self._executor.submit(warm_city, city)
+            future.add_done_callback(lambda f, c=city: finished(f, c))
+            self._futures.append(future)
+
+    def wait(self, timeout: Optional[float] = None) -> dict[str, WarmupReport]:
+        """Wait up to timeout seconds (forever if None) for every city to be warmed up,
+        then shut the worker processes down and return the reports so far."""
+        self._done.wait(timeout)
+        if self._done.is_set() and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+        with self._lock:
+            return dict(self.reports)
+
+    def close(self) -> None:
+        """Cancel the warm-ups which have not started and shut the worker processes down,
+        without waiting for them."""
+        for future in self._futures:
+            future.cancel()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def warm_city(city: str) -> tuple[WarmupReport, list[tuple], list[tuple], list[float]]:
+    """Read, build, weight and validate the stored map of city, and return how it went
+    together with the rows of its nodes and connections, in the order they are stored,
+    and the cost weight of every track. Runs in a worker process."""
+    start = time.perf_counter()
+    node_rows = list(storage_manager.iter_node_rows(city))
+    connection_rows = list(storage_manager.iter_connection_rows(city))
+    metro_map = build_map(node_rows, connection_rows)
+    metro_map.update_weights()
+    nodes = metro_map.get_all_nodes()
+    status = check_map(nodes)
+
+    return (WarmupReport(city, time.perf_counter() - start, status, len(nodes), True),
+            node_rows, connection_rows, metro_map.get_costs())
+
+
+def _init_worker(db_path: str) -> None:
+    """Point a worker process at the database of the process that started it."""
+    storage_manager.DB_PATH = db_path
+
+
+def main() -> None:
+    """Warm up every stored city from the command line and print the reports."""
+    parser = argparse.ArgumentParser(description='Warm up the stored maps of OpenMetroGuide.')
+    parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES,
+                        help='the number of worker processes')
+    parser.add_argument('--db', default='src/Display/Utils/map_storage.db',
+                        help='the database to warm up')
+    args = parser.parse_args()
+
+    storage_manager.DB_PATH = args.db
+    start = time.perf_counter()
+    service = WarmupService(args.processes)
+    service.start(storage_manager.iter_cities())
+    reports = service.wait()
+
+    for city in sorted(reports):
+        report = reports[city]
+        print(f'{city:<24} {report.nodes:8} nodes {report.load_time * 1000:10.1f} ms  '
+              f'{report.status or "OK"}')
+    print(f'{len(reports)} cities warmed up in {time.perf_counter() - start:.2f} s '
+          f'with {args.processes} processes')
+
+
+if __name__ == '__main__':
+    main()